@@ -1,13 +1,45 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2024 The NebulaGraph Authors. All rights reserved.
 
+import importlib
 from pkgutil import extend_path
+from typing import TYPE_CHECKING, Any
 
 __path__ = extend_path(__path__, __name__)  # type: ignore
 
-from ng_nx.query_reader import NebulaReader, NebulaQueryReader
-from ng_nx.scan_reader import NebulaScanReader
-from ng_nx.writer import NebulaWriter
+if TYPE_CHECKING:
+    from ng_nx.query_reader import NebulaQueryReader, NebulaReader
+    from ng_nx.scan_reader import NebulaScanReader
+    from ng_nx.session import NebulaSessionManager
+    from ng_nx.subgraph_reader import NebulaSubgraphReader
+    from ng_nx.vids import VidMap
+    from ng_nx.writer import NebulaWriter
+
+# the module of each name exported, imported on first use, so that importing
+# ng_nx does not pull in pandas, networkx and nebula3 until a reader or the
+# writer is used
+_EXPORTS = {
+    "NebulaReader": "ng_nx.query_reader",
+    "NebulaScanReader": "ng_nx.scan_reader",
+    "NebulaWriter": "ng_nx.writer",
+    "NebulaQueryReader": "ng_nx.query_reader",
+    "NebulaSubgraphReader": "ng_nx.subgraph_reader",
+    "NebulaSessionManager": "ng_nx.session",
+    "VidMap": "ng_nx.vids",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
 
 # export
 __all__ = (
@@ -15,4 +47,7 @@ __all__ = (
     "NebulaScanReader",
     "NebulaWriter",
     "NebulaQueryReader",
+    "NebulaSubgraphReader",
+    "NebulaSessionManager",
+    "VidMap",
 )
@@ -0,0 +1,355 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import networkx as nx
+import numpy as np
+
+# prefix of the columns telling which rows have the attribute at all
+PRESENT_PREFIX = "__present__."
+# version of the layout of entries, entries of other versions are misses
+CACHE_FORMAT = 2
+# columns of the edge table that are not edge attributes
+KEY_COLUMNS = ("src", "dst", "key", "key_type")
+
+
+def typed_column(values: list) -> np.ndarray:
+    """
+    typed array for homogeneous int, double and bool values, so that they are
+    saved compactly and could be memory-mapped back, others are kept as objects
+    """
+    types = {type(value) for value in values}
+    if types == {int}:
+        try:
+            return np.asarray(values, dtype=np.int64)
+        except OverflowError:
+            pass
+    elif types == {float}:
+        return np.asarray(values, dtype=np.float64)
+    elif types == {bool}:
+        return np.asarray(values, dtype=np.bool_)
+    return _object_column(values)
+
+
+def _object_column(values: list) -> np.ndarray:
+    # assign one by one, so that list values are not broadcast to a 2-D array
+    arr = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        arr[i] = value
+    return arr
+
+
+def _save_column(path: str, column: np.ndarray) -> Optional[str]:
+    """
+    save a column to path(.npy) without pickle, return how object columns are
+    encoded: "str" for strings, as their utf-8 bytes along with the offsets of
+    each in path.offsets.npy, or "json" for others, as one JSON array whose
+    values that JSON has no counterpart for(e.g. dates) are kept as strings
+    """
+    if column.dtype != object:
+        np.save(path, column, allow_pickle=False)
+        return None
+    values = column.tolist()
+    if all(type(value) is str for value in values):
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        np.save(path, data, allow_pickle=False)
+        np.save(path + ".offsets.npy", offsets, allow_pickle=False)
+        return "str"
+    data = json.dumps(values, default=str).encode("utf-8")
+    np.save(path, np.frombuffer(data, dtype=np.uint8), allow_pickle=False)
+    return "json"
+
+
+def _load_column(path: str, encoding: Optional[str]) -> np.ndarray:
+    """
+    load a column saved by _save_column(), numeric ones being memory-mapped
+    """
+    if encoding is None:
+        return np.load(path, mmap_mode="r")
+    data = np.load(path).tobytes()
+    if encoding == "str":
+        offsets = np.load(path + ".offsets.npy").tolist()
+        return _object_column(
+            [
+                data[start:end].decode("utf-8")
+                for start, end in zip(offsets[:-1], offsets[1:])
+            ]
+        )
+    return _object_column(json.loads(data))
+
+
+def attr_columns(attrs: List[dict]) -> Dict[str, np.ndarray]:
+    """
+    columns of the attributes of rows, an attribute missing from some rows
+    comes with a PRESENT_PREFIX column telling which rows have it
+    """
+    names: Dict[str, None] = {}
+    for attr in attrs:
+        names.update(dict.fromkeys(attr))
+    columns = {}
+    for name in names:
+        present = [name in attr for attr in attrs]
+        if all(present):
+            columns[name] = typed_column([attr[name] for attr in attrs])
+        else:
+            columns[name] = typed_column([attr.get(name) for attr in attrs])
+            columns[PRESENT_PREFIX + name] = np.asarray(present, dtype=np.bool_)
+    return columns
+
+
+def key_columns(keys: list) -> Dict[str, np.ndarray]:
+    """
+    the columns of edge keys, those of (edge type, rank) pairs of graphs read
+    with_rank being split into the edge types as key_type, and the ranks as key
+    """
+    if keys and all(isinstance(key, tuple) for key in keys):
+        types, ranks = zip(*keys)
+        return {
+            "key_type": typed_column(list(types)),
+            "key": typed_column(list(ranks)),
+        }
+    return {"key": typed_column(keys)}
+
+
+def edge_keys(edges: Dict[str, np.ndarray]) -> list:
+    """
+    the edge keys of an edge table, the inverse of key_columns()
+    """
+    if "key_type" in edges:
+        return list(zip(edges["key_type"].tolist(), edges["key"].tolist()))
+    return edges["key"].tolist()
+
+
+def _attr_rows(columns: Dict[str, np.ndarray], size: int):
+    names = [name for name in columns if not name.startswith(PRESENT_PREFIX)]
+    values = [columns[name].tolist() for name in names]
+    presents = [
+        columns[PRESENT_PREFIX + name].tolist()
+        if PRESENT_PREFIX + name in columns
+        else None
+        for name in names
+    ]
+    for i in range(size):
+        yield {
+            name: value[i]
+            for name, value, present in zip(names, values, presents)
+            if present is None or present[i]
+        }
+
+
+def graph_to_tables(g: nx.MultiDiGraph) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    decompose a graph into a node table and an edge table of columns
+    """
+    node_ids, node_attrs = zip(*g.nodes(data=True)) if len(g) else ((), ())
+    nodes = {"vid": typed_column(list(node_ids))}
+    nodes.update(attr_columns(list(node_attrs)))
+
+    edge_list = list(g.edges(keys=True, data=True))
+    edges = {
+        "src": typed_column([edge[0] for edge in edge_list]),
+        "dst": typed_column([edge[1] for edge in edge_list]),
+    }
+    edges.update(key_columns([edge[2] for edge in edge_list]))
+    edges.update(attr_columns([edge[3] for edge in edge_list]))
+    return {"nodes": nodes, "edges": edges}
+
+
+def tables_to_graph(tables: Dict[str, Dict[str, np.ndarray]]) -> nx.MultiDiGraph:
+    g = nx.MultiDiGraph()
+    nodes, edges = tables["nodes"], tables["edges"]
+    node_columns = {name: column for name, column in nodes.items() if name != "vid"}
+    g.add_nodes_from(
+        zip(nodes["vid"].tolist(), _attr_rows(node_columns, len(nodes["vid"])))
+    )
+    edge_columns = {
+        name: column for name, column in edges.items() if name not in KEY_COLUMNS
+    }
+    g.add_edges_from(
+        zip(
+            edges["src"].tolist(),
+            edges["dst"].tolist(),
+            edge_keys(edges),
+            _attr_rows(edge_columns, len(edges["src"])),
+        )
+    )
+    return g
+
+
+class SnapshotCache:
+    """
+    local on-disk cache of read results, keyed by what was read.
+
+    Each entry is a directory under the entries/ subdirectory holding one .npy
+    file per column of the node and edge tables, numeric columns are
+    memory-mapped when loaded back, and others are encoded as bytes so that
+    nothing is pickled. Entries expire after ttl seconds, and the
+    least recently used ones are evicted when the cache grows beyond max_bytes.
+    Nothing else in directory is touched, entries being saved are staged next
+    to entries/ until complete.
+    """
+
+    META_FILE = "meta.json"
+    ENTRIES_DIR = "entries"
+
+    def __init__(
+        self,
+        directory: str,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = os.path.join(directory, self.ENTRIES_DIR)
+        os.makedirs(self._entries, exist_ok=True)
+
+    @staticmethod
+    def key(**parts: Any) -> str:
+        """
+        stable key of what was read, e.g. space, edges, properties, limit, query
+        """
+        return hashlib.sha256(
+            json.dumps(parts, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def read_through(
+        self,
+        key: str,
+        read: Callable[[], Any],
+        from_tables: Callable[
+            [Dict[str, Dict[str, np.ndarray]]], Any
+        ] = tables_to_graph,
+        to_tables: Callable[
+            [Any], Dict[str, Dict[str, np.ndarray]]
+        ] = graph_to_tables,
+    ) -> Any:
+        """
+        load the graph of key from the cache, or read and cache it on a miss,
+        from_tables and to_tables convert the graph from and to the tables, e.g.
+        for a CompactGraph
+        """
+        tables = self.load_tables(key)
+        if tables is not None:
+            return from_tables(tables)
+        g = read()
+        self.save_tables(key, to_tables(g))
+        return g
+
+    def load_graph(self, key: str) -> Optional[nx.MultiDiGraph]:
+        tables = self.load_tables(key)
+        return None if tables is None else tables_to_graph(tables)
+
+    def save_graph(self, key: str, g: nx.MultiDiGraph):
+        self.save_tables(key, graph_to_tables(g))
+
+    def load_tables(self, key: str) -> Optional[Dict[str, Dict[str, np.ndarray]]]:
+        entry = os.path.join(self._entries, key)
+        with self._lock:
+            meta = self._read_meta(entry)
+            if meta is None or meta.get("format") != CACHE_FORMAT:
+                return None
+            if self.ttl is not None and time.time() - meta["created"] > self.ttl:
+                shutil.rmtree(entry, ignore_errors=True)
+                return None
+            meta["accessed"] = time.time()
+            self._write_meta(entry, meta)
+
+        tables: Dict[str, Dict[str, np.ndarray]] = {}
+        for table, columns in meta["tables"].items():
+            tables[table] = {}
+            for i, (name, encoding) in enumerate(columns):
+                path = os.path.join(entry, table, f"{i}.npy")
+                tables[table][name] = _load_column(path, encoding)
+        return tables
+
+    def save_tables(self, key: str, tables: Dict[str, Dict[str, np.ndarray]]):
+        entry = os.path.join(self._entries, key)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.directory)
+        meta: Dict[str, Any] = {
+            "format": CACHE_FORMAT,
+            "created": time.time(),
+            "tables": {},
+        }
+        meta["accessed"] = meta["created"]
+        size = 0
+        for table, columns in tables.items():
+            os.makedirs(os.path.join(staging, table))
+            meta["tables"][table] = []
+            # columns are saved by position, names are kept in the meta file
+            for i, (name, column) in enumerate(columns.items()):
+                path = os.path.join(staging, table, f"{i}.npy")
+                encoding = _save_column(path, np.asarray(column))
+                size += os.path.getsize(path)
+                if encoding == "str":
+                    size += os.path.getsize(path + ".offsets.npy")
+                meta["tables"][table].append((name, encoding))
+        meta["size"] = size
+        self._write_meta(staging, meta)
+
+        with self._lock:
+            shutil.rmtree(entry, ignore_errors=True)
+            os.rename(staging, entry)
+            self._evict()
+
+    def invalidate(self, key: Optional[str] = None):
+        """
+        drop the entry of key, or every entry when key is None
+        """
+        with self._lock:
+            if key is not None:
+                shutil.rmtree(os.path.join(self._entries, key), ignore_errors=True)
+                return
+            for name in self._entry_names():
+                shutil.rmtree(os.path.join(self._entries, name), ignore_errors=True)
+
+    def _entry_names(self) -> List[str]:
+        """
+        the keys of the entries, directories in entries/ with a meta file
+        """
+        return [
+            name
+            for name in os.listdir(self._entries)
+            if os.path.isfile(os.path.join(self._entries, name, self.META_FILE))
+        ]
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        entries = []
+        for name in self._entry_names():
+            meta = self._read_meta(os.path.join(self._entries, name))
+            if meta is not None:
+                entries.append((meta["accessed"], meta["size"], name))
+        total = sum(size for _, size, _ in entries)
+        # the least recently used first, the newest entry is always kept
+        for _, size, name in sorted(entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(os.path.join(self._entries, name), ignore_errors=True)
+            total -= size
+
+    def _read_meta(self, entry: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(entry, self.META_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entry: str, meta: dict):
+        path = os.path.join(entry, self.META_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
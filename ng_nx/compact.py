@@ -0,0 +1,439 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from ng_nx.cache import (
+    KEY_COLUMNS,
+    PRESENT_PREFIX,
+    SnapshotCache,
+    edge_keys,
+    graph_to_tables,
+    key_columns,
+    tables_to_graph,
+    typed_column,
+)
+from ng_nx.utils import typed_keys
+
+if TYPE_CHECKING:
+    from ng_nx.vids import VidMap
+
+OutputFormat = Literal["networkx", "csr"]
+
+
+def _typed(values: np.ndarray) -> np.ndarray:
+    """
+    values typed as typed_column() would, int, double and bool arrays are cast
+    rather than going through one Python object per value
+    """
+    kind = values.dtype.kind
+    if kind == "b":
+        return values
+    if kind == "i" or (kind == "u" and values.dtype.itemsize < 8):
+        return values.astype(np.int64, copy=False)
+    if kind == "f":
+        return values.astype(np.float64, copy=False)
+    return typed_column(values.tolist())
+
+
+def _merge_columns(
+    chunks: List[Tuple[Union[np.ndarray, slice], Dict[str, np.ndarray]]],
+    size: int,
+) -> Dict[str, np.ndarray]:
+    """
+    scatter the attribute columns of (positions, columns) chunks into columns
+    of size, in the layout of the cache tables: an attribute missing from some
+    rows comes with a PRESENT_PREFIX column, later chunks win on conflicts.
+
+    When the chunks are slices one after another covering all the rows, as
+    those of edges, the columns present in every chunk are concatenated
+    instead, and kept typed when they all are of the same type.
+    """
+    names: Dict[str, None] = {}
+    for _, columns in chunks:
+        names.update(dict.fromkeys(columns))
+    contiguous = _contiguous([positions for positions, _ in chunks], size)
+    merged = {}
+    for name in names:
+        parts = [columns[name] for _, columns in chunks if name in columns]
+        dtypes = {part.dtype for part in parts}
+        if contiguous and len(parts) == len(chunks):
+            if len(dtypes) == 1:
+                merged[name] = _typed(np.concatenate(parts))
+            else:
+                merged[name] = _typed(np.concatenate(parts, dtype=object))
+            continue
+        dtype = dtypes.pop() if len(dtypes) == 1 else np.dtype(object)
+        values = np.empty(size, dtype=dtype)
+        present = np.zeros(size, dtype=np.bool_)
+        for positions, columns in chunks:
+            if name in columns:
+                values[positions] = columns[name]
+                present[positions] = True
+        if present.all():
+            merged[name] = _typed(values)
+        else:
+            if dtype != object:
+                values = values.astype(object)
+                values[~present] = None
+            merged[name] = values
+            merged[PRESENT_PREFIX + name] = present
+    return merged
+
+
+def _contiguous(positions: List[Union[np.ndarray, slice]], size: int) -> bool:
+    """
+    whether positions are slices one after another from 0 to size
+    """
+    end = 0
+    for chunk in positions:
+        if not isinstance(chunk, slice) or chunk.start != end:
+            return False
+        end = chunk.stop
+    return end == size
+
+
+def _pad_columns(
+    columns: Dict[str, np.ndarray], size: int
+) -> Dict[str, np.ndarray]:
+    """
+    extend attribute columns to size with rows not having the attributes
+    """
+    padded = {}
+    for name, values in columns.items():
+        if name.startswith(PRESENT_PREFIX):
+            continue
+        present = np.zeros(size, dtype=np.bool_)
+        present[: len(values)] = columns.get(PRESENT_PREFIX + name, True)
+        padded[name] = np.empty(size, dtype=object)
+        padded[name][: len(values)] = values
+        padded[PRESENT_PREFIX + name] = present
+    return padded
+
+
+class CompactGraph:
+    """
+    a directed multigraph held in CSR arrays instead of per-edge dicts.
+
+    Nodes are relabeled to 0..num_nodes-1, vids[i] being the vid of node i.
+    The out edges of node i are edges indptr[i]:indptr[i+1], whose targets are
+    in indices, and whose keys and attributes(e.g. __type__, __rank__ and the
+    properties) are in the arrays of keys and edge_attrs at the same positions.
+    Keys are those of networkx, (edge type, rank) pairs for graphs read
+    with_rank.
+    """
+
+    def __init__(
+        self,
+        vids: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        keys: np.ndarray,
+        edge_attrs: Dict[str, np.ndarray],
+        node_attrs: Dict[str, np.ndarray],
+    ):
+        self.vids = vids
+        self.indptr = indptr
+        self.indices = indices
+        self.keys = keys
+        self.edge_attrs = edge_attrs
+        self.node_attrs = node_attrs
+        self._index: Optional[Dict] = None
+
+    @classmethod
+    def from_edges(
+        cls,
+        vids: np.ndarray,
+        src: np.ndarray,
+        dst: np.ndarray,
+        keys: np.ndarray,
+        edge_attrs: Dict[str, np.ndarray],
+        node_attrs: Dict[str, np.ndarray],
+    ) -> "CompactGraph":
+        """
+        build from edges given by node indices in any order, the order of the
+        out edges of a node is kept
+        """
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(len(vids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(vids)), out=indptr[1:])
+        return cls(
+            vids,
+            indptr,
+            np.asarray(dst, dtype=np.int64)[order],
+            keys[order],
+            {name: values[order] for name, values in edge_attrs.items()},
+            node_attrs,
+        )
+
+    @classmethod
+    def from_tables(
+        cls, tables: Dict[str, Dict[str, np.ndarray]]
+    ) -> "CompactGraph":
+        """
+        build from the node and edge tables of SnapshotCache, edge ends missing
+        from the node table are added as nodes without attributes
+        """
+        nodes, edges = tables["nodes"], tables["edges"]
+        vids = np.asarray(nodes["vid"])
+        src = pd.Index(vids).get_indexer(edges["src"])
+        dst = pd.Index(vids).get_indexer(edges["dst"])
+        node_attrs = {
+            name: np.asarray(values)
+            for name, values in nodes.items()
+            if name != "vid"
+        }
+        missing = pd.unique(
+            np.concatenate(
+                [
+                    np.asarray(edges["src"])[src < 0],
+                    np.asarray(edges["dst"])[dst < 0],
+                ]
+            )
+        )
+        if len(missing):
+            vids = np.concatenate([vids.astype(object), missing.astype(object)])
+            src = pd.Index(vids).get_indexer(edges["src"])
+            dst = pd.Index(vids).get_indexer(edges["dst"])
+            node_attrs = _pad_columns(node_attrs, len(vids))
+        return cls.from_edges(
+            vids,
+            src,
+            dst,
+            (
+                typed_column(edge_keys(edges))
+                if "key_type" in edges
+                else np.asarray(edges["key"])
+            ),
+            {
+                name: np.asarray(values)
+                for name, values in edges.items()
+                if name not in KEY_COLUMNS
+            },
+            node_attrs,
+        )
+
+    @classmethod
+    def from_networkx(cls, g: nx.MultiDiGraph) -> "CompactGraph":
+        return cls.from_tables(graph_to_tables(g))
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.vids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    @property
+    def index(self) -> Dict:
+        """
+        vid to node index mapping, built on first use
+        """
+        if self._index is None:
+            self._index = {vid: i for i, vid in enumerate(self.vids.tolist())}
+        return self._index
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def sources(self) -> np.ndarray:
+        """
+        source node index of each edge, together with indices this is the edge
+        list in the form of e.g. igraph or torch_geometric
+        """
+        return np.repeat(
+            np.arange(self.num_nodes, dtype=np.int64), self.out_degree()
+        )
+
+    def to_scipy(self, weight: Optional[str] = None, dtype=np.float64):
+        """
+        the adjacency matrix as a scipy.sparse.csr_matrix, parallel edges are
+        summed up. Each edge weighs its weight attribute, or 1 when missing.
+        """
+        # scipy is only needed here, and imported on first use
+        try:
+            import scipy.sparse as sp
+        except ImportError:
+            raise ImportError(
+                "scipy is required for to_scipy(), pip install ng_nx[scipy]"
+            ) from None
+        data = np.ones(self.num_edges, dtype=dtype)
+        if weight is not None and weight in self.edge_attrs:
+            present = self.edge_attrs.get(PRESENT_PREFIX + weight)
+            if present is None:
+                data = self.edge_attrs[weight].astype(dtype)
+            else:
+                data[present] = self.edge_attrs[weight][present].astype(dtype)
+        matrix = sp.csr_matrix(
+            (data, self.indices, self.indptr),
+            shape=(self.num_nodes, self.num_nodes),
+        )
+        matrix.sum_duplicates()
+        return matrix
+
+    def to_tables(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        the node and edge tables of SnapshotCache
+        """
+        nodes = {"vid": self.vids}
+        nodes.update(self.node_attrs)
+        edges = {
+            "src": self.vids[self.sources()],
+            "dst": self.vids[self.indices],
+        }
+        if self.keys.dtype == object:
+            edges.update(key_columns(self.keys.tolist()))
+        else:
+            edges["key"] = self.keys
+        edges.update(self.edge_attrs)
+        return {"nodes": nodes, "edges": edges}
+
+    def to_networkx(self) -> nx.MultiDiGraph:
+        return tables_to_graph(self.to_tables())
+
+
+class CompactGraphBuilder:
+    """
+    collect the columns streamed by a reader, and relabel them into a
+    CompactGraph at once when built
+    """
+
+    def __init__(self):
+        self._nodes: List[Tuple[np.ndarray, Dict[str, np.ndarray]]] = []
+        self._edges: List[
+            Tuple[
+                np.ndarray, np.ndarray, Optional[np.ndarray], Dict[str, np.ndarray]
+            ]
+        ] = []
+
+    def add_nodes(self, vids: np.ndarray, attrs: Dict[str, np.ndarray]):
+        """
+        attributes of a node added more than once are merged, as in networkx
+        """
+        self._nodes.append((np.asarray(vids), attrs))
+
+    def add_edges(
+        self,
+        src: np.ndarray,
+        dst: np.ndarray,
+        attrs: Dict[str, np.ndarray],
+        edge_type: str,
+        keys: Optional[np.ndarray] = None,
+    ):
+        attrs = dict(attrs)
+        attrs["__type__"] = np.full(len(src), edge_type, dtype=object)
+        if keys is not None:
+            keys = typed_column(typed_keys(edge_type, np.asarray(keys).tolist()))
+        self._edges.append((np.asarray(src), np.asarray(dst), keys, attrs))
+
+    def build(self) -> CompactGraph:
+        # nodes first and then the interleaved edge ends, so that node indices
+        # follow the order in which networkx would have added them
+        parts = [vids for vids, _ in self._nodes]
+        for src, dst, _, _ in self._edges:
+            ends = np.empty(2 * len(src), dtype=np.result_type(src, dst))
+            ends[0::2], ends[1::2] = src, dst
+            parts.append(ends)
+        if not parts:
+            parts = [np.empty(0, dtype=object)]
+        codes, vids = pd.factorize(np.concatenate(parts))
+
+        offset = 0
+        node_chunks = []
+        for node_vids, attrs in self._nodes:
+            node_chunks.append((codes[offset : offset + len(node_vids)], attrs))
+            offset += len(node_vids)
+        src_codes, dst_codes, edge_chunks = [], [], []
+        position = 0
+        for src, _, _, attrs in self._edges:
+            ends = codes[offset : offset + 2 * len(src)]
+            src_codes.append(ends[0::2])
+            dst_codes.append(ends[1::2])
+            edge_chunks.append((slice(position, position + len(src)), attrs))
+            offset += 2 * len(src)
+            position += len(src)
+
+        src_idx = np.concatenate(src_codes or [np.empty(0, dtype=np.int64)])
+        dst_idx = np.concatenate(dst_codes or [np.empty(0, dtype=np.int64)])
+        if self._edges and all(keys is not None for _, _, keys, _ in self._edges):
+            keys = np.concatenate([keys for _, _, keys, _ in self._edges])
+        else:
+            # the keys networkx assigns: 0, 1, ... among edges of the same ends
+            keys = (
+                pd.DataFrame({"src": src_idx, "dst": dst_idx})
+                .groupby(["src", "dst"], sort=False)
+                .cumcount()
+                .to_numpy(dtype=np.int64)
+            )
+        return CompactGraph.from_edges(
+            vids,
+            src_idx,
+            dst_idx,
+            keys,
+            _merge_columns(edge_chunks, position),
+            _merge_columns(node_chunks, len(vids)),
+        )
+
+
+def check_output(
+    output_format: OutputFormat,
+    vid_map: Optional["VidMap"] = None,
+    cache: Optional[SnapshotCache] = None,
+):
+    """
+    validate the output options shared by the readers
+    """
+    assert output_format in (
+        "networkx",
+        "csr",
+    ), "output_format should be either networkx or csr"
+    assert (
+        vid_map is None or cache is None
+    ), "vid_map could not be used with cache, as the ids depend on the map"
+
+
+def read_cached(
+    cache: Optional[SnapshotCache],
+    key: Callable[[], str],
+    read: Callable[[], Any],
+    output_format: OutputFormat,
+) -> Union[nx.MultiDiGraph, CompactGraph]:
+    """
+    read() through the cache if any, in output_format, key is only called with
+    a cache
+    """
+    if cache is None:
+        return read()
+    if output_format == "csr":
+        return cache.read_through(
+            key(), read, CompactGraph.from_tables, CompactGraph.to_tables
+        )
+    return cache.read_through(key(), read)
+
+
+def empty_graph(
+    output_format: OutputFormat,
+) -> Union[nx.MultiDiGraph, CompactGraphBuilder]:
+    check_output(output_format)
+    return CompactGraphBuilder() if output_format == "csr" else nx.MultiDiGraph()
+
+
+def finish_graph(
+    g: Union[nx.MultiDiGraph, CompactGraphBuilder]
+) -> Union[nx.MultiDiGraph, CompactGraph]:
+    return g.build() if isinstance(g, CompactGraphBuilder) else g
@@ -0,0 +1,154 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2023 The NebulaGraph Authors. All rights reserved.
+
+from __future__ import annotations
+
+import sys
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+from nebula3.data.DataObject import Value, ValueWrapper
+from nebula3.data.ResultSet import ResultSet
+
+from ng_nx.profiling import NULL_PROFILER, Profiler
+
+# columns of vids in query results, whose strings are interned when decoded
+VID_COLUMNS = ("src", "dst", "vid")
+
+# TBD when https://github.com/vesoft-inc/nebula-python/pull/269 is merged
+# in a release version of nebula-python, I could leverage the ValueWrapper.cast()
+# method to simplify the code below
+cast_as = {
+    Value.NVAL: "as_null",
+    Value.BVAL: "as_bool",
+    Value.IVAL: "as_int",
+    Value.FVAL: "as_double",
+    Value.SVAL: "as_string",
+    Value.LVAL: "as_list",
+    Value.UVAL: "as_set",
+    Value.MVAL: "as_map",
+    Value.TVAL: "as_time",
+    Value.DVAL: "as_date",
+    Value.DTVAL: "as_datetime",
+    Value.VVAL: "as_node",
+    Value.EVAL: "as_relationship",
+    Value.PVAL: "as_path",
+    Value.GGVAL: "as_geography",
+    Value.DUVAL: "as_duration",
+}
+
+
+def cast(val: ValueWrapper):
+    _type = val._value.getType()
+    if _type == Value.__EMPTY__:
+        return None
+    if _type in cast_as:
+        return getattr(val, cast_as[_type])()
+    if _type == Value.LVAL:
+        return [x.cast() for x in val.as_list()]
+    if _type == Value.UVAL:
+        return {x.cast() for x in val.as_set()}
+    if _type == Value.MVAL:
+        return {k: v.cast() for k, v in val.as_map().items()}
+
+
+# homogeneous columns of these types are decoded in one pass to a typed array
+column_dtypes = {
+    Value.BVAL: np.bool_,
+    Value.IVAL: np.int64,
+    Value.FVAL: np.float64,
+}
+
+
+def _object_array(values: list) -> np.ndarray:
+    # assign one by one, so that list values are not broadcast to a 2-D array
+    arr = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        arr[i] = value
+    return arr
+
+
+def cast_column(
+    values: Sequence, decode_type: str = "utf-8", intern: bool = False
+) -> np.ndarray:
+    """
+    decode a whole column of Values(or ValueWrappers) to a NumPy array.
+
+    Homogeneous bool, int, double and string columns are read straight from the
+    thrift union without per value dispatch, mixed or nested columns fall back
+    to cast() per value into an object array. With intern, strings are interned
+    by sys.intern(), so that a vid repeated across rows(and batches) is held
+    once rather than once per row.
+    """
+    if len(values) > 0 and isinstance(values[0], ValueWrapper):
+        values = [val._value for val in values]
+    types = {val.getType() for val in values}
+    if len(types) == 1:
+        _type = types.pop()
+        if _type in column_dtypes:
+            # Value.value is the payload of the thrift union
+            return np.fromiter(
+                (val.value for val in values),
+                dtype=column_dtypes[_type],
+                count=len(values),
+            )
+        if _type == Value.SVAL:
+            arr = np.empty(len(values), dtype=object)
+            if intern:
+                arr[:] = [
+                    sys.intern(val.value.decode(decode_type)) for val in values
+                ]
+            else:
+                arr[:] = [val.value.decode(decode_type) for val in values]
+            return arr
+    return _object_array([cast(ValueWrapper(val, decode_type)) for val in values])
+
+
+def execute_query(
+    session, query: str, profiler: Profiler = NULL_PROFILER
+) -> ResultSet:
+    """
+    execute a query that should succeed, timed as a batch of the execute phase
+    along with the execution time reported by graphd
+    """
+    with profiler.phase("execute") as timing:
+        result = session.execute(query)
+        assert result.is_succeeded(), f"Query failed: {result.error_msg()}"
+        timing.rows = result.row_size()
+    profiler.record("graphd", result.latency() / 1e6)
+    return result
+
+
+def result_to_df(
+    result: ResultSet,
+    profiler: Profiler = NULL_PROFILER,
+    vid_columns: Sequence[str] = VID_COLUMNS,  # columns whose strings are interned
+) -> pd.DataFrame:
+    """
+    decode each column in one pass, and transform to dataframe
+    """
+    assert result.is_succeeded()
+    columns = result.keys()
+    rows = result.rows()
+    d: Dict[str, np.ndarray] = {}
+    with profiler.phase("decode"):
+        for col_num in range(result.col_size()):
+            col_name = columns[col_num]
+            d[col_name] = cast_column(
+                [row.values[col_num] for row in rows],
+                intern=col_name in vid_columns,
+            )
+    with profiler.phase("dataframe"):
+        return pd.DataFrame(
+            {
+                # interned vids are kept as objects rather than converted to a
+                # string array, from which every tolist() would copy them out
+                name: (
+                    pd.Series(values, dtype=object, copy=False)
+                    if name in vid_columns and values.dtype == object
+                    else values
+                )
+                for name, values in d.items()
+            }
+        )
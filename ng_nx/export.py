@@ -0,0 +1,291 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import datetime
+import json
+import os
+import threading
+from typing import Any, Dict, List, Literal, Optional
+
+import numpy as np
+
+from ng_nx.profiling import NULL_PROFILER, Profiler
+
+# pyarrow is only needed by the exports, it is imported by _require_pyarrow()
+# on first use, so that importing the readers does not load it
+pa: Any = None
+pq: Any = None
+
+ExportFormat = Literal["parquet", "arrow"]
+
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+MANIFEST = "manifest.json"
+# rows buffered per file before written as a row group(or record batch)
+ROW_GROUP_SIZE = 100000
+
+# NebulaGraph property types to Arrow type names, types not listed here(e.g.
+# date, datetime, duration, geography) are exported as their string form
+ARROW_TYPES = {
+    "bool": "bool",
+    "int8": "int8",
+    "int16": "int16",
+    "int32": "int32",
+    "int64": "int64",
+    "int": "int64",
+    "timestamp": "int64",
+    "float": "float64",
+    "double": "float64",
+    "string": "string",
+    "fixed_string": "string",
+}
+
+
+def _require_pyarrow():
+    global pa, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "pyarrow is required for exports, pip install ng_nx[arrow]"
+        ) from None
+    pq = pyarrow.parquet
+    pa = pyarrow
+
+
+def arrow_type(nebula_type: str) -> "pa.DataType":
+    """
+    the Arrow type of a NebulaGraph property type, e.g. "fixed_string(32)"
+    """
+    _require_pyarrow()
+    name = nebula_type.split("(", 1)[0].strip().lower()
+    return pa.type_for_alias(ARROW_TYPES.get(name, "string"))
+
+
+def _arrow_array(values: np.ndarray, type: Optional["pa.DataType"]) -> "pa.Array":
+    if type is None:
+        # vids, int64 or strings as the vid type of the space
+        type = pa.int64() if values.dtype.kind in "iu" else pa.string()
+    if pa.types.is_string(type) and values.dtype == object:
+        values = [
+            value if value is None or isinstance(value, str) else str(value)
+            for value in values.tolist()
+        ]
+    return pa.array(values, type=type, from_pandas=True)
+
+
+class ExportFile:
+    """
+    one Parquet or Arrow IPC file written batch by batch, rows are buffered up
+    to row_group_size, so that memory does not grow with the file. The file is
+    created with the first rows written.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        file_format: ExportFormat,
+        types: Dict[str, Optional["pa.DataType"]],  # None for vid columns
+        row_group_size: int = ROW_GROUP_SIZE,
+        profiler: Profiler = NULL_PROFILER,
+    ):
+        _require_pyarrow()
+        self.path = path
+        self.file_format = file_format
+        self.types = types
+        self.row_group_size = row_group_size
+        self.profiler = profiler
+        self.rows = 0
+        self.schema: Optional["pa.Schema"] = None
+        self._buffer: List["pa.RecordBatch"] = []
+        self._buffered = 0
+        self._sink = None
+        self._writer = None
+
+    def write(self, columns: Dict[str, np.ndarray]):
+        size = len(next(iter(columns.values())))
+        if size == 0:
+            return
+        arrays = [
+            _arrow_array(columns[name], type) for name, type in self.types.items()
+        ]
+        batch = pa.RecordBatch.from_arrays(arrays, names=list(self.types))
+        if self.schema is None:
+            self.schema = batch.schema
+        self._buffer.append(batch)
+        self._buffered += size
+        self.rows += size
+        if self._buffered >= self.row_group_size:
+            self._flush()
+
+    def close(self) -> int:
+        """
+        write the rows buffered and close the file, return the number of rows
+        """
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        return self.rows
+
+    def schema_types(self) -> Optional[Dict[str, str]]:
+        """
+        the column types of the file, None before any row is written
+        """
+        if self.schema is None:
+            return None
+        return {field.name: str(field.type) for field in self.schema}
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        with self.profiler.phase("write"):
+            table = pa.Table.from_batches(self._buffer, schema=self.schema)
+            if self._writer is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                if self.file_format == "parquet":
+                    self._writer = pq.ParquetWriter(self.path, self.schema)
+                else:
+                    self._sink = pa.OSFile(self.path, "wb")
+                    self._writer = pa.ipc.new_file(self._sink, self.schema)
+            if self.file_format == "parquet":
+                self._writer.write_table(table, row_group_size=len(table))
+            else:
+                self._writer.write_table(table, max_chunksize=len(table))
+        self._buffer = []
+        self._buffered = 0
+
+
+class ExportManifest:
+    """
+    what an export holds, saved as manifest.json in its directory once all of
+    the files are written:
+
+        {"space": ..., "format": "parquet", "reader": "NebulaScanReader",
+         "created_at": ..., "edges": {"follow": {"properties": [...],
+         "rows": 81, "schema": {"src": "string", ...}, "files": [{"path":
+         "edges/follow/part-00001.parquet", "part": 1, "rows": 9}, ...]}},
+         "vertices": {...}}
+    """
+
+    def __init__(
+        self, path: str, space: str, file_format: ExportFormat, reader: str
+    ):
+        self.path = path
+        self.data: Dict[str, Any] = {
+            "space": space,
+            "format": file_format,
+            "reader": reader,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "edges": {},
+            "vertices": {},
+        }
+        self._lock = threading.Lock()
+
+    def file_path(self, kind: str, name: str, part: int) -> str:
+        """
+        the path of the file of a partition of an edge type(or tag)
+        """
+        directory = "edges" if kind == "edge" else "vertices"
+        extension = EXTENSIONS[self.data["format"]]
+        return os.path.join(
+            self.path, directory, name, f"part-{part:05d}.{extension}"
+        )
+
+    def add(
+        self,
+        kind: str,
+        name: str,
+        properties: List[str],
+        part: int,
+        file_path: str,
+        rows: int,
+        schema: Optional[Dict[str, str]],
+    ):
+        """
+        record a file written, files without rows are left out
+        """
+        key = "edges" if kind == "edge" else "vertices"
+        with self._lock:
+            entry = self.data[key].setdefault(
+                name,
+                {
+                    "properties": list(properties),
+                    "rows": 0,
+                    "schema": None,
+                    "files": [],
+                },
+            )
+            if rows == 0:
+                return
+            entry["rows"] += rows
+            if entry["schema"] is None:
+                entry["schema"] = schema
+            entry["files"].append(
+                {
+                    "path": os.path.relpath(file_path, self.path),
+                    "part": part,
+                    "rows": rows,
+                }
+            )
+            entry["files"].sort(key=lambda f: f["part"])
+
+    def save(self) -> Dict[str, Any]:
+        # written aside and renamed, so that a manifest is never partial
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(path + ".tmp", path)
+        return self.data
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def load_export(
+    path: str,
+    edge: Optional[str] = None,
+    tag: Optional[str] = None,
+    parts: Optional[List[int]] = None,
+    columns: Optional[List[str]] = None,
+) -> "pa.Table":
+    """
+    load one edge type(or tag) of an export as an Arrow table, optionally only
+    some of the partitions and columns. Files are memory-mapped, Arrow IPC
+    files without a copy.
+    """
+    _require_pyarrow()
+    assert (edge is None) != (tag is None), "either edge or tag should be given"
+    manifest = load_manifest(path)
+    entries = manifest["edges"] if edge is not None else manifest["vertices"]
+    name = edge if edge is not None else tag
+    assert name in entries, f"{name} is not in the export {path}"
+    entry = entries[name]
+    tables = []
+    for file in entry["files"]:
+        if parts is not None and file["part"] not in parts:
+            continue
+        file_path = os.path.join(path, file["path"])
+        if manifest["format"] == "parquet":
+            tables.append(
+                pq.read_table(file_path, columns=columns, memory_map=True)
+            )
+        else:
+            table = pa.ipc.open_file(pa.memory_map(file_path)).read_all()
+            tables.append(table.select(columns) if columns is not None else table)
+    if not tables:
+        schema = pa.schema(
+            [
+                (column, pa.type_for_alias(type))
+                for column, type in (entry["schema"] or {}).items()
+                if columns is None or column in columns
+            ]
+        )
+        return schema.empty_table()
+    return pa.concat_tables(tables)
@@ -0,0 +1,306 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import functools
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# an observer is called with each event recorded, a dict with the keys:
+# - event: "start", "phase", "count" or "finish"
+# - operation: e.g. "NebulaReader.read"
+# - name, seconds and rows of a phase, name and value of a count, and
+#   summary of finish
+Observer = Callable[[Dict[str, Any]], None]
+
+
+class Timing:
+    """
+    a phase being timed, rows may be set within the phase, so that it is also
+    recorded as a batch of that many rows
+    """
+
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows: Optional[int] = None
+
+    def __enter__(self) -> "Timing":
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class Profiler:
+    """
+    record where the time of reads and writes goes, by phase, e.g.:
+    - execute: graphd queries or storaged scans, including network transfer
+    - graphd: the execution time reported by graphd, execute minus graphd is
+      mostly network transfer
+    - decode: Values decoded into columns
+    - dataframe: DataFrames built from the columns
+    - build: the graph built from the columns
+    - format, schema: INSERT statements and property types of NebulaWriter
+    along with counts(edges, and bytes sent by NebulaWriter, readers could not
+    tell the bytes received from nebula3), the latencies of batches
+    (queries, scanned batches, INSERTs) and optionally the peak memory traced by
+    tracemalloc, which slows things down considerably.
+
+    A profiler records one read or write at a time, and is thread safe within
+    it. Readers and writers keep the summary of their last call in
+    last_profile.
+    """
+
+    enabled = True
+
+    def __init__(
+        self,
+        observers: Optional[List[Observer]] = None,
+        trace_memory: bool = False,  # peak memory by tracemalloc
+    ):
+        self.observers = list(observers or [])
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._reset(None)
+
+    def _reset(self, operation: Optional[str]):
+        self.operation = operation
+        self._started = time.perf_counter()
+        self._phases: Dict[str, List[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._batches: Dict[str, List[tuple]] = {}
+        self._traced = False
+
+    def start(self, operation: str):
+        """
+        begin recording an operation, nested operations(e.g. refresh() reading
+        the graph first) are recorded as part of the outermost one
+        """
+        with self._lock:
+            self._depth += 1
+            if self._depth > 1:
+                return
+            self._reset(operation)
+            if self.trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._traced = True
+        self._notify({"event": "start", "operation": operation})
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """
+        end the operation, return its summary, or None for a nested operation
+        """
+        with self._lock:
+            self._depth -= 1
+            if self._depth > 0:
+                return None
+            peak = None
+            if self._traced:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self._traced = False
+        summary = self.summary()
+        summary["peak_memory_bytes"] = peak
+        self._notify(
+            {"event": "finish", "operation": self.operation, "summary": summary}
+        )
+        return summary
+
+    def phase(self, name: str) -> "_Phase":
+        """
+        time a with block as the phase name
+        """
+        return _Phase(self, name)
+
+    def record(self, name: str, seconds: float, rows: Optional[int] = None):
+        """
+        add time measured elsewhere to the phase name
+        """
+        with self._lock:
+            self._phases.setdefault(name, []).append(seconds)
+            if rows is not None:
+                self._batches.setdefault(name, []).append((seconds, rows))
+        self._notify(
+            {
+                "event": "phase",
+                "operation": self.operation,
+                "name": name,
+                "seconds": seconds,
+                "rows": rows,
+            }
+        )
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + value
+        self._notify(
+            {
+                "event": "count",
+                "operation": self.operation,
+                "name": name,
+                "value": value,
+            }
+        )
+
+    def merge(self, stats: Dict[str, Any]):
+        """
+        add the stats of another profiler, e.g. of a worker process
+        """
+        for name, seconds in stats["phases"].items():
+            for s in seconds:
+                self.record(name, s)
+        for name, batches in stats["batches"].items():
+            with self._lock:
+                self._batches.setdefault(name, []).extend(batches)
+        for name, value in stats["counts"].items():
+            self.count(name, value)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        the raw phases, counts and batches recorded, which could be merged
+        """
+        with self._lock:
+            return {
+                "phases": {name: list(s) for name, s in self._phases.items()},
+                "counts": dict(self._counts),
+                "batches": {name: list(b) for name, b in self._batches.items()},
+            }
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        a plain dict of the operation recorded so far
+        """
+        stats = self.stats()
+        batches = {}
+        for name, recorded in stats["batches"].items():
+            latencies = np.array([seconds for seconds, _ in recorded])
+            batches[name] = {
+                "count": len(recorded),
+                "rows": sum(rows for _, rows in recorded),
+                "seconds": float(latencies.sum()),
+                "min": float(latencies.min()),
+                "p50": float(np.percentile(latencies, 50)),
+                "p99": float(np.percentile(latencies, 99)),
+                "max": float(latencies.max()),
+            }
+        return {
+            "operation": self.operation,
+            "seconds": time.perf_counter() - self._started,
+            "phases": {
+                name: {"seconds": sum(seconds), "calls": len(seconds)}
+                for name, seconds in stats["phases"].items()
+            },
+            "counts": stats["counts"],
+            "batches": batches,
+            "peak_memory_bytes": None,
+        }
+
+    def _notify(self, event: Dict[str, Any]):
+        for observer in self.observers:
+            observer(event)
+
+
+class _Phase(Timing):
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler: Profiler, name: str):
+        super().__init__()
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> "_Phase":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(
+            self.name, time.perf_counter() - self.started, self.rows
+        )
+
+
+class NullProfiler(Profiler):
+    """
+    the profiler of readers and writers not being profiled, which records
+    nothing, at the cost of a method call per phase
+    """
+
+    enabled = False
+
+    def __init__(self):
+        self.observers = []
+        self.trace_memory = False
+        self.operation = None
+        self._timing = Timing()
+
+    def start(self, operation: str):
+        pass
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        return None
+
+    def phase(self, name: str) -> Timing:
+        return self._timing
+
+    def record(self, name: str, seconds: float, rows: Optional[int] = None):
+        pass
+
+    def count(self, name: str, value: int = 1):
+        pass
+
+    def merge(self, stats: Dict[str, Any]):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"phases": {}, "counts": {}, "batches": {}}
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def profiled(method: Callable) -> Callable:
+    """
+    record each call of a method of a reader or writer with its profiler as
+    "<class>.<method>", keeping the summary in last_profile
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if not profiler.enabled:
+            return method(self, *args, **kwargs)
+        profiler.start(f"{type(self).__name__}.{method.__name__}")
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            summary = profiler.finish()
+            if summary is not None:
+                self.last_profile = summary
+
+    return wrapper
+
+
+def profiled_iter(method: Callable[..., Iterator]) -> Callable[..., Iterator]:
+    """
+    profiled() of a generator method, recorded until it is exhausted or closed
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if not profiler.enabled:
+            yield from method(self, *args, **kwargs)
+            return
+        profiler.start(f"{type(self).__name__}.{method.__name__}")
+        try:
+            yield from method(self, *args, **kwargs)
+        finally:
+            summary = profiler.finish()
+            if summary is not None:
+                self.last_profile = summary
+
+    return wrapper
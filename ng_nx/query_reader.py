@@ -1,13 +1,94 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2024 The NebulaGraph Authors. All rights reserved.
 
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
 import networkx as nx
+import numpy as np
 import pandas as pd
-from nebula3.Config import Config
-from nebula3.gclient.net import ConnectionPool
+from nebula3.common.ttypes import Row, Value, Vertex
+from nebula3.data.DataObject import ValueWrapper
 from nebula3.data.ResultSet import ResultSet
 
-from ng_nx.utils import NebulaGraphConfig, result_to_df
+from ng_nx.cache import SnapshotCache, attr_columns, typed_column
+from ng_nx.compact import (
+    CompactGraph,
+    CompactGraphBuilder,
+    OutputFormat,
+    check_output,
+    empty_graph,
+    finish_graph,
+    read_cached,
+)
+from ng_nx.decoding import execute_query, result_to_df
+from ng_nx.export import (
+    EXTENSIONS,
+    ROW_GROUP_SIZE,
+    ExportFile,
+    ExportFormat,
+    ExportManifest,
+    arrow_type,
+)
+from ng_nx.profiling import NULL_PROFILER, Profiler, profiled, profiled_iter
+from ng_nx.sampling import Sampling
+from ng_nx.session import MAX_SESSIONS, NebulaSessionManager
+from ng_nx.utils import (
+    NebulaGraphConfig,
+    add_edges_from_columns,
+    remove_out_edges,
+    to_literal,
+    upsert_edges,
+)
+from ng_nx.vids import VidMap, encode_vids
+
+# number of vertices per query when refreshing the out edges of vertices
+REFRESH_VERTEX_BATCH = 1000
+# number of pages of each edge type fetched ahead of those added to the graph
+PAGES_AHEAD = 2
+# nGQL expression identifying an edge, hashed by sampling, of an edge variable
+EDGE_IDENTITY = (
+    'concat(toString(src({edge})), "|", toString(dst({edge})), "|",'
+    " toString(rank({edge})))"
+)
+# columns that count sampling sorts edges by, the lowest hashes being kept
+SAMPLE_ORDER = ["__sample__", "src", "dst", "__rank__"]
+
+
+def _frontier_batches(
+    vids: List[Any], degrees: List[int], page_size: int
+) -> Iterator[List[Any]]:
+    """
+    batches of vids one after another, each with at most page_size out edges
+    in total by degrees, or of only one vertex having more
+    """
+    batch: List[Any] = []
+    size = 0
+    for vid, degree in zip(vids, degrees):
+        if batch and size + degree > page_size:
+            yield batch
+            batch = []
+            size = 0
+        batch.append(vid)
+        size += degree
+    if batch:
+        yield batch
+
+
+def _lowest(
+    sample: Optional[pd.DataFrame], df: pd.DataFrame, count: int
+) -> pd.DataFrame:
+    """
+    the count edges of the lowest sample hashes of sample and df, the same as
+    ORDER BY SAMPLE_ORDER LIMIT count over all of them
+    """
+    if sample is not None:
+        df = pd.concat([sample, df], ignore_index=True)
+    return df.sort_values(SAMPLE_ORDER, kind="stable", ignore_index=True).head(
+        count
+    )
 
 
 class NebulaReader:
@@ -15,140 +96,754 @@ class NebulaReader:
         self,
         edges: list,
         properties: list,
-        nebula_config: NebulaGraphConfig,
-        limit: int,
+        nebula_config: Union[NebulaGraphConfig, NebulaSessionManager],
+        limit: Optional[int],  # None to read all edges of each edge type
         with_rank: bool = False,  # this enable the multi-graph, and the edge_key is "__rank__"
+        page_size: Optional[int] = None,  # fetch edge types in pages of this size
+        concurrency: int = 1,  # number of edge types queried at the same time
+        cache: Optional[SnapshotCache] = None,
+        output_format: OutputFormat = "networkx",  # or "csr" for a CompactGraph
+        sampling: Optional[Sampling] = None,  # sample each edge type
+        profiler: Optional[Profiler] = None,  # record where the time goes
+        vid_map: Optional[VidMap] = None,  # nodes are dense integer ids of vids
     ):
         self.edges = edges
         self.properties = properties
         self.limit = limit
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.cache = cache
+        self.output_format = output_format
+        self.sampling = sampling
+        self.profiler = profiler or NULL_PROFILER
+        self.vid_map = vid_map
+        # the summary of the profiler of the last read() or refresh()
+        self.last_profile: Optional[Dict[str, Any]] = None
 
-        config = Config()
-        graphd_hosts = nebula_config.graphd_hosts.split(",")
-        graphd_host_list = [
-            (host.split(":")[0], int(host.split(":")[1])) for host in graphd_hosts
-        ]
+        # a manager given is shared with others, and not closed by release()
+        self._own_sessions = not isinstance(nebula_config, NebulaSessionManager)
+        # one session per worker, each holding its own connection
+        self.sessions = NebulaSessionManager.of(
+            nebula_config, max_sessions=max(MAX_SESSIONS, concurrency)
+        )
+        nebula_config = self.sessions.config
+        self.graphd_hosts = nebula_config.graphd_hosts
         self.space = nebula_config.space
         self.nebula_user = nebula_config.user
         self.nebula_password = nebula_config.password
-        self.connection_pool = ConnectionPool()
-        assert self.connection_pool.init(
-            graphd_host_list, config
-        ), "Init Connection Pool Failed"
         assert len(edges) > 0 and len(edges) == len(
             properties
         ), "edges and properties should have the same length"
+        assert (
+            page_size is None or page_size > 0
+        ), "page_size should be a positive integer"
+        assert concurrency >= 1, "concurrency should be a positive integer"
+        check_output(output_format, vid_map, cache)
+        assert (
+            sampling is None or sampling.part_fraction is None
+        ), "part_fraction only applies to NebulaScanReader"
         self.with_rank = with_rank
 
-    def read(self):
-        with self.connection_pool.session_context(
-            self.nebula_user, self.nebula_password
-        ) as session:
-            assert session.execute(
-                f"USE {self.space}"
-            ).is_succeeded(), f"Failed to use space {self.space}"
-            result_list = []
-            g = nx.MultiDiGraph()
+    @profiled
+    def read(self) -> Union[nx.MultiDiGraph, CompactGraph]:
+        """
+        read the edges into a nx.MultiDiGraph, or a CompactGraph when
+        output_format is "csr"
+        """
+        return read_cached(
+            self.cache, self.cache_key, self._read, self.output_format
+        )
+
+    def cache_key(self) -> str:
+        return SnapshotCache.key(
+            reader="NebulaReader",
+            graphd_hosts=self.graphd_hosts,
+            space=self.space,
+            edges=self.edges,
+            properties=self.properties,
+            limit=self.limit,
+            with_rank=self.with_rank,
+            sampling=vars(self.sampling) if self.sampling else None,
+        )
+
+    def _read(self) -> Union[nx.MultiDiGraph, CompactGraph]:
+        if self.concurrency > 1:
+            return self._read_concurrently()
+
+        with self.sessions.session() as session:
+            g = empty_graph(self.output_format)
             for i in range(len(self.edges)):
-                edge = self.edges[i]
-                properties = self.properties[i]
-                properties_query_field = ""
-                for property in properties:
-                    properties_query_field += f", e.{property} AS {property}"
-                if self.with_rank:
-                    properties_query_field += ", rank(e) AS `__rank__`"
-                result = session.execute(
-                    f"MATCH ()-[e:`{edge}`]->() RETURN src(e) AS src, dst(e) AS dst{properties_query_field} LIMIT {self.limit}"
+                for _df in self._iter_edge_dfs(session, i, self.page_size):
+                    with self.profiler.phase("build"):
+                        self._add_edges(g, _df, i)
+            with self.profiler.phase("build"):
+                return finish_graph(g)
+
+    def _read_concurrently(self) -> Union[nx.MultiDiGraph, CompactGraph]:
+        """
+        query the edge types on a thread pool, each worker with its own session,
+        which the connection pool spreads across the graphd hosts. Pages are
+        merged in the order of self.edges, the same as the sequential path, those
+        of the edge type being merged as soon as they arrive.
+        A worker waits once PAGES_AHEAD pages of its edge type are not merged
+        yet, so that at most concurrency * (PAGES_AHEAD + 1) pages are held.
+        Workers start in the order of self.edges, so the edge type merged is
+        always fetched by a running worker.
+        """
+        g = empty_graph(self.output_format)
+        pages: List[queue.Queue] = [
+            queue.Queue(maxsize=PAGES_AHEAD) for _ in self.edges
+        ]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [
+                pool.submit(self._put_edge_dfs, pages[i], i)
+                for i in range(len(self.edges))
+            ]
+            for i, future in enumerate(futures):
+                # None marks the end of the pages of an edge type
+                _df = pages[i].get()
+                while _df is not None:
+                    with self.profiler.phase("build"):
+                        self._add_edges(g, _df, i)
+                    _df = pages[i].get()
+                future.result()
+        with self.profiler.phase("build"):
+            return finish_graph(g)
+
+    def _put_edge_dfs(self, pages: queue.Queue, i: int):
+        try:
+            with self.sessions.session() as session:
+                for df in self._iter_edge_dfs(session, i, self.page_size):
+                    pages.put(df)
+        finally:
+            pages.put(None)
+
+    def _add_edges(
+        self,
+        g: Union[nx.MultiDiGraph, CompactGraphBuilder],
+        df: pd.DataFrame,
+        i: int,
+    ):
+        """
+        add the edges of the i-th edge type to g in place
+        """
+        self.profiler.count("edges", len(df))
+        src = encode_vids(self.vid_map, df["src"].to_numpy())
+        dst = encode_vids(self.vid_map, df["dst"].to_numpy())
+        if isinstance(g, CompactGraphBuilder):
+            attrs = {prop: df[prop].to_numpy() for prop in self.properties[i]}
+            keys = None
+            if self.with_rank:
+                keys = attrs["__rank__"] = df["__rank__"].to_numpy()
+            g.add_edges(
+                src,
+                dst,
+                attrs,
+                self.edges[i],
+                keys=keys,
+            )
+            return
+        attrs = {prop: df[prop].tolist() for prop in self.properties[i]}
+        keys = None
+        if self.with_rank:
+            keys = df["__rank__"].tolist()
+            attrs["__rank__"] = keys
+        add_edges_from_columns(
+            g,
+            src.tolist(),
+            dst.tolist(),
+            attrs,
+            keys=keys,
+            edge_type=self.edges[i],
+        )
+
+    @profiled
+    def refresh(
+        self,
+        g: Optional[nx.MultiDiGraph] = None,
+        watermark_property: Optional[str] = None,
+        since: Any = None,
+        vertices: Optional[List] = None,
+    ) -> nx.MultiDiGraph:
+        """
+        bring a previously read graph up to date in place, by fetching either:
+        - the edges whose watermark_property is greater than since, which are
+          inserted or updated. Deleted edges could not be seen this way.
+        - all the out edges of the given vertices, which replace those in g, so
+          that inserts, updates and deletes are all applied.
+        With both, only the changed out edges of the vertices are upserted.
+
+        g defaults to the cached snapshot(or a full read), the cache is updated
+        with the refreshed graph.
+        """
+        assert (watermark_property is None) == (
+            since is None
+        ), "watermark_property and since should be given together"
+        assert (
+            watermark_property is not None or vertices is not None
+        ), "either a watermark or vertices should be given"
+        assert (
+            self.output_format == "networkx"
+        ), "only graphs of the networkx output format could be refreshed"
+        assert self.sampling is None, "sampled graphs could not be refreshed"
+        if g is None:
+            g = self.read()
+
+        conditions = []
+        if watermark_property is not None:
+            conditions.append(f"e.{watermark_property} > {to_literal(since)}")
+        vertex_chunks: List[Optional[List]] = [None]
+        if vertices is not None:
+            vertices = list(vertices)
+            vertex_chunks = [
+                vertices[j : j + REFRESH_VERTEX_BATCH]
+                for j in range(0, len(vertices), REFRESH_VERTEX_BATCH)
+            ]
+
+        with self.sessions.session() as session:
+            for i, edge in enumerate(self.edges):
+                for chunk in vertex_chunks:
+                    where = list(conditions)
+                    if chunk is not None:
+                        ids = ", ".join(to_literal(vid) for vid in chunk)
+                        where.append(f"id(v) IN [{ids}]")
+                    query = self._match_query(i, where=" AND ".join(where))
+                    result = execute_query(session, query, self.profiler)
+                    df = result_to_df(result, self.profiler)
+                    if watermark_property is not None and not self.with_rank:
+                        df = self._edges_between(session, i, df)
+                    with self.profiler.phase("build"):
+                        src = encode_vids(self.vid_map, df["src"].to_numpy())
+                        dst = encode_vids(self.vid_map, df["dst"].to_numpy())
+                        attrs = {
+                            prop: df[prop].tolist() for prop in self.properties[i]
+                        }
+                        keys = None
+                        if self.with_rank:
+                            keys = attrs["__rank__"] = df["__rank__"].tolist()
+                        if watermark_property is None:
+                            vids = np.asarray(chunk, dtype=object)
+                            remove_out_edges(
+                                g, encode_vids(self.vid_map, vids).tolist(), edge
+                            )
+                            add_edges_from_columns(
+                                g,
+                                src.tolist(),
+                                dst.tolist(),
+                                attrs,
+                                keys=keys,
+                                edge_type=edge,
+                            )
+                        else:
+                            upsert_edges(
+                                g,
+                                src.tolist(),
+                                dst.tolist(),
+                                attrs,
+                                edge,
+                                keys=keys,
+                            )
+                    self.profiler.count("edges", len(df))
+
+        if self.cache is not None:
+            self.cache.save_graph(self.cache_key(), g)
+        return g
+
+    def _edges_between(self, session, i: int, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        all the edges of the i-th edge type between the src and dst of any edge
+        in df. Without with_rank, parallel edges in g could not be told apart, so
+        those of a changed edge are all upserted together.
+        """
+        pairs = list(dict.fromkeys(zip(df["src"].tolist(), df["dst"].tolist())))
+        dfs = [df.iloc[:0]]
+        for j in range(0, len(pairs), REFRESH_VERTEX_BATCH):
+            batch = pairs[j : j + REFRESH_VERTEX_BATCH]
+            srcs = ", ".join(
+                to_literal(vid) for vid in dict.fromkeys(u for u, _ in batch)
+            )
+            dsts = ", ".join(
+                to_literal(vid) for vid in dict.fromkeys(v for _, v in batch)
+            )
+            query = self._match_query(
+                i, where=f"id(v) IN [{srcs}] AND dst(e) IN [{dsts}]"
+            )
+            result = execute_query(session, query, self.profiler)
+            found = result_to_df(result, self.profiler)
+            wanted = set(batch)
+            keep = [
+                pair in wanted
+                for pair in zip(found["src"].tolist(), found["dst"].tolist())
+            ]
+            dfs.append(found[keep])
+        with self.profiler.phase("dataframe"):
+            return pd.concat(dfs, ignore_index=True)
+
+    def _match_query(
+        self, i: int, limit: Optional[int] = None, where: Optional[str] = None
+    ) -> str:
+        """
+        the MATCH query of the whole i-th edge type, or of the edges satisfying
+        where, sorted by SAMPLE_ORDER in count sampling
+        """
+        edge = self.edges[i]
+        conditions = [where] if where else []
+        if self.sampling is not None and self.sampling.fraction is not None:
+            # sampled by the hash of the edge, evaluated by graphd
+            identity = EDGE_IDENTITY.format(edge="e")
+            conditions.append(self.sampling.hash_condition(identity))
+        fields = self._fields(i, "e", [f"e.{prop}" for prop in self.properties[i]])
+        if conditions:
+            query = (
+                f"MATCH (v)-[e:`{edge}`]->() WHERE {' AND '.join(conditions)}"
+                f" RETURN {fields}"
+            )
+        else:
+            query = f"MATCH ()-[e:`{edge}`]->() RETURN {fields}"
+        if self.sampling is not None and self.sampling.count is not None:
+            query += " ORDER BY " + ", ".join(f"`{name}`" for name in SAMPLE_ORDER)
+        if limit is not None:
+            query += f" LIMIT {limit}"
+        return query
+
+    def _go_query(self, i: int, vids: List[Any]) -> str:
+        """
+        the GO query of the out edges of the i-th edge type of vids
+        """
+        edge = self.edges[i]
+        query = (
+            f"GO FROM {', '.join(to_literal(vid) for vid in vids)} OVER `{edge}`"
+        )
+        if self.sampling is not None and self.sampling.fraction is not None:
+            identity = EDGE_IDENTITY.format(edge="edge")
+            query += f" WHERE {self.sampling.hash_condition(identity)}"
+        properties = [f"`{edge}`.{prop}" for prop in self.properties[i]]
+        return query + f" YIELD {self._fields(i, 'edge', properties)}"
+
+    def _fields(self, i: int, variable: str, properties: List[str]) -> str:
+        """
+        the fields returned(or yielded) of the edges of the i-th edge type, as
+        variable, with properties as the expressions of self.properties[i]
+        """
+        fields = f"src({variable}) AS src, dst({variable}) AS dst"
+        for prop, expression in zip(self.properties[i], properties):
+            fields += f", {expression} AS {prop}"
+        # the rank is always returned, as count sampling sorts by it
+        fields += f", rank({variable}) AS `__rank__`"
+        if self.sampling is not None and self.sampling.count is not None:
+            # sampled by the lowest hashes of the edges
+            identity = EDGE_IDENTITY.format(edge=variable)
+            fields += f", {self.sampling.hash_expression(identity)} AS `__sample__`"
+        return fields
+
+    def _out_degrees(self, session, i: int) -> pd.DataFrame:
+        """
+        the vids having out edges of the i-th edge type, sorted, along with the
+        number of them as __degree__
+        """
+        query = (
+            f"MATCH ()-[e:`{self.edges[i]}`]->()"
+            " RETURN src(e) AS src, count(*) AS `__degree__`"
+        )
+        result = execute_query(session, query, self.profiler)
+        df = result_to_df(result, self.profiler)
+        with self.profiler.phase("dataframe"):
+            return df.sort_values("src", ignore_index=True)
+
+    def _empty_df(self, i: int) -> pd.DataFrame:
+        columns = ["src", "dst"] + list(self.properties[i]) + ["__rank__"]
+        return pd.DataFrame({col: np.empty(0, dtype=object) for col in columns})
+
+    def _iter_edge_dfs(
+        self, session, i: int, page_size: Optional[int]
+    ) -> Iterator[pd.DataFrame]:
+        """
+        fetch one edge type as DataFrames, one per page of page_size, or only
+        one with no page_size. At least one DataFrame is yielded, even empty.
+        Each result is converted to a DataFrame as soon as it arrives so that no
+        ResultSet is kept around.
+
+        Pages are fetched by frontier: the vids having out edges are listed once
+        with their out degrees, and each page is a GO from a batch of them of
+        at most page_size out edges. graphd then only reads the out edges of the
+        vertices of a page, rather than going through the edge type again for
+        every page. In count sampling, the edges of the lowest hashes are kept
+        across pages, and yielded once at the end.
+        """
+        limit = self.limit
+        count_sampling = (
+            self.sampling is not None and self.sampling.count is not None
+        )
+        if count_sampling:
+            limit = (
+                self.sampling.count
+                if limit is None
+                else min(limit, self.sampling.count)
+            )
+        if page_size is None:
+            result = execute_query(
+                session, self._match_query(i, limit=limit), self.profiler
+            )
+            yield result_to_df(result, self.profiler)
+            return
+
+        degrees = self._out_degrees(session, i)
+        batches = _frontier_batches(
+            degrees["src"].tolist(), degrees["__degree__"].tolist(), page_size
+        )
+        del degrees
+        fetched = 0
+        sample = None
+        for vids in batches:
+            if limit is not None and fetched >= limit and not count_sampling:
+                break
+            result = execute_query(session, self._go_query(i, vids), self.profiler)
+            df = result_to_df(result, self.profiler)
+            del result
+            if count_sampling:
+                with self.profiler.phase("dataframe"):
+                    sample = _lowest(sample, df, limit)
+                continue
+            if limit is not None:
+                df = df.iloc[: limit - fetched]
+            fetched += len(df)
+            yield df
+            del df
+        if count_sampling:
+            yield self._empty_df(i) if sample is None else sample
+        elif fetched == 0:
+            yield self._empty_df(i)
+
+    @profiled
+    def export(
+        self,
+        path: str,
+        file_format: ExportFormat = "parquet",
+        row_group_size: int = ROW_GROUP_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        stream the edges into one Parquet(or Arrow IPC) file per edge type under
+        path, page by page(of page_size, or row_group_size by default), so that
+        memory does not grow with the edges. Pages are fetched by frontier as in
+        _iter_edge_dfs(), the rows of each file are grouped by src.
+        A manifest.json records the files, rows and schema of each, which
+        load_export() reads back. Return the manifest.
+        """
+        assert file_format in EXTENSIONS, "file_format should be parquet or arrow"
+        manifest = ExportManifest(path, self.space, file_format, "NebulaReader")
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [
+                pool.submit(self._export_edge, manifest, i, row_group_size)
+                for i in range(len(self.edges))
+            ]
+            for future in futures:
+                future.result()
+        return manifest.save()
+
+    def _export_edge(self, manifest: ExportManifest, i: int, row_group_size: int):
+        edge = self.edges[i]
+        # edge types are not partitioned by queries, all go to part 0
+        file_path = manifest.file_path("edge", edge, 0)
+        with self.sessions.session() as session:
+            types = self._export_types(session, i)
+            file = ExportFile(
+                file_path,
+                manifest.data["format"],
+                types,
+                row_group_size,
+                self.profiler,
+            )
+            try:
+                pages = self._iter_edge_dfs(
+                    session, i, self.page_size or row_group_size
                 )
-                # print(f'query: MATCH ()-[e:`{edge}`]->() RETURN src(e) AS src, dst(e) AS dst{properties_query_field} LIMIT {self.limit}')
-                # print(f"Result: {result}")
-                assert result.is_succeeded()
-                result_list.append(result)
-
-            # merge all result
-            for i, result in enumerate(result_list):
-                _df = result_to_df(result)
-                # TBD, consider add label of edge
-                properties = self.properties[i] if self.properties[i] else None
-                if self.with_rank:
-                    properties = properties + ["__rank__"]
-                    _g = nx.from_pandas_edgelist(
-                        _df,
-                        "src",
-                        "dst",
-                        properties,
-                        create_using=nx.MultiDiGraph(),
-                        edge_key="__rank__",
-                    )
-                else:
-                    _g = nx.from_pandas_edgelist(
-                        _df,
-                        "src",
-                        "dst",
-                        properties,
-                        create_using=nx.MultiDiGraph(),
-                    )
-                g = nx.compose(g, _g)
-            return g
+                for df in pages:
+                    self.profiler.count("edges", len(df))
+                    if len(df):
+                        file.write({col: df[col].to_numpy() for col in types})
+            finally:
+                file.close()
+        manifest.add(
+            "edge",
+            edge,
+            self.properties[i],
+            0,
+            file_path,
+            file.rows,
+            file.schema_types(),
+        )
+
+    def _export_types(self, session, i: int) -> Dict[str, Any]:
+        """
+        the Arrow types of the columns exported, by DESC EDGE, vid columns are
+        typed by the first page
+        """
+        edge = self.edges[i]
+        with self.profiler.phase("schema"):
+            result = execute_query(session, f"DESC EDGE `{edge}`")
+        types_df = result_to_df(result)
+        defined = dict(zip(types_df.iloc[:, 0], types_df.iloc[:, 1]))
+        types = {"src": None, "dst": None}
+        for prop in self.properties[i]:
+            assert prop in defined, f"Property {prop} is not defined in {edge}"
+            types[prop] = arrow_type(defined[prop])
+        if self.with_rank:
+            types["__rank__"] = arrow_type("int64")
+        return types
 
     def release(self):
-        self.connection_pool.close()
+        if self._own_sessions:
+            self.sessions.close()
 
     def __del__(self):
         self.release()
 
 
-class NebulaQueryReader:
-    def __init__(self, nebula_config: NebulaGraphConfig):
-        self.config = nebula_config
-        self.connection_pool = ConnectionPool()
-        graphd_hosts = nebula_config.graphd_hosts.split(",")
-        graphd_host_list = [
-            (host.split(":")[0], int(host.split(":")[1])) for host in graphd_hosts
-        ]
-        config = Config()
-        assert self.connection_pool.init(
-            graphd_host_list, config
-        ), "Init Connection Pool Failed"
-
-    def read(self, query: str) -> nx.MultiDiGraph:
-        with self.connection_pool.session_context(
-            self.config.user, self.config.password
-        ) as session:
-            assert session.execute(
-                f"USE {self.config.space}"
-            ).is_succeeded(), f"Failed to use space {self.config.space}"
-
-            result: ResultSet = session.execute(query)
-            assert (
-                result.is_succeeded()
-            ), f"Query execution failed: {result.error_msg()}"
-
-            vis_data = result.dict_for_vis()
-            return self._construct_graph(vis_data)
-
-    def _construct_graph(self, vis_data: dict) -> nx.MultiDiGraph:
-        g = nx.MultiDiGraph()
+class _GraphElements:
+    """
+    the vertices and edges found in result rows, including those on paths and in
+    lists, repeated ones merged. They come out the same as from dict_for_vis():
+    vids and property values are strings, nodes have their tags as labels, and
+    edges are keyed by edge name with a non-zero rank kept as the "rank" prop.
+    """
 
-        # Add nodes
-        for node_data in vis_data["nodes"]:
-            g.add_node(
-                node_data["id"], **node_data["props"], labels=node_data["labels"]
-            )
+    def __init__(self, decode_type: str = "utf-8", timezone_offset: int = 0):
+        self.decode_type = decode_type
+        self.timezone_offset = timezone_offset
+        # vid -> (labels, props)
+        self.nodes: Dict[str, Tuple[Dict[str, None], Dict[str, str]]] = {}
+        # (src, dst, rank, name) -> props
+        self.edges: Dict[Tuple[str, str, int, str], Dict[str, str]] = {}
+
+    def add_rows(self, rows: List[Row]):
+        # column by column, as dict_for_vis does
+        for col_num in range(len(rows[0].values) if rows else 0):
+            for row in rows:
+                self.add(row.values[col_num])
 
-        # Add edges
-        for edge_data in vis_data["edges"]:
-            g.add_edge(
-                edge_data["src"],
-                edge_data["dst"],
-                key=edge_data["name"],
-                **edge_data["props"],
+    def add(self, value: Value):
+        value_type = value.getType()
+        if value_type == Value.VVAL:
+            self._add_vertex(value.value)
+        elif value_type == Value.EVAL:
+            edge = value.value
+            src, dst = (
+                (edge.src, edge.dst) if edge.type > 0 else (edge.dst, edge.src)
             )
+            self._add_edge(src, dst, edge.name, edge.ranking, edge.props)
+        elif value_type == Value.PVAL:
+            path = value.value
+            self._add_vertex(path.src)
+            src = path.src.vid
+            for step in path.steps:
+                self._add_vertex(step.dst)
+                if step.type > 0:
+                    self._add_edge(
+                        src, step.dst.vid, step.name, step.ranking, step.props
+                    )
+                else:
+                    self._add_edge(
+                        step.dst.vid, src, step.name, step.ranking, step.props
+                    )
+                src = step.dst.vid
+        elif value_type == Value.LVAL:
+            for item in value.value.values:
+                self.add(item)
+
+    def _str(self, value: Value) -> str:
+        value_type = value.getType()
+        if value_type == Value.SVAL:
+            return value.value.decode(self.decode_type)
+        if value_type in (Value.IVAL, Value.FVAL, Value.BVAL):
+            return str(value.value)
+        return str(
+            ValueWrapper(
+                value,
+                decode_type=self.decode_type,
+                timezone_offset=self.timezone_offset,
+            ).cast()
+        )
+
+    def _vid(self, value: Value) -> str:
+        # interned, as a vid is found again on every path and edge through it
+        return sys.intern(self._str(value))
+
+    def _props(self, props: Optional[dict]) -> Dict[str, str]:
+        if not props:
+            return {}
+        return {
+            key.decode(self.decode_type): self._str(value)
+            for key, value in props.items()
+        }
+
+    def _add_vertex(self, vertex: Vertex):
+        vid = self._vid(vertex.vid)
+        labels, props = self.nodes.get(vid) or self.nodes.setdefault(vid, ({}, {}))
+        for tag in vertex.tags or []:
+            labels[tag.name.decode(self.decode_type)] = None
+            props.update(self._props(tag.props))
+        props.setdefault("id", vid)
 
+    def _add_edge(self, src: Value, dst: Value, name: bytes, rank: int, props):
+        key = (self._vid(src), self._vid(dst), rank, name.decode(self.decode_type))
+        if key in self.edges:
+            self.edges[key].update(self._props(props))
+        else:
+            self.edges[key] = self._props(props)
+
+    def _edge_props(self, rank: int, props: Dict[str, str]) -> Dict[str, str]:
+        return dict(props, rank=rank) if rank != 0 else props
+
+    def relabeled(self, vid_map: VidMap) -> "_GraphElements":
+        """
+        the same vertices and edges, with the vids replaced by their ids
+        """
+        # nodes first and then the edge ends, as networkx would add them
+        vids = list(self.nodes)
+        for src, dst, _, _ in self.edges:
+            vids += (src, dst)
+        vids = list(dict.fromkeys(vids))
+        ids = dict(zip(vids, vid_map.encode(vids).tolist()))
+        elements = _GraphElements(self.decode_type, self.timezone_offset)
+        elements.nodes = {ids[vid]: node for vid, node in self.nodes.items()}
+        elements.edges = {
+            (ids[src], ids[dst], rank, name): props
+            for (src, dst, rank, name), props in self.edges.items()
+        }
+        return elements
+
+    def to_graph(self) -> nx.MultiDiGraph:
+        g = nx.MultiDiGraph()
+        g.add_nodes_from(
+            (vid, dict(props, labels=list(labels)))
+            for vid, (labels, props) in self.nodes.items()
+        )
+        g.add_edges_from(
+            (src, dst, name, self._edge_props(rank, props))
+            for (src, dst, rank, name), props in self.edges.items()
+        )
         return g
 
+    def to_tables(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        the node and edge tables of SnapshotCache, without building a graph
+        """
+        nodes = {"vid": typed_column(list(self.nodes))}
+        nodes.update(
+            attr_columns(
+                [
+                    dict(props, labels=list(labels))
+                    for labels, props in self.nodes.values()
+                ]
+            )
+        )
+        edges = {
+            "src": typed_column([key[0] for key in self.edges]),
+            "dst": typed_column([key[1] for key in self.edges]),
+            "key": typed_column([key[3] for key in self.edges]),
+        }
+        edges.update(
+            attr_columns(
+                [
+                    self._edge_props(key[2], props)
+                    for key, props in self.edges.items()
+                ]
+            )
+        )
+        return {"nodes": nodes, "edges": edges}
+
+
+class NebulaQueryReader:
+    def __init__(
+        self,
+        nebula_config: Union[NebulaGraphConfig, NebulaSessionManager],
+        cache: Optional[SnapshotCache] = None,
+        output_format: OutputFormat = "networkx",  # or "csr" for a CompactGraph
+        profiler: Optional[Profiler] = None,  # record where the time goes
+        vid_map: Optional[VidMap] = None,  # nodes are dense integer ids of vids
+    ):
+        self.profiler = profiler or NULL_PROFILER
+        self.vid_map = vid_map
+        # the summary of the profiler of the last read() or read_iter()
+        self.last_profile: Optional[Dict[str, Any]] = None
+        # a manager given is shared with others, and not closed by release()
+        self._own_sessions = not isinstance(nebula_config, NebulaSessionManager)
+        self.sessions = NebulaSessionManager.of(nebula_config)
+        self.config = self.sessions.config
+        self.cache = cache
+        self.output_format = output_format
+        check_output(output_format, vid_map, cache)
+
+    @profiled
+    def read(self, query: str) -> Union[nx.MultiDiGraph, CompactGraph]:
+        return read_cached(
+            self.cache,
+            lambda: self.cache_key(query),
+            lambda: self._read(query),
+            self.output_format,
+        )
+
+    def cache_key(self, query: str) -> str:
+        return SnapshotCache.key(
+            reader="NebulaQueryReader",
+            graphd_hosts=self.config.graphd_hosts,
+            space=self.config.space,
+            query=query,
+        )
+
+    @profiled_iter
+    def read_iter(
+        self, query: str, batch_size: int = 1000
+    ) -> Iterator[Union[nx.MultiDiGraph, CompactGraph]]:
+        """
+        yield the graph of every batch_size result rows, vertices and edges are
+        merged within a fragment but could repeat across fragments. Fragments
+        are combined with g.add_nodes_from(fragment.nodes(data=True)) and
+        g.add_edges_from(fragment.edges(keys=True, data=True)). The cache is not
+        used.
+        """
+        assert batch_size > 0, "batch_size should be a positive integer"
+        result = self._execute(query)
+        rows = result.rows()
+        for start in range(0, len(rows), batch_size):
+            elements = _GraphElements(result._decode_type, result._timezone_offset)
+            with self.profiler.phase("decode"):
+                elements.add_rows(rows[start : start + batch_size])
+            yield self._build(elements)
+
+    def _read(self, query: str) -> Union[nx.MultiDiGraph, CompactGraph]:
+        result = self._execute(query)
+        elements = _GraphElements(result._decode_type, result._timezone_offset)
+        with self.profiler.phase("decode"):
+            elements.add_rows(result.rows())
+        del result
+        return self._build(elements)
+
+    def _execute(self, query: str) -> ResultSet:
+        with self.sessions.session() as session:
+            with self.profiler.phase("execute") as timing:
+                result: ResultSet = session.execute(query)
+                assert (
+                    result.is_succeeded()
+                ), f"Query execution failed: {result.error_msg()}"
+                timing.rows = result.row_size()
+            self.profiler.record("graphd", result.latency() / 1e6)
+            return result
+
+    def _build(
+        self, elements: "_GraphElements"
+    ) -> Union[nx.MultiDiGraph, CompactGraph]:
+        self.profiler.count("edges", len(elements.edges))
+        with self.profiler.phase("build"):
+            if self.vid_map is not None:
+                elements = elements.relabeled(self.vid_map)
+            if self.output_format == "csr":
+                return CompactGraph.from_tables(elements.to_tables())
+            return elements.to_graph()
+
     def release(self):
-        self.connection_pool.close()
+        if self._own_sessions:
+            self.sessions.close()
 
     def __del__(self):
         self.release()
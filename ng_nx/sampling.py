@@ -0,0 +1,149 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import math
+from typing import List, Optional
+
+import numpy as np
+
+# resolution of the hash based sampling pushed down to graphd
+HASH_BUCKETS = 1000000
+
+
+class Sampling:
+    """
+    how a reader samples each edge type(or tag), which are the strata:
+    - fraction: every row is kept with this probability(Bernoulli sampling)
+    - count: this many rows are kept uniformly at random(reservoir sampling)
+    - part_fraction: only this fraction of the partitions are scanned, chosen at
+      random, which stops the scan early. As a vertex is stored with its out
+      edges, this samples vertices along with all of their out edges.
+    The same seed gives the same sample.
+    """
+
+    def __init__(
+        self,
+        fraction: Optional[float] = None,
+        count: Optional[int] = None,
+        seed: int = 0,
+        part_fraction: Optional[float] = None,
+    ):
+        assert (
+            fraction is None or count is None
+        ), "fraction and count should not be given together"
+        assert (
+            fraction is not None or count is not None or part_fraction is not None
+        ), "one of fraction, count and part_fraction should be given"
+        assert (
+            fraction is None or 0 <= fraction <= 1
+        ), "fraction should be in [0, 1]"
+        assert count is None or count >= 0, "count should be a non-negative integer"
+        assert (
+            part_fraction is None or 0 < part_fraction <= 1
+        ), "part_fraction should be in (0, 1]"
+        self.fraction = fraction
+        self.count = count
+        self.seed = seed
+        self.part_fraction = part_fraction
+
+    def rng(self, *stream: int) -> np.random.Generator:
+        """
+        the random generator of one stream of rows, e.g. (task, partition), so
+        that a sample does not depend on the order in which streams are read
+        """
+        return np.random.default_rng([self.seed, *stream])
+
+    def choose_parts(self, parts: List[int]) -> List[int]:
+        if self.part_fraction is None:
+            return parts
+        size = max(1, math.ceil(len(parts) * self.part_fraction))
+        chosen = self.rng().choice(len(parts), size=size, replace=False)
+        return [parts[i] for i in sorted(chosen)]
+
+    def sampler(self, *stream: int) -> Optional["RowSampler"]:
+        if self.fraction is None and self.count is None:
+            return None
+        return RowSampler(self, self.rng(*stream))
+
+    def hash_expression(self, identity: str) -> str:
+        """
+        nGQL expression of the bucket of a row by the hash of its identity, e.g.
+        of an edge 'concat(toString(src(e)), "|", toString(dst(e)))'
+        """
+        return f'abs(hash(concat({identity}, "|{self.seed}"))) % {HASH_BUCKETS}'
+
+    def hash_condition(self, identity: str) -> Optional[str]:
+        """
+        the WHERE condition keeping the fraction of rows, evaluated by graphd
+        """
+        if self.fraction is None:
+            return None
+        threshold = round(self.fraction * HASH_BUCKETS)
+        return f"{self.hash_expression(identity)} < {threshold}"
+
+
+class RowSampler:
+    """
+    streaming sampler of the rows of one stream, memory is bounded by count in
+    reservoir sampling, which skips over the rows not sampled(Algorithm L)
+    """
+
+    def __init__(self, sampling: Sampling, rng: np.random.Generator):
+        self.fraction = sampling.fraction
+        self.count = sampling.count
+        self.rng = rng
+        self.seen = 0
+        self.reservoir: list = []
+        # index of the next row to enter the reservoir, and the skip weight
+        self._next = 0
+        self._w = 1.0
+
+    def sample(self, rows: list) -> list:
+        """
+        the rows to be kept right away, in reservoir sampling they are kept in
+        the reservoir instead, until the stream ends
+        """
+        start = self.seen
+        self.seen += len(rows)
+        if self.fraction is not None:
+            keep = np.flatnonzero(self.rng.random(len(rows)) < self.fraction)
+            return [rows[i] for i in keep]
+        if self.count == 0:
+            return []
+
+        if len(self.reservoir) < self.count:
+            fill = rows[: self.count - len(self.reservoir)]
+            self.reservoir.extend(fill)
+            if len(self.reservoir) < self.count:
+                return []
+            self._next = start + len(fill) - 1
+            self._skip()
+        while self._next < self.seen:
+            self.reservoir[self.rng.integers(self.count)] = rows[self._next - start]
+            self._skip()
+        return []
+
+    def _skip(self):
+        # uniform in (0, 1], as log(0) is undefined
+        self._w *= math.exp(math.log(1.0 - self.rng.random()) / self.count)
+        self._next += (
+            math.floor(math.log(1.0 - self.rng.random()) / math.log1p(-self._w)) + 1
+        )
+
+
+def reservoir_takes(
+    sizes: List[int], seen: List[int], count: int, rng: np.random.Generator
+) -> List[np.ndarray]:
+    """
+    the positions to take from the reservoir samples of several streams, sizes
+    long each, so that together they are a uniform sample of count rows of all
+    the streams, which had seen rows each
+    """
+    if sum(seen) <= count:
+        return [np.arange(size) for size in sizes]
+    # the number of rows from each stream follows the multivariate
+    # hypergeometric distribution of drawing count rows from all of them
+    takes = rng.multivariate_hypergeometric(np.asarray(seen), count)
+    return [
+        np.sort(rng.permutation(size)[:take]) for size, take in zip(sizes, takes)
+    ]
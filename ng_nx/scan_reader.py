@@ -1,13 +1,301 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2023 The NebulaGraph Authors. All rights reserved.
 
-from typing import Dict, List
+import contextlib
+import multiprocessing.util
+import sys
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import networkx as nx
-from nebula3.mclient import MetaCache, HostAddr
+import numpy as np
+import pandas as pd
+from nebula3.common.ttypes import PropertyType
+from nebula3.mclient import MetaCache
 from nebula3.sclient.GraphStorageClient import GraphStorageClient
 
-from ng_nx.utils import NebulaGraphConfig, cast
+from ng_nx.cache import SnapshotCache
+from ng_nx.compact import (
+    CompactGraph,
+    CompactGraphBuilder,
+    OutputFormat,
+    check_output,
+    empty_graph,
+    finish_graph,
+    read_cached,
+)
+from ng_nx.decoding import VID_COLUMNS, cast_column
+from ng_nx.export import (
+    EXTENSIONS,
+    ROW_GROUP_SIZE,
+    ExportFile,
+    ExportFormat,
+    ExportManifest,
+    arrow_type,
+)
+from ng_nx.profiling import NULL_PROFILER, Profiler, profiled
+from ng_nx.sampling import RowSampler, Sampling, reservoir_takes
+from ng_nx.session import NebulaSessionManager
+from ng_nx.utils import (
+    NebulaGraphConfig,
+    add_edges_from_columns,
+    remove_out_edges,
+    upsert_edges,
+)
+from ng_nx.vids import VidMap, encode_vids
+
+
+class StorageClients:
+    """
+    the storage clients of scan workers, sharing one MetaCache. The storage
+    connections of a GraphStorageClient are not safe to be shared by concurrent
+    scans, so a client is taken by one worker at a time, and given back for the
+    next scans, of this read or later ones. close() closes them all.
+
+    Worker processes could not share them, a pickled StorageClients stands for
+    the clients of the process it is loaded in, closed when the process exits.
+    """
+
+    def __init__(
+        self,
+        metad_host_list: List[Tuple[str, int]],
+        meta_cache: Optional[MetaCache] = None,
+    ):
+        self.metad_host_list = metad_host_list
+        # a MetaCache given is owned by the caller, and not closed by close()
+        self._own_meta_cache = meta_cache is None
+        self.meta_cache = meta_cache or MetaCache(metad_host_list, 50000)
+        self._idle: List[GraphStorageClient] = []
+        self._clients: List[GraphStorageClient] = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def client(self) -> Iterator[GraphStorageClient]:
+        with self._lock:
+            client = self._idle.pop() if self._idle else None
+        if client is None:
+            client = GraphStorageClient(self.meta_cache)
+            with self._lock:
+                self._clients.append(client)
+        try:
+            yield client
+        finally:
+            with self._lock:
+                self._idle.append(client)
+
+    def close(self):
+        with self._lock:
+            clients, self._clients, self._idle = self._clients, [], []
+        for client in clients:
+            client.close()
+        if self._own_meta_cache:
+            self.meta_cache.close()
+
+    def __reduce__(self):
+        return _process_clients, (self.metad_host_list,)
+
+
+# the StorageClients of this process, by metad hosts, in worker processes
+_PROCESS_CLIENTS: Dict[Tuple[Tuple[str, int], ...], StorageClients] = {}
+
+
+def _process_clients(metad_host_list: List[Tuple[str, int]]) -> StorageClients:
+    key = tuple(metad_host_list)
+    if key not in _PROCESS_CLIENTS:
+        clients = _PROCESS_CLIENTS[key] = StorageClients(metad_host_list)
+        multiprocessing.util.Finalize(clients, clients.close, exitpriority=0)
+    return _PROCESS_CLIENTS[key]
+
+
+def _concat_chunks(chunks: List[np.ndarray]) -> np.ndarray:
+    if not chunks:
+        return np.empty(0, dtype=object)
+    return np.concatenate(chunks)
+
+
+def _edges_between(
+    columns: Dict[str, np.ndarray], edges: Dict[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """
+    the edges in columns between the src and dst of any of the given edges
+    """
+    pairs = set(zip(edges["src"].tolist(), edges["dst"].tolist()))
+    mask = np.fromiter(
+        (
+            pair in pairs
+            for pair in zip(columns["src"].tolist(), columns["dst"].tolist())
+        ),
+        dtype=bool,
+        count=len(columns["src"]),
+    )
+    return {col: values[mask] for col, values in columns.items()}
+
+
+def _scan_fields(kind: str, properties: List[str]) -> List[Tuple[str, str]]:
+    """
+    (column, scanned column) pairs to be read, the scanned columns of edges are
+    "<edge>._src", "<edge>._type", "<edge>._rank", "<edge>._dst", followed by
+    "<edge>.<prop>", and of vertices "<tag>._vid" followed by "<tag>.<prop>"
+    """
+    if kind == "edge":
+        fields = [("src", "_src"), ("dst", "_dst"), ("__rank__", "_rank")]
+    else:
+        fields = [("vid", "_vid")]
+    return fields + [(prop, prop) for prop in properties]
+
+
+def _scan_columns_from(
+    resp,
+    fields: List[Tuple[str, str]],
+    limit: int,
+    sampler: Optional[RowSampler] = None,
+    profiler: Profiler = NULL_PROFILER,
+    sink: Optional[Callable[[Dict[str, np.ndarray]], None]] = None,
+) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    drain a scan response into columns, each scanned batch is decoded column by
+    column, only the rows sampled are decoded when sampling. Return the columns
+    and the number of rows scanned. With a sink, the columns of each batch are
+    handed to it instead, and no columns are returned.
+    """
+    chunks: Dict[str, List[np.ndarray]] = {name: [] for name, _ in fields}
+    count = 0
+    scanned = 0
+    index: Dict[str, int] = {}
+
+    def decode(rows: list):
+        columns = {
+            name: cast_column(
+                [row.values[index[col_name]] for row in rows],
+                intern=name in VID_COLUMNS,
+            )
+            for name, col_name in fields
+        }
+        if sink is not None:
+            sink(columns)
+            return
+        for name, values in columns.items():
+            chunks[name].append(values)
+
+    while resp.has_next() and count < limit:
+        with profiler.phase("execute") as timing:
+            result = resp.next()
+            if result is None:
+                continue
+            data_set = result.get_data_set()
+            rows = data_set.rows
+            timing.rows = len(rows)
+        scanned += len(rows)
+        if sampler is not None:
+            rows = sampler.sample(rows)
+        rows = rows[: limit - count]
+        if not index:
+            index = {
+                col_name.split(b".", 1)[-1].decode(): i
+                for i, col_name in enumerate(data_set.column_names)
+            }
+        if rows:
+            with profiler.phase("decode"):
+                decode(rows)
+            count += len(rows)
+    if sampler is not None and sampler.reservoir:
+        with profiler.phase("decode"):
+            decode(sampler.reservoir[:limit])
+    return {name: _concat_chunks(chunk) for name, chunk in chunks.items()}, scanned
+
+
+def _scan_part(
+    clients: StorageClients,
+    space: str,
+    part: int,
+    kind: Literal["edge", "vertex"],
+    name: str,
+    properties: List[str],
+    limit: int,
+    sampler: Optional[RowSampler] = None,
+    profiler: Profiler = NULL_PROFILER,
+    sink: Optional[Callable[[Dict[str, np.ndarray]], None]] = None,
+) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    scan one partition of one edge type or tag into columns(or a sink)
+    """
+    with clients.client() as client:
+        if kind == "edge":
+            resp = client.scan_edge_with_part(
+                space_name=space, part=part, edge_name=name
+            )
+        else:
+            resp = client.scan_vertex_with_part(
+                space_name=space, part=part, tag_name=name, prop_names=properties
+            )
+        return _scan_columns_from(
+            resp, _scan_fields(kind, properties), limit, sampler, profiler, sink
+        )
+
+
+def _export_part(
+    clients: StorageClients,
+    space: str,
+    part: int,
+    kind: Literal["edge", "vertex"],
+    name: str,
+    properties: List[str],
+    sampler: Optional[RowSampler],
+    path: str,
+    file_format: ExportFormat,
+    types: Dict[str, Any],
+    row_group_size: int,
+    profiler: Profiler = NULL_PROFILER,
+) -> Tuple[int, Optional[Dict[str, str]]]:
+    """
+    scan one partition of one edge type or tag into the file at path batch by
+    batch, return the number of rows and the schema of the file
+    """
+    file = ExportFile(path, file_format, types, row_group_size, profiler)
+    try:
+        _scan_part(
+            clients,
+            space,
+            part,
+            kind,
+            name,
+            properties,
+            sys.maxsize,
+            sampler,
+            profiler,
+            sink=file.write,
+        )
+    finally:
+        file.close()
+    return file.rows, file.schema_types()
+
+
+def _profiled(func: Callable, *args) -> Tuple[Any, Dict[str, Any]]:
+    """
+    func(*args) in a worker process, along with the stats of its own profiler,
+    as a profiler could not be shared with worker processes
+    """
+    profiler = Profiler()
+    result = func(*args, profiler=profiler)
+    return result, profiler.stats()
 
 
 class NebulaScanReader:
@@ -15,59 +303,525 @@ class NebulaScanReader:
         self,
         edges: List[str],
         properties: List[List[str]],
-        nebula_config: NebulaGraphConfig,
+        nebula_config: Union[NebulaGraphConfig, NebulaSessionManager],
         limit: int,
         with_rank: bool = False,  # this enable the multi-graph, and the edge_key is "__rank__"
+        parallelism: int = 1,  # number of workers scanning partitions concurrently
+        executor: Literal["thread", "process"] = "thread",
+        vertices: Optional[List[str]] = None,  # tags scanned as node attributes
+        vertex_properties: Optional[List[List[str]]] = None,
+        cache: Optional[SnapshotCache] = None,
+        output_format: OutputFormat = "networkx",  # or "csr" for a CompactGraph
+        sampling: Optional[Sampling] = None,  # sample each edge type(and tag)
+        profiler: Optional[Profiler] = None,  # record where the time goes
+        vid_map: Optional[VidMap] = None,  # nodes are dense integer ids of vids
     ):
         self.edges = edges
         self.properties = properties
+        self.vertices = vertices or []
+        self.vertex_properties = vertex_properties or []
         self.limit = limit
+        if isinstance(nebula_config, NebulaSessionManager):
+            # only the config is used, as scans go to the storaged
+            nebula_config = nebula_config.config
         self.space = nebula_config.space
+        self.cache = cache
+        self.output_format = output_format
+        self.sampling = sampling
+        self.profiler = profiler or NULL_PROFILER
+        self.vid_map = vid_map
+        # the summary of the profiler of the last read, read_table or refresh()
+        self.last_profile: Optional[Dict[str, Any]] = None
+        self.metad_hosts = nebula_config.metad_hosts
 
         metad_hosts = nebula_config.metad_hosts.split(",")
-        metad_host_list = [
+        self.metad_host_list = [
             (host.split(":")[0], int(host.split(":")[1])) for host in metad_hosts
         ]
-        self.meta_cache = MetaCache(metad_host_list, 50000)
+        self.meta_cache = MetaCache(self.metad_host_list, 50000)
         self.graph_storage_client = GraphStorageClient(self.meta_cache)
+        # those of the scan workers, kept across reads until release()
+        self.storage_clients = StorageClients(self.metad_host_list, self.meta_cache)
 
         self.with_rank = with_rank
+        self.parallelism = parallelism
+        self.executor = executor.lower()
 
-        assert len(edges) > 0 and len(edges) == len(
+        assert len(edges) == len(
             properties
         ), "edges and properties should have the same length"
+        assert len(self.vertices) == len(
+            self.vertex_properties
+        ), "vertices and vertex_properties should have the same length"
+        assert (
+            len(edges) > 0 or len(self.vertices) > 0
+        ), "at least one edge type or tag should be given"
+        assert parallelism >= 1, "parallelism should be a positive integer"
+        check_output(output_format, vid_map, cache)
+        assert self.executor in (
+            "thread",
+            "process",
+        ), "executor should be either thread or process"
 
-    def read(self) -> nx.MultiDiGraph:
-        g = nx.MultiDiGraph()
+    @profiled
+    def read(self) -> Union[nx.MultiDiGraph, CompactGraph]:
+        """
+        scan the edges, and the tags if any, into one graph, tag properties are
+        attached as node attributes. With no edges given, the graph only has
+        nodes. The graph is a CompactGraph when output_format is "csr".
+        """
+        return read_cached(
+            self.cache, self.cache_key, self._read, self.output_format
+        )
 
-        for i, edge in enumerate(self.edges):
-            edge_properties = self.properties[i]
-            resp = self.graph_storage_client.scan_edge(
-                space_name=self.space, edge_name=edge
+    def cache_key(self) -> str:
+        return SnapshotCache.key(
+            reader="NebulaScanReader",
+            metad_hosts=self.metad_hosts,
+            space=self.space,
+            edges=self.edges,
+            properties=self.properties,
+            vertices=self.vertices,
+            vertex_properties=self.vertex_properties,
+            limit=self.limit,
+            with_rank=self.with_rank,
+            sampling=vars(self.sampling) if self.sampling else None,
+        )
+
+    def _read(self) -> Union[nx.MultiDiGraph, CompactGraph]:
+        g = empty_graph(self.output_format)
+        edge_columns, vertex_columns = self._scan_columns()
+        with self.profiler.phase("build"):
+            for i, columns in enumerate(vertex_columns):
+                self._add_nodes(g, columns, i)
+            for i, columns in enumerate(edge_columns):
+                self._add_edges(g, columns, i)
+            return finish_graph(g)
+
+    @profiled
+    def read_table(self) -> pd.DataFrame:
+        """
+        scan the edges into one columnar edge table without building a graph,
+        columns are src, dst, __rank__, __type__ and the union of properties
+        """
+        edge_columns, _ = self._scan_columns(vertices=False)
+        with self.profiler.phase("dataframe"):
+            tables = []
+            for i, columns in enumerate(edge_columns):
+                table = pd.DataFrame(columns)
+                table.insert(3, "__type__", self.edges[i])
+                tables.append(table)
+            if not tables:
+                return pd.DataFrame(columns=["src", "dst", "__rank__", "__type__"])
+            return pd.concat(tables, ignore_index=True)
+
+    @profiled
+    def read_node_table(self) -> pd.DataFrame:
+        """
+        scan the tags into one columnar node table, columns are vid, __tag__ and
+        the union of properties, a vertex with n of the tags takes n rows
+        """
+        _, vertex_columns = self._scan_columns(edges=False)
+        with self.profiler.phase("dataframe"):
+            tables = []
+            for i, columns in enumerate(vertex_columns):
+                table = pd.DataFrame(columns)
+                table.insert(1, "__tag__", self.vertices[i])
+                tables.append(table)
+            if not tables:
+                return pd.DataFrame(columns=["vid", "__tag__"])
+            return pd.concat(tables, ignore_index=True)
+
+    @profiled
+    def export(
+        self,
+        path: str,
+        file_format: ExportFormat = "parquet",
+        row_group_size: int = ROW_GROUP_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        stream the edges and tags into one Parquet(or Arrow IPC) file per edge
+        type(or tag) per partition under path, batch by batch, so that memory
+        does not grow with the space. A manifest.json records the files, rows
+        and schema of each, which load_export() reads back. Return the manifest.
+
+        The limit is not applied, and sampling by count is not supported.
+        """
+        assert file_format in EXTENSIONS, "file_format should be parquet or arrow"
+        assert (
+            self.sampling is None or self.sampling.count is None
+        ), "sampling by count is not supported by export"
+        parts = sorted(self.meta_cache.get_part_leaders(self.space).keys())
+        if self.sampling is not None:
+            parts = self.sampling.choose_parts(parts)
+        manifest = ExportManifest(path, self.space, file_format, "NebulaScanReader")
+        pool_class = (
+            ProcessPoolExecutor
+            if self.executor == "process"
+            else ThreadPoolExecutor
+        )
+        with pool_class(max_workers=self.parallelism) as pool:
+            pending = {}
+            for kind, name, properties in self._scan_tasks():
+                types = self._export_types(kind, name, properties)
+                for part in parts:
+                    sampler = None
+                    if self.sampling is not None:
+                        sampler = self.sampling.sampler(
+                            *self._stream(kind, name), part
+                        )
+                    file_path = manifest.file_path(kind, name, part)
+                    args = (
+                        self.storage_clients,
+                        self.space,
+                        part,
+                        kind,
+                        name,
+                        properties,
+                        sampler,
+                        file_path,
+                        file_format,
+                        types,
+                        row_group_size,
+                    )
+                    future = self._submit(pool, _export_part, *args)
+                    pending[future] = (kind, name, properties, part, file_path)
+            for future in as_completed(pending):
+                kind, name, properties, part, file_path = pending[future]
+                rows, schema = self._result(future)
+                manifest.add(kind, name, properties, part, file_path, rows, schema)
+        return manifest.save()
+
+    def _export_types(
+        self, kind: str, name: str, properties: List[str]
+    ) -> Dict[str, Any]:
+        """
+        the Arrow types of the columns exported, by the schema of the edge type
+        (or tag), vid columns are typed by the first batch
+        """
+        if kind == "edge":
+            schema = self.meta_cache.get_edge_schema(self.space, name)
+            types = {"src": None, "dst": None, "__rank__": arrow_type("int64")}
+        else:
+            schema = self.meta_cache.get_tag_schema(self.space, name)
+            types = {"vid": None}
+        defined = {
+            column.name.decode(): PropertyType._VALUES_TO_NAMES[column.type.type]
+            for column in schema.columns
+        }
+        for prop in properties:
+            assert prop in defined, f"Property {prop} is not defined in {name}"
+            types[prop] = arrow_type(defined[prop])
+        return types
+
+    def _add_nodes(
+        self,
+        g: Union[nx.MultiDiGraph, CompactGraphBuilder],
+        columns: Dict[str, np.ndarray],
+        i: int,
+    ):
+        """
+        bulk add the nodes of the i-th tag, merging into the attributes of the
+        nodes already in g
+        """
+        vids = encode_vids(self.vid_map, columns["vid"])
+        if isinstance(g, CompactGraphBuilder):
+            g.add_nodes(
+                vids, {prop: columns[prop] for prop in self.vertex_properties[i]}
             )
-            edge_count = 0
-            while resp.has_next() and edge_count < self.limit:
-                result = resp.next()
-                for edge_data in result.as_relationships():
-                    src = cast(edge_data.start_vertex_id())
-                    dst = cast(edge_data.end_vertex_id())
-                    props = {}
-                    for prop in edge_properties:
-                        props[prop] = cast(edge_data.properties().get(prop))
-                    if self.with_rank:
-                        rank = edge_data.ranking()
-                        props["__rank__"] = rank
-                        g.add_edge(src, dst, key=rank, **props)
-                    else:
-                        g.add_edge(src, dst, **props)
-                    edge_count += 1
-                    if edge_count >= self.limit:
-                        break
+            return
+        names = list(self.vertex_properties[i])
+        values = [columns[prop].tolist() for prop in names]
+        vids = vids.tolist()
+        if names:
+            g.add_nodes_from(
+                zip(vids, (dict(zip(names, row)) for row in zip(*values)))
+            )
+        else:
+            g.add_nodes_from(vids)
+
+    def _add_edges(
+        self,
+        g: Union[nx.MultiDiGraph, CompactGraphBuilder],
+        columns: Dict[str, np.ndarray],
+        i: int,
+    ):
+        """
+        bulk add the edges of the i-th edge type from its columns
+        """
+        self.profiler.count("edges", len(columns["src"]))
+        src = encode_vids(self.vid_map, columns["src"])
+        dst = encode_vids(self.vid_map, columns["dst"])
+        if isinstance(g, CompactGraphBuilder):
+            attrs = {prop: columns[prop] for prop in self.properties[i]}
+            keys = None
+            if self.with_rank:
+                keys = attrs["__rank__"] = columns["__rank__"]
+            g.add_edges(src, dst, attrs, self.edges[i], keys=keys)
+            return
+        attrs = {prop: columns[prop].tolist() for prop in self.properties[i]}
+        keys = None
+        if self.with_rank:
+            keys = attrs["__rank__"] = columns["__rank__"].tolist()
+        add_edges_from_columns(
+            g,
+            src.tolist(),
+            dst.tolist(),
+            attrs,
+            keys=keys,
+            edge_type=self.edges[i],
+        )
+
+    @profiled
+    def refresh(
+        self,
+        g: Optional[nx.MultiDiGraph] = None,
+        partitions: Optional[List[int]] = None,
+        watermark_property: Optional[str] = None,
+        since: Any = None,
+    ) -> nx.MultiDiGraph:
+        """
+        bring a previously read graph up to date in place by re-scanning the
+        given partitions(all by default):
+        - with a watermark, only the edges and vertices whose watermark_property
+          is greater than since are upserted, deleted ones could not be seen.
+          The scan could not filter on properties, so the partitions are still
+          scanned in full and the filter is applied here, this saves no I/O.
+        - otherwise, as the out edges of a vertex are in the partition of the
+          vertex, the out edges of the vertices scanned are replaced, so that
+          deletes are applied too, except for vertices left without out edges.
 
+        g defaults to the cached snapshot(or a full read), the cache is updated
+        with the refreshed graph.
+        """
+        assert (watermark_property is None) == (
+            since is None
+        ), "watermark_property and since should be given together"
+        assert watermark_property is None or all(
+            watermark_property in properties for properties in self.properties
+        ), "watermark_property should be in the properties of every edge type"
+        assert (
+            self.output_format == "networkx"
+        ), "only graphs of the networkx output format could be refreshed"
+        assert self.sampling is None, "sampled graphs could not be refreshed"
+        if g is None:
+            g = self.read()
+
+        tasks = self._scan_tasks()
+        task_columns = self._scan_columns_parallel(tasks, parts=partitions)
+        with self.profiler.phase("build"):
+            for (kind, name, properties), columns in zip(tasks, task_columns):
+                changed = columns
+                if watermark_property in properties:
+                    mask = np.array(
+                        [
+                            value is not None and value > since
+                            for value in columns[watermark_property].tolist()
+                        ],
+                        dtype=bool,
+                    )
+                    changed = {col: values[mask] for col, values in columns.items()}
+                if kind == "vertex":
+                    self._add_nodes(g, changed, self.vertices.index(name))
+                    continue
+                if watermark_property is not None and not self.with_rank:
+                    # without ranks in g, the edges between the vertices of a
+                    # changed edge are all upserted, they are in columns too as
+                    # out edges are scanned with the partition of their src
+                    changed = _edges_between(columns, changed)
+                src = encode_vids(self.vid_map, changed["src"]).tolist()
+                dst = encode_vids(self.vid_map, changed["dst"]).tolist()
+                attrs = {prop: changed[prop].tolist() for prop in properties}
+                keys = None
+                if self.with_rank:
+                    keys = attrs["__rank__"] = changed["__rank__"].tolist()
+                if watermark_property is None:
+                    remove_out_edges(g, set(src), name)
+                    add_edges_from_columns(
+                        g, src, dst, attrs, keys=keys, edge_type=name
+                    )
+                else:
+                    upsert_edges(g, src, dst, attrs, name, keys=keys)
+
+        if self.cache is not None:
+            self.cache.save_graph(self.cache_key(), g)
         return g
 
+    def _scan_tasks(
+        self, edges: bool = True, vertices: bool = True
+    ) -> List[Tuple[str, str, List[str]]]:
+        tasks = []
+        if edges:
+            tasks += [
+                ("edge", edge, self.properties[i])
+                for i, edge in enumerate(self.edges)
+            ]
+        if vertices:
+            tasks += [
+                ("vertex", tag, self.vertex_properties[i])
+                for i, tag in enumerate(self.vertices)
+            ]
+        return tasks
+
+    def _scan_columns(
+        self, edges: bool = True, vertices: bool = True
+    ) -> Tuple[List[Dict[str, np.ndarray]], List[Dict[str, np.ndarray]]]:
+        """
+        scan every edge type and tag into its columns, return the columns of
+        edges in the order of self.edges and of vertices in that of self.vertices
+        """
+        tasks = self._scan_tasks(edges, vertices)
+        # samples are drawn by partition, so that they do not depend on how
+        # the partitions are scanned
+        if self.parallelism > 1 or self.sampling is not None:
+            task_columns = self._scan_columns_parallel(tasks)
+        else:
+            task_columns = []
+            for kind, name, properties in tasks:
+                if kind == "edge":
+                    resp = self.graph_storage_client.scan_edge(
+                        space_name=self.space, edge_name=name
+                    )
+                else:
+                    resp = self.graph_storage_client.scan_vertex(
+                        space_name=self.space, tag_name=name, prop_names=properties
+                    )
+                columns, _ = _scan_columns_from(
+                    resp,
+                    _scan_fields(kind, properties),
+                    self.limit,
+                    profiler=self.profiler,
+                )
+                task_columns.append(columns)
+        edge_columns = [
+            columns
+            for (kind, _, _), columns in zip(tasks, task_columns)
+            if kind == "edge"
+        ]
+        vertex_columns = [
+            columns
+            for (kind, _, _), columns in zip(tasks, task_columns)
+            if kind == "vertex"
+        ]
+        return edge_columns, vertex_columns
+
+    def _scan_columns_parallel(
+        self,
+        tasks: List[Tuple[str, str, List[str]]],
+        parts: Optional[List[int]] = None,
+    ) -> List[Dict[str, np.ndarray]]:
+        """
+        fan out the scan by (task, partition) to a pool of workers, the limit is
+        applied per edge type(or tag) across all of its partitions. parts
+        defaults to all the partitions of the space, or those sampled.
+        """
+        if parts is None:
+            parts = sorted(self.meta_cache.get_part_leaders(self.space).keys())
+            if self.sampling is not None:
+                parts = self.sampling.choose_parts(parts)
+        pool_class = (
+            ProcessPoolExecutor
+            if self.executor == "process"
+            else ThreadPoolExecutor
+        )
+        # columns and number of rows scanned of each partition of each task
+        task_parts: List[Dict[int, Tuple[Dict[str, np.ndarray], int]]] = [
+            {} for _ in tasks
+        ]
+        task_count = [0] * len(tasks)
+        reservoir = self.sampling is not None and self.sampling.count is not None
+
+        with pool_class(max_workers=self.parallelism) as pool:
+            pending = {}
+            for t, (kind, name, properties) in enumerate(tasks):
+                for part in parts:
+                    sampler = None
+                    if self.sampling is not None:
+                        sampler = self.sampling.sampler(
+                            *self._stream(kind, name), part
+                        )
+                    args = (
+                        self.storage_clients,
+                        self.space,
+                        part,
+                        kind,
+                        name,
+                        properties,
+                        self.limit,
+                        sampler,
+                    )
+                    future = self._submit(pool, _scan_part, *args)
+                    pending[future] = (t, part)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    t, part = pending.pop(future)
+                    columns, scanned = self._result(future)
+                    task_parts[t][part] = (columns, scanned)
+                    task_count[t] += len(next(iter(columns.values())))
+                    if task_count[t] >= self.limit and not reservoir:
+                        # drop the partitions of this task not yet started
+                        for other, (other_t, _) in list(pending.items()):
+                            if other_t == t and other.cancel():
+                                pending.pop(other)
+
+        task_columns = []
+        for (kind, name, properties), columns_of_parts in zip(tasks, task_parts):
+            results = [columns_of_parts[part] for part in sorted(columns_of_parts)]
+            if reservoir:
+                takes = reservoir_takes(
+                    [len(next(iter(columns.values()))) for columns, _ in results],
+                    [scanned for _, scanned in results],
+                    self.sampling.count,
+                    self.sampling.rng(*self._stream(kind, name)),
+                )
+                results = [
+                    (
+                        {col: values[take] for col, values in columns.items()},
+                        scanned,
+                    )
+                    for (columns, scanned), take in zip(results, takes)
+                ]
+            task_columns.append(
+                {
+                    col: _concat_chunks([columns[col] for columns, _ in results])[
+                        : self.limit
+                    ]
+                    for col, _ in _scan_fields(kind, properties)
+                }
+            )
+        return task_columns
+
+    def _submit(self, pool, func: Callable, *args) -> Future:
+        """
+        run func on a worker, profiled by the profiler of the reader, or by one
+        of the worker process whose stats are merged back by _result()
+        """
+        if self.executor == "thread":
+            return pool.submit(func, *args, profiler=self.profiler)
+        if self.profiler.enabled:
+            return pool.submit(_profiled, func, *args)
+        return pool.submit(func, *args)
+
+    def _result(self, future: Future) -> Any:
+        result = future.result()
+        if self.executor == "process" and self.profiler.enabled:
+            result, stats = result
+            self.profiler.merge(stats)
+        return result
+
+    def _stream(self, kind: str, name: str) -> Tuple[int, int]:
+        """
+        id of the rows of an edge type or tag, for their random generators
+        """
+        if kind == "edge":
+            return 0, self.edges.index(name)
+        return 1, self.vertices.index(name)
+
     def release(self):
         self.graph_storage_client.close()
+        self.storage_clients.close()
 
     def __del__(self):
         self.release()
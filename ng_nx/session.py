@@ -0,0 +1,204 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import contextlib
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple, Union
+
+from nebula3.Config import Config
+from nebula3.gclient.net import ConnectionPool
+from nebula3.gclient.net.Session import Session
+
+from ng_nx.utils import NebulaGraphConfig
+
+# the statement used to check that a session is still usable
+PING_QUERY = "YIELD 1"
+# sessions of a manager created by a reader or a writer for a config
+MAX_SESSIONS = 10
+
+
+class NebulaSessionManager:
+    """
+    a thread-safe pool of graphd sessions already bound to the space, which
+    readers and writers take in place of a NebulaGraphConfig to share them, so
+    that connecting, authenticating and USE {space} are paid once per session
+    instead of once per read or write.
+
+    At most max_sessions sessions are held at the same time, acquire() waits for
+    one to be given back beyond that. A session idle for health_check_interval
+    seconds is pinged before being handed out, and replaced if it no longer
+    works. With keepalive, idle sessions are also pinged every keepalive
+    seconds in the background, so that graphd does not expire them.
+
+        with NebulaSessionManager(config) as sessions:
+            reader = NebulaReader(..., nebula_config=sessions)
+    """
+
+    def __init__(
+        self,
+        nebula_config: NebulaGraphConfig,
+        max_sessions: int = MAX_SESSIONS,
+        health_check_interval: float = 30.0,  # seconds idle before a ping
+        keepalive: Optional[float] = None,  # seconds between background pings
+    ):
+        assert max_sessions >= 1, "max_sessions should be a positive integer"
+        assert (
+            keepalive is None or keepalive > 0
+        ), "keepalive should be a positive number of seconds"
+        self.config = nebula_config
+        self.max_sessions = max_sessions
+        self.health_check_interval = health_check_interval
+        self.keepalive = keepalive
+        # idle sessions with the time they were last used, most recent last
+        self._idle: List[Tuple[Session, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_sessions)
+        self._closed = threading.Event()
+
+        config = Config()
+        config.max_connection_pool_size = max_sessions
+        graphd_hosts = nebula_config.graphd_hosts.split(",")
+        graphd_host_list = [
+            (host.split(":")[0], int(host.split(":")[1])) for host in graphd_hosts
+        ]
+        self.connection_pool = ConnectionPool()
+        assert self.connection_pool.init(
+            graphd_host_list, config
+        ), "Init Connection Pool Failed"
+        if keepalive is not None:
+            threading.Thread(target=self._keep_alive, daemon=True).start()
+
+    @classmethod
+    def of(
+        cls,
+        nebula_config: Union[NebulaGraphConfig, "NebulaSessionManager"],
+        max_sessions: int = MAX_SESSIONS,
+    ) -> "NebulaSessionManager":
+        """
+        the manager given, or a new one of max_sessions sessions for a config
+        """
+        if isinstance(nebula_config, NebulaSessionManager):
+            return nebula_config
+        return cls(nebula_config, max_sessions=max_sessions)
+
+    @property
+    def space(self) -> str:
+        return self.config.space
+
+    @contextlib.contextmanager
+    def session(self) -> Iterator[Session]:
+        """
+        hold a session for the duration of the with block, a session is checked
+        before its next use when the block raised
+        """
+        session = self.acquire()
+        healthy = False
+        try:
+            yield session
+            healthy = True
+        finally:
+            self.release(session, healthy)
+
+    def acquire(self) -> Session:
+        """
+        take a session bound to the space, which should be given back by
+        release()
+        """
+        assert not self._closed.is_set(), "The session manager is closed"
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    session, last_used = self._idle.pop()
+                if time.monotonic() - last_used < self.health_check_interval:
+                    return session
+                if self._ping(session):
+                    return session
+                self._discard(session)
+            return self._new_session()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, session: Session, healthy: bool = True):
+        """
+        give back a session taken by acquire(), a session not healthy(e.g. a
+        query raised on it) is pinged before its next use
+        """
+        try:
+            if self._closed.is_set():
+                self._discard(session)
+                return
+            with self._lock:
+                self._idle.append((session, time.monotonic() if healthy else 0.0))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """
+        sign out the idle sessions and close the connections, sessions still
+        held are signed out when given back
+        """
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session, _ in idle:
+            self._discard(session)
+        self.connection_pool.close()
+
+    def _new_session(self) -> Session:
+        session = self.connection_pool.get_session(
+            self.config.user, self.config.password
+        )
+        if not session.execute(f"USE {self.space}").is_succeeded():
+            self._discard(session)
+            raise AssertionError(f"Failed to use space {self.space}")
+        return session
+
+    def _ping(self, session: Session) -> bool:
+        try:
+            return session.execute(PING_QUERY).is_succeeded()
+        except Exception:
+            return False
+
+    def _discard(self, session: Session):
+        try:
+            session.release()
+        except Exception:
+            pass
+
+    def _keep_alive(self):
+        while not self._closed.wait(self.keepalive):
+            # only sessions no one waits for are pinged
+            while self._slots.acquire(blocking=False):
+                with self._lock:
+                    stale = [
+                        entry
+                        for entry in self._idle
+                        if time.monotonic() - entry[1] >= self.keepalive
+                    ]
+                    if stale:
+                        self._idle.remove(stale[0])
+                if not stale:
+                    self._slots.release()
+                    break
+                session = stale[0][0]
+                if self._ping(session):
+                    self.release(session)
+                else:
+                    self._discard(session)
+                    self._slots.release()
+
+    def __enter__(self) -> "NebulaSessionManager":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self.close()
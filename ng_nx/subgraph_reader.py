@@ -0,0 +1,215 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+from typing import Any, Dict, Literal, Optional, Union
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from ng_nx.cache import SnapshotCache
+from ng_nx.compact import (
+    CompactGraph,
+    CompactGraphBuilder,
+    OutputFormat,
+    check_output,
+    empty_graph,
+    finish_graph,
+    read_cached,
+)
+from ng_nx.decoding import execute_query, result_to_df
+from ng_nx.profiling import NULL_PROFILER, Profiler, profiled
+from ng_nx.session import NebulaSessionManager
+from ng_nx.utils import (
+    NebulaGraphConfig,
+    add_edges_from_columns,
+    to_literal,
+)
+from ng_nx.vids import VidMap, encode_vids
+
+DIRECTIONS = {"out": "", "in": " REVERSELY", "both": " BIDIRECT"}
+
+
+class NebulaSubgraphReader:
+    """
+    read the k-hop neighborhood of seed vertices, level by level with GO
+    queries over a batch of frontier vertices each, so that only the part of the
+    space reached is read. Every vertex is expanded at most once.
+    """
+
+    def __init__(
+        self,
+        edges: list,
+        properties: list,
+        nebula_config: Union[NebulaGraphConfig, NebulaSessionManager],
+        with_rank: bool = False,  # multi-graph keyed by (edge type, "__rank__")
+        direction: Literal["out", "in", "both"] = "out",
+        where: Optional[str] = None,  # filter of GO, e.g. "follow.degree > 90"
+        batch_size: int = 1000,  # number of frontier vertices per GO query
+        cache: Optional[SnapshotCache] = None,
+        output_format: OutputFormat = "networkx",  # or "csr" for a CompactGraph
+        profiler: Optional[Profiler] = None,  # record where the time goes
+        vid_map: Optional[VidMap] = None,  # nodes are dense integer ids of vids
+    ):
+        self.edges = edges
+        self.properties = properties
+        self.with_rank = with_rank
+        self.direction = direction
+        self.where = where
+        self.batch_size = batch_size
+        self.cache = cache
+        self.output_format = output_format
+        self.profiler = profiler or NULL_PROFILER
+        self.vid_map = vid_map
+        # the summary of the profiler of the last read()
+        self.last_profile: Optional[Dict[str, Any]] = None
+        # a manager given is shared with others, and not closed by release()
+        self._own_sessions = not isinstance(nebula_config, NebulaSessionManager)
+        self.sessions = NebulaSessionManager.of(nebula_config)
+        nebula_config = self.sessions.config
+        self.graphd_hosts = nebula_config.graphd_hosts
+        self.space = nebula_config.space
+        self.nebula_user = nebula_config.user
+        self.nebula_password = nebula_config.password
+        assert len(edges) > 0 and len(edges) == len(
+            properties
+        ), "edges and properties should have the same length"
+        assert (
+            direction in DIRECTIONS
+        ), "direction should be one of out, in and both"
+        assert batch_size > 0, "batch_size should be a positive integer"
+        check_output(output_format, vid_map, cache)
+
+    @profiled
+    def read(
+        self, seeds: list, hops: int = 1
+    ) -> Union[nx.MultiDiGraph, CompactGraph]:
+        """
+        read the edges within hops of the seeds, the seeds are always nodes of
+        the graph, even when having no edges
+        """
+        assert hops >= 0, "hops should be a non-negative integer"
+        return read_cached(
+            self.cache,
+            lambda: self.cache_key(seeds, hops),
+            lambda: self._read(seeds, hops),
+            self.output_format,
+        )
+
+    def cache_key(self, seeds: list, hops: int) -> str:
+        return SnapshotCache.key(
+            reader="NebulaSubgraphReader",
+            graphd_hosts=self.graphd_hosts,
+            space=self.space,
+            edges=self.edges,
+            properties=self.properties,
+            with_rank=self.with_rank,
+            direction=self.direction,
+            where=self.where,
+            seeds=seeds,
+            hops=hops,
+        )
+
+    def _read(self, seeds: list, hops: int) -> Union[nx.MultiDiGraph, CompactGraph]:
+        seeds = list(dict.fromkeys(seeds))
+        visited = set()
+        frontier = seeds
+        dfs = []
+        with self.sessions.session() as session:
+            for _ in range(hops):
+                if not frontier:
+                    break
+                visited.update(frontier)
+                reached = {}
+                for start in range(0, len(frontier), self.batch_size):
+                    query = self._go_query(
+                        frontier[start : start + self.batch_size]
+                    )
+                    result = execute_query(session, query, self.profiler)
+                    df = result_to_df(result, self.profiler)
+                    del result
+                    if len(df) > 0 or not dfs:
+                        dfs.append(df)
+                    for vid in df["src"].tolist() + df["dst"].tolist():
+                        if vid not in visited:
+                            reached[vid] = None
+                frontier = list(reached)
+
+        with self.profiler.phase("build"):
+            g = empty_graph(self.output_format)
+            nodes = encode_vids(self.vid_map, np.asarray(seeds, dtype=object))
+            if isinstance(g, CompactGraphBuilder):
+                g.add_nodes(nodes, {})
+            else:
+                g.add_nodes_from(nodes.tolist())
+            if dfs:
+                # an edge is found again when both of its ends are expanded
+                table = pd.concat(dfs, ignore_index=True).drop_duplicates(
+                    ["src", "dst", "__type__", "__rank__"]
+                )
+                for i, edge in enumerate(self.edges):
+                    self._add_edges(g, table[table["__type__"] == edge], i)
+            return finish_graph(g)
+
+    def _go_query(self, vids: list) -> str:
+        edge = ", ".join(f"`{edge}`" for edge in self.edges)
+        yield_fields = ""
+        for edge_name, properties in zip(self.edges, self.properties):
+            for property in properties:
+                yield_fields += (
+                    f", `{edge_name}`.{property} AS `{edge_name}.{property}`"
+                )
+        query = (
+            f"GO FROM {', '.join(to_literal(vid) for vid in vids)} "
+            f"OVER {edge}{DIRECTIONS[self.direction]}"
+        )
+        if self.where:
+            query += f" WHERE {self.where}"
+        query += (
+            " YIELD src(edge) AS src, dst(edge) AS dst, type(edge) AS `__type__`, "
+            f"rank(edge) AS `__rank__`{yield_fields}"
+        )
+        return query
+
+    def _add_edges(
+        self,
+        g: Union[nx.MultiDiGraph, CompactGraphBuilder],
+        df: pd.DataFrame,
+        i: int,
+    ):
+        """
+        add the edges of the i-th edge type to g in place
+        """
+        edge = self.edges[i]
+        self.profiler.count("edges", len(df))
+        columns = {prop: df[f"{edge}.{prop}"] for prop in self.properties[i]}
+        if self.with_rank:
+            columns["__rank__"] = df["__rank__"]
+        src = encode_vids(self.vid_map, df["src"].to_numpy())
+        dst = encode_vids(self.vid_map, df["dst"].to_numpy())
+        if isinstance(g, CompactGraphBuilder):
+            attrs = {name: column.to_numpy() for name, column in columns.items()}
+            g.add_edges(
+                src,
+                dst,
+                attrs,
+                edge,
+                keys=attrs.get("__rank__"),
+            )
+            return
+        attrs = {name: column.tolist() for name, column in columns.items()}
+        add_edges_from_columns(
+            g,
+            src.tolist(),
+            dst.tolist(),
+            attrs,
+            keys=attrs.get("__rank__"),
+            edge_type=edge,
+        )
+
+    def release(self):
+        if self._own_sessions:
+            self.sessions.close()
+
+    def __del__(self):
+        self.release()
@@ -3,11 +3,24 @@
 
 from __future__ import annotations
 
-from typing import Dict
+import datetime
+import importlib
+from itertools import repeat
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-import pandas as pd
-from nebula3.data.DataObject import Value, ValueWrapper
-from nebula3.data.ResultSet import ResultSet
+import numpy as np
+
+if TYPE_CHECKING:
+    import networkx as nx
 
 # Default Configuration
 GRAPHD_HOSTS = "graphd:9669"
@@ -16,55 +29,131 @@ USER = "root"
 PASSWORD = "nebula"
 SPACE = "basketballplayer"
 
-# TBD when https://github.com/vesoft-inc/nebula-python/pull/269 is merged
-# in a release version of nebula-python, I could leverage the ValueWrapper.cast()
-# method to simplify the code below
-cast_as = {
-    Value.NVAL: "as_null",
-    Value.BVAL: "as_bool",
-    Value.IVAL: "as_int",
-    Value.FVAL: "as_double",
-    Value.SVAL: "as_string",
-    Value.LVAL: "as_list",
-    Value.UVAL: "as_set",
-    Value.MVAL: "as_map",
-    Value.TVAL: "as_time",
-    Value.DVAL: "as_date",
-    Value.DTVAL: "as_datetime",
-    Value.VVAL: "as_node",
-    Value.EVAL: "as_relationship",
-    Value.PVAL: "as_path",
-    Value.GGVAL: "as_geography",
-    Value.DUVAL: "as_duration",
-}
-
-
-def cast(val: ValueWrapper):
-    _type = val._value.getType()
-    if _type == Value.__EMPTY__:
-        return None
-    if _type in cast_as:
-        return getattr(val, cast_as[_type])()
-    if _type == Value.LVAL:
-        return [x.cast() for x in val.as_list()]
-    if _type == Value.UVAL:
-        return {x.cast() for x in val.as_set()}
-    if _type == Value.MVAL:
-        return {k: v.cast() for k, v in val.as_map().items()}
+# the decoding of query and scan results moved to ng_nx.decoding, they are
+# still importable from here, but only loaded(along with pandas and nebula3)
+# when first used
+_DECODING = (
+    "VID_COLUMNS",
+    "cast",
+    "cast_as",
+    "cast_column",
+    "column_dtypes",
+    "execute_query",
+    "result_to_df",
+)
+
+
+def __getattr__(name: str) -> Any:
+    if name in _DECODING:
+        return getattr(importlib.import_module("ng_nx.decoding"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def add_edges_from_columns(
+    g: nx.MultiDiGraph,
+    src: Sequence,
+    dst: Sequence,
+    attrs: Dict[str, Sequence],
+    keys: Optional[Sequence] = None,
+    edge_type: Optional[str] = None,
+) -> None:
+    """
+    add edges to g in place from column sequences, edge_type is kept as the
+    "__type__" attribute so that edges of different types stay distinguishable.
+    With edge_type, keys(ranks) are paired with it as in typed_keys().
+    """
+    if keys is not None and edge_type is not None:
+        keys = typed_keys(edge_type, keys)
+    names = list(attrs.keys())
+    values = list(attrs.values())
+    if edge_type is not None:
+        names.append("__type__")
+        values.append(repeat(edge_type))
+    if values:
+        rows = (dict(zip(names, row)) for row in zip(*values))
+    else:
+        rows = ({} for _ in src)
+    if keys is not None:
+        g.add_edges_from(zip(src, dst, keys, rows))
+    else:
+        g.add_edges_from(zip(src, dst, rows))
+
+
+def typed_keys(edge_type: str, ranks: Iterable) -> List[Tuple[str, Any]]:
+    """
+    the edge keys of graphs read with_rank, (edge_type, rank), so that edges of
+    different types between the same vertices with the same rank do not collide
+    """
+    return [(edge_type, rank) for rank in ranks]
+
+
+def quote(value: Any) -> str:
+    """
+    enclose a value by double quotes as a nGQL string literal
+    """
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def to_literal(value: Any) -> str:
+    """
+    render a Python value as a nGQL literal, e.g. for the WHERE clauses
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return f'datetime("{value.isoformat()}")'
+    if isinstance(value, datetime.date):
+        return f'date("{value.isoformat()}")'
+    return quote(value)
+
+
+def upsert_edges(
+    g: nx.MultiDiGraph,
+    src: Sequence,
+    dst: Sequence,
+    attrs: Dict[str, Sequence],
+    edge_type: str,
+    keys: Optional[Sequence] = None,
+) -> None:
+    """
+    insert or update edges of edge_type in place. With keys(ranks), edges are
+    matched on (src, dst, (edge_type, key)). Otherwise parallel edges could not
+    be told apart, so the edges of edge_type between each src and dst are
+    replaced by the given ones, which should be all of the edges between them.
+    """
+    if keys is not None:
+        names = list(attrs.keys()) + ["__type__"]
+        rows = zip(*attrs.values(), repeat(edge_type))
+        for u, v, key, row in zip(src, dst, typed_keys(edge_type, keys), rows):
+            g.add_edge(u, v, key=key, **dict(zip(names, row)))
+        return
+    g.remove_edges_from(
+        [
+            (u, v, key)
+            for u, v in set(zip(src, dst))
+            if g.has_edge(u, v)
+            for key, data in g[u][v].items()
+            if data.get("__type__") == edge_type
+        ]
+    )
+    add_edges_from_columns(g, src, dst, attrs, edge_type=edge_type)
 
 
-def result_to_df(result: ResultSet) -> pd.DataFrame:
+def remove_out_edges(g: nx.MultiDiGraph, vids: Iterable, edge_type: str) -> None:
     """
-    build list for each column, and transform to dataframe
+    remove the out edges of edge_type from the given vertices
     """
-    assert result.is_succeeded()
-    columns = result.keys()
-    d: Dict[str, list] = {}
-    for col_num in range(result.col_size()):
-        col_name = columns[col_num]
-        col_list = result.column_values(col_name)
-        d[col_name] = [cast(x) for x in col_list]
-    return pd.DataFrame(d)
+    g.remove_edges_from(
+        [
+            (u, v, key)
+            for vid in vids
+            if vid in g
+            for u, v, key, data in g.out_edges(vid, keys=True, data=True)
+            if data.get("__type__") == edge_type
+        ]
+    )
 
 
 class NebulaGraphConfig:
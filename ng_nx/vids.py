@@ -0,0 +1,106 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from ng_nx.cache import typed_column
+from ng_nx.compact import CompactGraph
+
+
+class VidMap:
+    """
+    dense integer ids of vids, 0..n-1 in the order the vids are first seen.
+
+    Readers given a VidMap build graphs whose nodes are the ids instead of the
+    vids, which for string vids takes a fraction of the memory, and is what
+    most graph libraries expect. vids[i] is the vid of id i, and to_vids()
+    relabels a graph back. A map could be shared by readers, so that the ids of
+    their graphs agree.
+    """
+
+    def __init__(self, vids: Iterable = ()):
+        self._ids: Dict[Any, int] = {}
+        self._vids: List[Any] = []
+        self._array: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.encode(list(vids))
+
+    def __len__(self) -> int:
+        return len(self._vids)
+
+    def __contains__(self, vid: Any) -> bool:
+        return vid in self._ids
+
+    @property
+    def vids(self) -> np.ndarray:
+        """
+        the vids by id, typed as int64 for int vids
+        """
+        with self._lock:
+            if self._array is None or len(self._array) != len(self._vids):
+                self._array = typed_column(self._vids)
+            return self._array
+
+    def id(self, vid: Any) -> int:
+        return self._ids[vid]
+
+    def vid(self, id: int) -> Any:
+        return self._vids[id]
+
+    def encode(self, vids: Sequence) -> np.ndarray:
+        """
+        the ids of vids, vids not seen before are given the next ids. The ids
+        are an object array sharing one int per id, so that a graph holds each
+        id once, as it would an interned vid. Repeated vids are looked up once,
+        as a column of edge ends is mostly repeats.
+        """
+        if len(vids) == 0:
+            return np.empty(0, dtype=object)
+        if not isinstance(vids, np.ndarray):
+            vids = typed_column(list(vids))
+        codes, uniques = pd.factorize(vids)
+        uniques = uniques.tolist()
+        unique_ids = np.empty(len(uniques), dtype=object)
+        with self._lock:
+            ids = self._ids
+            for vid in uniques:
+                if vid not in ids:
+                    ids[vid] = len(self._vids)
+                    self._vids.append(vid)
+            unique_ids[:] = [ids[vid] for vid in uniques]
+        return unique_ids[codes]
+
+    def decode(self, ids: Sequence[int]) -> np.ndarray:
+        """
+        the vids of ids
+        """
+        return self.vids[np.asarray(ids, dtype=np.int64)]
+
+    def to_vids(
+        self, g: Union[nx.MultiDiGraph, CompactGraph]
+    ) -> Union[nx.MultiDiGraph, CompactGraph]:
+        """
+        a copy of a graph read with this map, whose nodes are the vids again
+        """
+        if isinstance(g, CompactGraph):
+            return CompactGraph(
+                self.decode(g.vids),
+                g.indptr,
+                g.indices,
+                g.keys,
+                g.edge_attrs,
+                g.node_attrs,
+            )
+        return nx.relabel_nodes(g, {id: self._vids[id] for id in g}, copy=True)
+
+
+def encode_vids(vid_map: Optional[VidMap], vids: np.ndarray) -> np.ndarray:
+    """
+    the ids of vids with a map, or the vids as they are without one
+    """
+    return vids if vid_map is None else vid_map.encode(vids)
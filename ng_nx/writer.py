@@ -1,16 +1,128 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2023 The NebulaGraph Authors. All rights reserved.
 
-from typing import Generator, List, Dict, Literal
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from queue import Queue
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Set,
+    Sized,
+    Tuple,
+    Union,
+)
 
-from nebula3.Config import Config
-from nebula3.gclient.net import ConnectionPool
+import networkx as nx
+import numpy as np
+import pandas as pd
 
-from ng_nx.utils import NebulaGraphConfig, result_to_df
+from ng_nx.decoding import result_to_df
+from ng_nx.profiling import NULL_PROFILER, Profiler, profiled
+from ng_nx.session import NebulaSessionManager
+from ng_nx.utils import NebulaGraphConfig, quote
+
+
+def _is_null(value: Any) -> bool:
+    """
+    whether a value is missing: None, or the NaN(NA, NaT) pandas fills in
+    """
+    return (
+        value is None
+        or value is pd.NA
+        or value is pd.NaT
+        or (isinstance(value, (float, np.floating)) and value != value)
+    )
+
+
+def _format_bool(value: Any) -> str:
+    return "true" if value else "false"
+
+
+def _format_int(value: Any) -> str:
+    # int columns with missing values are float in pandas, e.g. 3.0
+    if isinstance(value, (float, np.floating)):
+        return str(int(value))
+    return str(value)
+
+
+def _nullable(formatter: Callable[[Any], str]) -> Callable[[Any], str]:
+    def format_value(value: Any) -> str:
+        if _is_null(value):
+            return "NULL"
+        return formatter(value)
+
+    return format_value
+
+
+def compile_formatter(property_type: str) -> Callable[[Any], str]:
+    """
+    get the function that renders a value of the given schema type in nGQL,
+    missing values(None or NaN) of any type are rendered as NULL
+    """
+    if property_type == "string" or property_type.startswith("fixed_string"):
+        return _nullable(quote)
+    if property_type == "bool":
+        return _nullable(_format_bool)
+    if property_type.startswith("int"):
+        return _nullable(_format_int)
+    return _nullable(str)
+
+
+class WriteCheckpoint:
+    """
+    append-only record of the batches already written, the first line describes
+    the write, followed by one batch index per line
+    """
+
+    def __init__(self, path: str, header: dict):
+        self.path = path
+        self.done: Set[int] = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.loads(f.readline() or "null")
+                if saved is not None and saved != header:
+                    raise ValueError(
+                        f"Checkpoint {path} was created by another write: {saved}"
+                    )
+                self.done = {int(line) for line in f if line.strip()}
+            self._file = open(path, "a")
+            if saved is None:
+                self._file.write(json.dumps(header) + "\n")
+        else:
+            self._file = open(path, "w")
+            self._file.write(json.dumps(header) + "\n")
+        self._file.flush()
+
+    def add(self, index: int):
+        with self._lock:
+            self._file.write(f"{index}\n")
+            self._file.flush()
+
+    def close(self, remove: bool = False):
+        self._file.close()
+        if remove:
+            os.remove(self.path)
 
 
 class NebulaWriter:
-    def __init__(self, data: Dict, nebula_config: NebulaGraphConfig):
+    def __init__(
+        self,
+        data: Any,
+        nebula_config: Union[NebulaGraphConfig, NebulaSessionManager],
+        profiler: Optional[Profiler] = None,  # record where the time goes
+    ):
         self.data = data
         self.label = None
         self.properties = []
@@ -18,18 +130,31 @@ class NebulaWriter:
         self.write_mode = None
         self.sink = None
 
-        config = Config()
-        graphd_hosts = nebula_config.graphd_hosts.split(",")
-        graphd_host_list = [
-            (host.split(":")[0], int(host.split(":")[1])) for host in graphd_hosts
-        ]
+        self.concurrency = 1
+        self.max_in_flight = None
+        self.max_retries = 0
+        self.retry_backoff = 0.5
+        self.split_failed_batches = False
+        self.on_failure = "raise"
+        self.checkpoint_path = None
+        self.vid_field = "vid"
+        self.src_field = "src"
+        self.dst_field = "dst"
+        self.rank_field = "__rank__"
+        # (row, error message) of rows failed to be written by the last write()
+        self.failed_rows: List[Tuple[Any, str]] = []
+        self._failed_rows_lock = threading.Lock()
+        self.profiler = profiler or NULL_PROFILER
+        # the summary of the profiler of the last write()
+        self.last_profile: Optional[Dict[str, Any]] = None
+
+        # a manager given is shared with others, and not closed by release()
+        self._own_sessions = not isinstance(nebula_config, NebulaSessionManager)
+        self.sessions = NebulaSessionManager.of(nebula_config)
+        nebula_config = self.sessions.config
         self.space = nebula_config.space
         self.nebula_user = nebula_config.user
         self.nebula_password = nebula_config.password
-        self.connection_pool = ConnectionPool()
-        assert self.connection_pool.init(
-            graphd_host_list, config
-        ), "Init Connection Pool Failed"
 
     def set_options(
         self,
@@ -40,14 +165,57 @@ class NebulaWriter:
         sink: Literal[
             "nebulagraph_vertex", "nebulagraph_edge"
         ] = "nebulagraph_vertex",
+        concurrency: int = 1,  # number of sessions executing batches in parallel
+        max_in_flight: Optional[int] = None,  # batches built but not yet written
+        max_retries: int = 0,  # retries of a failed batch, with exponential backoff
+        retry_backoff: float = 0.5,  # seconds to wait before the first retry
+        split_failed_batches: bool = False,  # bisect failed batches to isolate rows
+        on_failure: Literal["raise", "skip"] = "raise",
+        checkpoint_path: Optional[str] = None,  # record written batches to resume
+        # columns(or node/edge attributes) of vid, src, dst and rank, used when
+        # data is a DataFrame, a dict of columns or a NetworkX graph
+        vid_field: str = "vid",
+        src_field: str = "src",
+        dst_field: str = "dst",
+        rank_field: str = "__rank__",
     ):
+        assert concurrency >= 1, "concurrency should be a positive integer"
+        assert max_retries >= 0, "max_retries should not be negative"
+        assert on_failure in ("raise", "skip"), "on_failure should be raise or skip"
         self.label = label
         self.properties = properties
         self.batch_size = batch_size
         self.write_mode = write_mode.lower()
         self.sink = sink.lower()
+        self.concurrency = concurrency
+        self.max_in_flight = max_in_flight or 2 * concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.split_failed_batches = split_failed_batches
+        self.on_failure = on_failure
+        self.checkpoint_path = checkpoint_path
+        self.vid_field = vid_field
+        self.src_field = src_field
+        self.dst_field = dst_field
+        self.rank_field = rank_field
+        # the session of the write call itself is held along with the workers'
+        if concurrency + 1 > self.sessions.max_sessions:
+            assert self._own_sessions, (
+                f"concurrency {concurrency} needs {concurrency + 1} sessions, "
+                "more than max_sessions of the session manager"
+            )
+            self.sessions.close()
+            self.sessions = NebulaSessionManager(
+                self.sessions.config, max_sessions=concurrency + 1
+            )
 
+    @profiled
     def write(self):
+        """
+        write the data, return True when every row is written. With
+        on_failure="skip", rows that still fail after retries are collected in
+        self.failed_rows and False is returned.
+        """
         if self.write_mode == "update":
             raise NotImplementedError("Update mode is not implemented yet")
         if self.write_mode != "insert":
@@ -59,162 +227,296 @@ class NebulaWriter:
         else:
             raise ValueError("Invalid sink type")
 
-    def _write_vertex(self):
-        if self.sink == "nebulagraph_edge":
-            raise NotImplementedError("Edge sink is not implemented yet")
-        if self.write_mode != "insert" or self.sink != "nebulagraph_vertex":
-            raise ValueError("Only insert mode and vertex sink are supported now")
-        # TODO: add more write modes and sinks later
-        with self.connection_pool.session_context(
-            self.nebula_user, self.nebula_password
-        ) as session:
-            assert session.execute(
-                f"USE {self.space}"
-            ).is_succeeded(), f"Failed to use space {self.space}"
-            # get types of properties
-            properties_types = {}
-            query = f"DESC TAG {self.label}"
-            result = session.execute(query)
-            assert result.is_succeeded(), (
-                f"Failed to get types of properties: {result.error_msg()}, "
-                f"consider creating TAG {self.label} first."
-            )
-            types_df = result_to_df(result)
+    def _is_columns(self, fields: List[str]) -> bool:
+        """
+        whether data is a dict of columns, rather than a dict of vid -> values
+        """
+        return isinstance(self.data, dict) and all(
+            isinstance(self.data.get(field), Sized)
+            and not isinstance(self.data[field], str)
+            for field in fields
+        )
 
-            for i in range(len(types_df)):
-                properties_types[types_df.iloc[i, 0]] = types_df.iloc[i, 1]
-            for property in self.properties:
-                if property not in properties_types:
-                    raise ValueError(
-                        f"Property {property} is not defined in TAG {self.label}"
-                    )
+    def _vertex_rows(self) -> Iterable:
+        """
+        stream (vid, values) from data, which is one of:
+        - a NetworkX graph, the properties are read from node attributes,
+          nodes having none of them(e.g. edge ends of other tags) are skipped,
+          unless the tag has no properties
+        - a DataFrame or a dict of columns, with vid_field and properties
+        - a dict of vid -> values or any iterable of (vid, values), where values
+          is a list of values or a single value
+        """
+        if isinstance(self.data, nx.Graph):
+            return (
+                (vid, [attrs.get(p) for p in self.properties])
+                for vid, attrs in self.data.nodes(data=True)
+                if not self.properties or any(p in attrs for p in self.properties)
+            )
+        fields = [self.vid_field] + list(self.properties)
+        if isinstance(self.data, pd.DataFrame) or self._is_columns(fields):
+            columns = [self.data[field] for field in fields]
+            return ((row[0], row[1:]) for row in zip(*columns))
+        if isinstance(self.data, dict):
+            return self.data.items()
+        if isinstance(self.data, Iterable):
+            return self.data
+        raise TypeError("Data should be a dict or an iterable of (vid, values)")
 
-            # Set up the write query in batches, string value should be enclosed by double quotes
-            # INSERT VERTEX {label} ({properties}) VALUES
-            # "{vid}":({value0, value1}),...;
-            query_prefix = (
-                f"INSERT VERTEX {self.label} ({','.join(self.properties)}) VALUES "
+    def _edge_rows(self) -> Iterable:
+        """
+        stream (src, dst, rank, values) from data, which is one of:
+        - a NetworkX graph, the properties are read from edge attributes, rank
+          from rank_field(0 if absent). Edges of other types(per the
+          "__type__" attribute set by the readers) are skipped
+        - a DataFrame or a dict of columns, with src_field, dst_field,
+          properties and optionally rank_field
+        - any iterable of (src, dst, rank, values)
+        """
+        if isinstance(self.data, nx.Graph):
+            return (
+                (
+                    src,
+                    dst,
+                    attrs.get(self.rank_field, 0),
+                    [attrs.get(p) for p in self.properties],
+                )
+                for src, dst, attrs in self.data.edges(data=True)
+                if attrs.get("__type__", self.label) == self.label
             )
-            query = query_prefix
-            # now self.data is a dict or a generator object, key is vid, value is a list of properties or single property
-            quote = '"'
-            if isinstance(self.data, dict):
-                for i, (vid, properties) in enumerate(self.data.items()):
-                    if i % self.batch_size == 0 and i != 0:
-                        # execute the query
-                        # remove tailing comma
-                        query = query[:-1]
-                        result = session.execute(query)
-                        assert (
-                            result.is_succeeded()
-                        ), f"Failed to write data: {result.error_msg()}"
-                        # reset the query
-                        query = query_prefix
-                    if isinstance(properties, list):
-                        # should add quotes to string values
-                        query += f"{quote}{vid}{quote}:({','.join([quote+str(value)+quote if properties_types[self.properties[i]] == 'string' else str(value) for i, value in enumerate(properties)])}),"
-                    else:
-                        query += f"{quote}{vid}{quote}:({quote+str(properties)+quote if properties_types[self.properties[0]] == 'string' else str(properties)}),"
-                # execute the last query
-                query = query[:-1]
-                result = session.execute(query)
-                assert (
-                    result.is_succeeded()
-                ), f"Failed to write data: {result.error_msg()}"
-            elif isinstance(self.data, Generator):
-                for i, (vid, properties) in enumerate(self.data):
-                    if i % self.batch_size == 0 and i != 0:
-                        # execute the query
-                        # remove tailing comma
-                        query = query[:-1]
-                        result = session.execute(query)
-                        assert (
-                            result.is_succeeded()
-                        ), f"Failed to write data: {result.error_msg()}"
-                        # reset the query
-                        query = query_prefix
-                    if isinstance(properties, list):
-                        # should add quotes to string values
-                        query += f"{quote}{vid}{quote}:({','.join([quote+str(value)+quote if properties_types[self.properties[i]] == 'string' else str(value) for i, value in enumerate(properties)])}),"
-                    else:
-                        query += f"{quote}{vid}{quote}:({quote+str(properties)+quote if properties_types[self.properties[0]] == 'string' else str(properties)}),"
-                # execute the last query
-                query = query[:-1]
-                result = session.execute(query)
-                assert (
-                    result.is_succeeded()
-                ), f"Failed to write data: {result.error_msg()}"
+        fields = [self.src_field, self.dst_field] + list(self.properties)
+        if isinstance(self.data, pd.DataFrame) or self._is_columns(fields):
+            columns = [self.data[field] for field in fields]
+            if self.rank_field in self.data:
+                ranks = self.data[self.rank_field]
             else:
-                raise TypeError("Data should be a dict or a generator object")
-        return True
+                ranks = repeat(0)
+            return (
+                (row[0], row[1], rank, row[2:])
+                for row, rank in zip(zip(*columns), ranks)
+            )
+        if isinstance(self.data, Iterable):
+            return self.data
+        raise TypeError("Data should be an iterable of (src, dst, rank, values)")
+
+    def _write_vertex(self):
+        rows = self._vertex_rows()
+
+        # INSERT VERTEX {label} ({properties}) VALUES
+        # "{vid}":({value0, value1}),...;
+        query_prefix = (
+            f"INSERT VERTEX {self.label} ({','.join(self.properties)}) VALUES "
+        )
+        with self.sessions.session() as session:
+            formatters = self._compile_formatters(session, "TAG")
+
+            def format_vertex(row) -> str:
+                vid, values = row
+                if not isinstance(values, (list, tuple)):
+                    values = (values,)
+                return (
+                    f"{quote(vid)}:"
+                    f"({','.join([f(v) for f, v in zip(formatters, values)])})"
+                )
+
+            self._write_rows(session, query_prefix, rows, format_vertex)
+        return not self.failed_rows
 
     def _write_edge(self):
-        with self.connection_pool.session_context(
-            self.nebula_user, self.nebula_password
-        ) as session:
-            assert session.execute(
-                f"USE {self.space}"
-            ).is_succeeded(), f"Failed to use space {self.space}"
-
-            # Get types of edge properties
-            properties_types = {}
-            query = f"DESC EDGE {self.label}"
-            result = session.execute(query)
-            assert result.is_succeeded(), (
-                f"Failed to get types of properties: {result.error_msg()}, "
-                f"consider creating EDGE {self.label} first."
-            )
-            types_df = result_to_df(result)
+        rows = self._edge_rows()
+        # INSERT EDGE {label} ({properties}) VALUES
+        # "{src}"->"{dst}"@{rank}:({value0, value1}),...;
+        query_prefix = (
+            f"INSERT EDGE {self.label} ({','.join(self.properties)}) VALUES "
+        )
+        with self.sessions.session() as session:
+            formatters = self._compile_formatters(session, "EDGE")
 
-            for i in range(len(types_df)):
-                properties_types[types_df.iloc[i, 0]] = types_df.iloc[i, 1]
-            for property in self.properties:
-                if property not in properties_types:
-                    raise ValueError(
-                        f"Property {property} is not defined in EDGE {self.label}"
-                    )
+            def format_edge(row) -> str:
+                src, dst, rank, values = row
+                # a missing rank is 0, as when there is no rank_field
+                rank = 0 if _is_null(rank) else int(rank)
+                return (
+                    f"{quote(src)}->{quote(dst)}@{rank}:"
+                    f"({','.join([f(v) for f, v in zip(formatters, values)])})"
+                )
 
-            # Set up the write query in batches
-            query_prefix = (
-                f"INSERT EDGE {self.label} ({','.join(self.properties)}) VALUES "
-            )
-            query = query_prefix
-            quote = '"'
-
-            def process_edge(src, dst, rank, props):
-                nonlocal query
-                prop_values = ",".join(
-                    [
-                        f"{quote}{str(value)}{quote}"
-                        if properties_types[self.properties[i]] == "string"
-                        else str(value)
-                        for i, value in enumerate(props)
-                    ]
+            self._write_rows(session, query_prefix, rows, format_edge)
+        return not self.failed_rows
+
+    def _compile_formatters(
+        self, session, schema: Literal["TAG", "EDGE"]
+    ) -> List[Callable[[Any], str]]:
+        """
+        get types of properties with DESC TAG/EDGE, and compile one value
+        formatter per property in the order of self.properties
+        """
+        with self.profiler.phase("schema"):
+            result = session.execute(f"DESC {schema} {self.label}")
+        assert result.is_succeeded(), (
+            f"Failed to get types of properties: {result.error_msg()}, "
+            f"consider creating {schema} {self.label} first."
+        )
+        types_df = result_to_df(result)
+        properties_types = dict(zip(types_df.iloc[:, 0], types_df.iloc[:, 1]))
+        for property in self.properties:
+            if property not in properties_types:
+                raise ValueError(
+                    f"Property {property} is not defined in {schema} {self.label}"
                 )
-                query += f"{quote}{src}{quote}->{quote}{dst}{quote}@{rank}:({prop_values}),"
-
-            batch_count = 0
-            for edge in self.data:
-                if batch_count == self.batch_size:
-                    # Execute the query
-                    query = query[:-1]  # Remove trailing comma
-                    result = session.execute(query)
-                    assert (
-                        result.is_succeeded()
-                    ), f"Failed to write data: {result.error_msg()}"
-                    query = query_prefix
-                    batch_count = 0
-
-                src, dst, rank, props = edge
-                process_edge(src, dst, rank, props)
-                batch_count += 1
-
-            # Execute the last batch
-            if batch_count > 0:
-                query = query[:-1]  # Remove trailing comma
+        return [compile_formatter(properties_types[p]) for p in self.properties]
+
+    def _write_rows(
+        self,
+        session,
+        query_prefix: str,
+        rows: Iterable,
+        format_row: Callable[[Any], str],
+    ):
+        """
+        split rows into batches of batch_size, each batch is formatted and
+        joined into one INSERT, batches recorded in the checkpoint are skipped
+        """
+        self.failed_rows = []
+        checkpoint = None
+        if self.checkpoint_path is not None:
+            checkpoint = WriteCheckpoint(
+                self.checkpoint_path,
+                {
+                    "space": self.space,
+                    "label": self.label,
+                    "sink": self.sink,
+                    "properties": list(self.properties),
+                    "batch_size": self.batch_size,
+                },
+            )
+        batches = (
+            (index, self._format_batch(batch, format_row))
+            for index, batch in enumerate(self._iter_batches(rows))
+            if checkpoint is None or index not in checkpoint.done
+        )
+        completed = False
+        try:
+            if self.concurrency > 1:
+                self._write_batches_concurrently(query_prefix, batches, checkpoint)
+            else:
+                for index, batch in batches:
+                    self._write_batch(session, query_prefix, batch)
+                    if checkpoint is not None:
+                        checkpoint.add(index)
+            completed = True
+        finally:
+            if checkpoint is not None:
+                checkpoint.close(remove=completed)
+
+    def _format_batch(
+        self, batch: list, format_row: Callable[[Any], str]
+    ) -> List[Tuple[Any, str]]:
+        with self.profiler.phase("format"):
+            return [(row, format_row(row)) for row in batch]
+
+    def _iter_batches(self, rows: Iterable) -> Iterator[list]:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _write_batches_concurrently(
+        self,
+        query_prefix: str,
+        batches: Iterator[Tuple[int, List[Tuple[Any, str]]]],
+        checkpoint: Optional[WriteCheckpoint],
+    ):
+        """
+        build batches in the calling thread and execute them on a pool of
+        sessions, at most max_in_flight batches are pending at any time, the
+        order in which batches land is not kept
+        """
+        sessions: Queue = Queue()
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        errors = []
+
+        def execute(index: int, batch: List[Tuple[Any, str]]):
+            session = sessions.get()
+            try:
+                self._write_batch(session, query_prefix, batch)
+                if checkpoint is not None:
+                    checkpoint.add(index)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                sessions.put(session)
+                in_flight.release()
+
+        try:
+            for _ in range(self.concurrency):
+                sessions.put(self.sessions.acquire())
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for index, batch in batches:
+                    in_flight.acquire()
+                    if errors:
+                        in_flight.release()
+                        break
+                    pool.submit(execute, index, batch)
+        finally:
+            while not sessions.empty():
+                self.sessions.release(sessions.get())
+        if errors:
+            raise errors[0]
+
+    def _write_batch(
+        self, session, query_prefix: str, batch: List[Tuple[Any, str]]
+    ):
+        """
+        write a batch of (row, formatted row), a batch still failing after
+        retries is bisected when split_failed_batches is set, so that only the
+        bad rows end up in failed_rows
+        """
+        query = query_prefix + ",".join([value for _, value in batch])
+        if self.profiler.enabled:
+            self.profiler.count("bytes_sent", len(query.encode()))
+        with self.profiler.phase("execute") as timing:
+            error = self._execute_with_retry(session, query)
+            timing.rows = len(batch)
+        if error is None:
+            return
+        if self.split_failed_batches and len(batch) > 1:
+            middle = len(batch) // 2
+            self._write_batch(session, query_prefix, batch[:middle])
+            self._write_batch(session, query_prefix, batch[middle:])
+            return
+        if self.on_failure == "raise":
+            raise AssertionError(f"Failed to write data: {error}")
+        self.profiler.count("failed_rows", len(batch))
+        with self._failed_rows_lock:
+            self.failed_rows.extend((row, error) for row, _ in batch)
+
+    def _execute_with_retry(self, session, query: str) -> Optional[str]:
+        """
+        execute the query, return None on success or the last error message
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                self.profiler.count("retries")
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            try:
                 result = session.execute(query)
-                assert (
-                    result.is_succeeded()
-                ), f"Failed to write data: {result.error_msg()}"
+            except Exception as e:
+                error = str(e)
+                continue
+            if result.is_succeeded():
+                return None
+            error = result.error_msg()
+        return error
+
+    def release(self):
+        if self._own_sessions:
+            self.sessions.close()
 
-        return True
+    def __del__(self):
+        self.release()
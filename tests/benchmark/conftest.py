@@ -0,0 +1,118 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import gc
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import pytest
+from fake_nebula import FakeGraph, install
+
+from ng_nx.utils import NebulaGraphConfig
+
+RESULTS: List[Dict[str, Any]] = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("ng_nx benchmark")
+    group.addoption(
+        "--bench-edges",
+        type=int,
+        default=100000,
+        help="number of edges of the synthetic graph",
+    )
+    group.addoption(
+        "--bench-rounds", type=int, default=3, help="timed rounds of each benchmark"
+    )
+    group.addoption(
+        "--bench-json", default=None, help="also write the results to this file"
+    )
+
+
+@pytest.fixture(scope="session")
+def num_edges(request) -> int:
+    return request.config.getoption("--bench-edges")
+
+
+@pytest.fixture(scope="session")
+def graph(num_edges) -> FakeGraph:
+    return FakeGraph(
+        num_vertices=max(1, num_edges // 10), edges={"follow": num_edges}
+    )
+
+
+@pytest.fixture
+def nebula(monkeypatch, graph) -> NebulaGraphConfig:
+    install(monkeypatch, graph)
+    return NebulaGraphConfig()
+
+
+@pytest.fixture
+def bench(request) -> Callable:
+    """
+    bench(func, items) runs func for --bench-rounds timed rounds, plus one
+    traced round for the peak memory(tracemalloc) and the memory blocks still
+    allocated by what func returns, and records items/s of the fastest round
+    """
+    rounds = request.config.getoption("--bench-rounds")
+
+    def run(func: Callable[[], Any], items: int) -> Any:
+        timings = []
+        for _ in range(rounds):
+            gc.collect()
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+            del result
+
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        try:
+            result = func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        gc.collect()
+        retained = sys.getallocatedblocks() - blocks
+
+        best = min(timings)
+        RESULTS.append(
+            {
+                "name": request.node.name,
+                "items": items,
+                "best_s": best,
+                "median_s": statistics.median(timings),
+                "items_per_s": items / best if best > 0 else float("inf"),
+                "peak_mib": peak / 2**20,
+                "retained_blocks": retained,
+            }
+        )
+        return result
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not RESULTS:
+        return
+    terminalreporter.section("ng_nx benchmark")
+    header = (
+        f"{'name':<44}{'items':>10}{'best s':>10}{'items/s':>12}"
+        f"{'peak MiB':>10}{'blocks':>11}"
+    )
+    terminalreporter.write_line(header)
+    for r in RESULTS:
+        terminalreporter.write_line(
+            f"{r['name']:<44}{r['items']:>10}{r['best_s']:>10.3f}"
+            f"{r['items_per_s']:>12.0f}{r['peak_mib']:>10.1f}"
+            f"{r['retained_blocks']:>11}"
+        )
+    path = config.getoption("--bench-json")
+    if path:
+        with open(path, "w") as f:
+            json.dump(RESULTS, f, indent=2)
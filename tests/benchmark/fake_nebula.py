@@ -0,0 +1,603 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+"""
+in-process fake of NebulaGraph for the benchmarks: a ConnectionPool whose
+sessions answer the queries of the readers and the writer, and a
+GraphStorageClient whose scans return batches of the same synthetic graph.
+Rows are generated once per graph, so that the benchmarks measure ng_nx rather
+than the fake.
+"""
+
+import contextlib
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from nebula3.common.ttypes import (
+    DataSet,
+    ErrorCode,
+    Path,
+    PropertyType,
+    Row,
+    Step,
+    Tag,
+    Value,
+    Vertex,
+)
+from nebula3.data.ResultSet import ResultSet
+from nebula3.graph.ttypes import ExecutionResponse
+from nebula3.meta.ttypes import ColumnDef, ColumnTypeDef, Schema
+from nebula3.sclient.ScanResult import EdgeResult, VertexResult
+
+NEBULA_TYPES = {
+    "int": "int64",
+    "double": "double",
+    "string": "string",
+    "bool": "bool",
+}
+PROPERTY_TYPES = {
+    "int": PropertyType.INT64,
+    "double": PropertyType.DOUBLE,
+    "string": PropertyType.STRING,
+    "bool": PropertyType.BOOL,
+}
+
+MATCH_PATTERN = re.compile(
+    r"MATCH \(v?\)-\[e:`(\w+)`\]->\(\)(?: WHERE (.*?))? RETURN (.*?)"
+    r"(?: ORDER BY (.*?))?(?: SKIP (\d+))?(?: LIMIT (\d+))?$"
+)
+GO_PATTERN = re.compile(
+    r"GO FROM (.*?) OVER (.*?)( REVERSELY| BIDIRECT)?(?: WHERE (.*?))? YIELD (.*)$"
+)
+# a string or int literal, as the vids and values in the queries of ng_nx
+LITERAL = r'("(?:[^"\\]|\\.)*"|-?\d+)'
+
+
+def _literal(text: str):
+    if text.startswith('"'):
+        return re.sub(r"\\(.)", r"\1", text[1:-1]).encode()
+    return int(text)
+
+
+def _aliases(fields: str) -> tuple:
+    """
+    the aliases of the fields of a RETURN or YIELD, each field of the queries
+    of ng_nx being aliased, e.g. ("src", "degree") of
+    "src(e) AS src, e.degree AS degree"
+    """
+    return tuple(re.findall(r" AS `?([\w.]+)`?(?:,|$)", fields))
+
+
+def _ranks(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """
+    the ranks of parallel edges, 0, 1, ... between the same vertices, so that
+    edges are unique by (src, dst, rank) as in NebulaGraph
+    """
+    order = np.lexsort((dst, src))
+    same = np.r_[False, (np.diff(src[order]) == 0) & (np.diff(dst[order]) == 0)]
+    starts = np.maximum.accumulate(np.where(same, 0, np.arange(len(order))))
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order)) - starts
+    return ranks
+
+
+def _filters(where: Optional[str]) -> List[tuple]:
+    """
+    the (field, test) of the conditions of a WHERE clause that are evaluated:
+    id(v) IN [...], dst(e) IN [...] and e.<prop> > <int>, as of refresh()
+    """
+    if where is None:
+        return []
+    filters = []
+    for field, values in re.findall(r"(id\(v\)|dst\(e\)) IN \[(.*?)\]", where):
+        vids = set(map(_literal, re.findall(LITERAL, values)))
+        field = "src" if field == "id(v)" else "dst"
+        filters.append((field, vids.__contains__))
+    for prop, value in re.findall(r"\be\.(\w+) > " + LITERAL, where):
+        filters.append((prop, _literal(value).__lt__))
+    return filters
+
+
+def _edge_filters(where: Optional[str]) -> List[tuple]:
+    """
+    the (edge, prop, test) of the conditions <edge>.<prop> > <int> of the WHERE
+    clause of a GO, which edges of other types do not satisfy
+    """
+    if where is None:
+        return []
+    return [
+        (edge, prop, _literal(value).__lt__)
+        for edge, prop, value in re.findall(r"`?(\w+)`?\.(\w+) > " + LITERAL, where)
+    ]
+
+
+def _value(kind: str, x) -> Value:
+    if kind == "int":
+        return Value(iVal=int(x))
+    if kind == "double":
+        return Value(fVal=float(x))
+    if kind == "bool":
+        return Value(bVal=bool(x))
+    return Value(sVal=f"s{x}".encode())
+
+
+class FakeGraph:
+    """
+    a synthetic graph of num_vertices vertices with one tag, and the given edge
+    types, each of some number of edges and properties of the given types
+    """
+
+    def __init__(
+        self,
+        num_vertices: int = 10000,
+        edges: Optional[Dict[str, int]] = None,
+        edge_properties: Optional[Dict[str, str]] = None,
+        tag: str = "player",
+        tag_properties: Optional[Dict[str, str]] = None,
+        num_parts: int = 10,
+        scan_batch_size: int = 1000,
+        path_length: int = 3,
+        seed: int = 0,
+    ):
+        self.num_vertices = num_vertices
+        self.edges = edges or {"follow": 100000}
+        self.edge_properties = edge_properties or {
+            "degree": "int",
+            "weight": "double",
+            "note": "string",
+        }
+        self.tag = tag
+        self.tag_properties = tag_properties or {"name": "string", "age": "int"}
+        self.num_parts = num_parts
+        self.scan_batch_size = scan_batch_size
+        self.path_length = path_length
+        self.rng = np.random.default_rng(seed)
+        self.vids = [Value(sVal=f"v{i}".encode()) for i in range(num_vertices)]
+        self._vid_index = {vid.value: i for i, vid in enumerate(self.vids)}
+        self._lock = threading.RLock()
+        self._edge_columns: Dict[str, dict] = {}
+        self._positions: Dict[tuple, Dict[int, np.ndarray]] = {}
+        self._match_rows: Dict[tuple, List[Row]] = {}
+        self._sorted_rows: Dict[tuple, List[Row]] = {}
+        self._scan_batches: Dict[tuple, List[DataSet]] = {}
+        # column names, rows and owning partitions of each edge type(or tag)
+        self._scan_rows: Dict[tuple, tuple] = {}
+        self._vertices: Optional[List[Vertex]] = None
+        self._path_rows: Dict[int, List[Row]] = {}
+
+    def edge_columns(self, edge: str) -> dict:
+        # generated once, even when scanned by several workers at the same time
+        with self._lock:
+            return self._generate_edge_columns(edge)
+
+    def _generate_edge_columns(self, edge: str) -> dict:
+        if edge not in self._edge_columns:
+            n = self.edges[edge]
+            src = self.rng.integers(0, self.num_vertices, n)
+            dst = self.rng.integers(0, self.num_vertices, n)
+            self._edge_columns[edge] = {
+                "src": src,
+                "dst": dst,
+                "rank": _ranks(src, dst),
+                "props": {
+                    prop: self.rng.integers(0, 1000, n)
+                    for prop in self.edge_properties
+                },
+            }
+        return self._edge_columns[edge]
+
+    def update_edges(self, edge: str, positions, **props):
+        """
+        set properties of the edges of edge at positions, e.g. for refresh()
+        """
+        columns = self.edge_columns(edge)
+        for prop, value in props.items():
+            columns["props"][prop][positions] = value
+        for rows in (
+            self._positions,
+            self._match_rows,
+            self._sorted_rows,
+            self._scan_rows,
+            self._scan_batches,
+        ):
+            rows.clear()
+
+    def match_rows(self, edge: str, fields: tuple) -> List[Row]:
+        """
+        rows of a MATCH of edge returning fields, e.g. ("src", "dst", "degree")
+        """
+        key = (edge, fields)
+        if key not in self._match_rows:
+            columns = self.edge_columns(edge)
+            values = []
+            for field in fields:
+                if field in ("src", "dst"):
+                    values.append([self.vids[i] for i in columns[field]])
+                elif field == "__rank__":
+                    values.append([Value(iVal=int(r)) for r in columns["rank"]])
+                elif field == "__type__":
+                    values.append([Value(sVal=edge.encode())] * self.edges[edge])
+                elif field.split(".")[-1] in self.edge_properties:
+                    # a property of another edge type, as yielded by GO, is empty
+                    name, _, prop = field.rpartition(".")
+                    kind = self.edge_properties[prop]
+                    if name in ("", edge):
+                        values.append(
+                            [_value(kind, x) for x in columns["props"][prop]]
+                        )
+                    else:
+                        values.append([Value()] * self.edges[edge])
+                else:
+                    values.append([Value(iVal=0)] * self.edges[edge])
+            self._match_rows[key] = [Row(values=list(row)) for row in zip(*values)]
+        return self._match_rows[key]
+
+    def sorted_match_rows(
+        self, edge: str, fields: tuple, order: tuple
+    ) -> List[Row]:
+        """
+        match_rows() sorted by the fields in order, e.g. ("src", "dst", "__rank__")
+        """
+        key = (edge, fields, order)
+        if key not in self._sorted_rows:
+            self._sorted_rows[key] = sorted(
+                self.match_rows(edge, fields), key=self.row_key(fields, order)
+            )
+        return self._sorted_rows[key]
+
+    def positions(self, edge: str, end: str, vids: set) -> np.ndarray:
+        """
+        positions of the edges of edge whose end("src" or "dst") is in vids
+        """
+        key = (edge, end)
+        if key not in self._positions:
+            ends = self.edge_columns(edge)[end]
+            order = np.argsort(ends, kind="stable")
+            bounds = np.searchsorted(ends[order], np.arange(self.num_vertices + 1))
+            self._positions[key] = {
+                v: order[bounds[v] : bounds[v + 1]]
+                for v in range(self.num_vertices)
+            }
+        indices = sorted(
+            self._vid_index[vid] for vid in vids if vid in self._vid_index
+        )
+        positions = [self._positions[key][v] for v in indices]
+        return np.concatenate(positions or [np.empty(0, dtype=np.int64)])
+
+    def out_degrees(self, edge: str) -> List[Row]:
+        """
+        rows of the vids having out edges of edge, and the number of them
+        """
+        vertices, counts = np.unique(
+            self.edge_columns(edge)["src"], return_counts=True
+        )
+        return [
+            Row(values=[self.vids[v], Value(iVal=int(c))])
+            for v, c in zip(vertices.tolist(), counts.tolist())
+        ]
+
+    @staticmethod
+    def row_key(fields: tuple, order: tuple):
+        positions = [fields.index(field) for field in order]
+        return lambda row: tuple(row.values[i].value for i in positions)
+
+    def vertices(self) -> List[Vertex]:
+        if self._vertices is None:
+            self._vertices = [
+                Vertex(
+                    vid=self.vids[i],
+                    tags=[
+                        Tag(
+                            name=self.tag.encode(),
+                            props={
+                                prop.encode(): _value(kind, i)
+                                for prop, kind in self.tag_properties.items()
+                            },
+                        )
+                    ],
+                )
+                for i in range(self.num_vertices)
+            ]
+        return self._vertices
+
+    def path_rows(self, num_paths: int) -> List[Row]:
+        """
+        rows of paths along random edges of the first edge type
+        """
+        if num_paths in self._path_rows:
+            return self._path_rows[num_paths]
+        edge = next(iter(self.edges))
+        columns = self.edge_columns(edge)
+        vertices = self.vertices()
+        starts = self.rng.integers(0, self.edges[edge], num_paths)
+        rows = []
+        for start in starts.tolist():
+            steps = []
+            for k in range(self.path_length):
+                j = (start + k) % self.edges[edge]
+                steps.append(
+                    Step(
+                        dst=vertices[columns["dst"][j]],
+                        type=1,
+                        name=edge.encode(),
+                        ranking=int(columns["rank"][j]),
+                        props={
+                            prop.encode(): _value(kind, columns["props"][prop][j])
+                            for prop, kind in self.edge_properties.items()
+                        },
+                    )
+                )
+            src = vertices[columns["src"][start % self.edges[edge]]]
+            rows.append(Row(values=[Value(pVal=Path(src=src, steps=steps))]))
+        self._path_rows[num_paths] = rows
+        return rows
+
+    def scan_batches(
+        self, kind: str, name: str, part: Optional[int]
+    ) -> List[DataSet]:
+        """
+        scanned data sets of an edge type or tag, of one partition(1-based) or
+        all of them
+        """
+        key = (kind, name, part)
+        if key not in self._scan_batches:
+            if (kind, name) not in self._scan_rows:
+                self._scan_rows[(kind, name)] = (
+                    self._scan_edge_rows(name)
+                    if kind == "edge"
+                    else self._scan_vertex_rows(name)
+                )
+            column_names, rows, owners = self._scan_rows[(kind, name)]
+            if part is not None:
+                rows = [
+                    row for row, owner in zip(rows, owners) if owner == part - 1
+                ]
+            size = self.scan_batch_size
+            self._scan_batches[key] = [
+                DataSet(column_names=column_names, rows=rows[i : i + size])
+                for i in range(0, len(rows), size)
+            ]
+        return self._scan_batches[key]
+
+    def _scan_edge_rows(self, edge: str):
+        columns = self.edge_columns(edge)
+        fields = ["_src", "_type", "_rank", "_dst"] + list(self.edge_properties)
+        column_names = [f"{edge}.{field}".encode() for field in fields]
+        rows = []
+        for j in range(self.edges[edge]):
+            values = [
+                self.vids[columns["src"][j]],
+                Value(iVal=1),
+                Value(iVal=int(columns["rank"][j])),
+                self.vids[columns["dst"][j]],
+            ]
+            for prop, kind in self.edge_properties.items():
+                values.append(_value(kind, columns["props"][prop][j]))
+            rows.append(Row(values=values))
+        return column_names, rows, columns["src"] % self.num_parts
+
+    def _scan_vertex_rows(self, tag: str):
+        fields = ["_vid"] + list(self.tag_properties)
+        column_names = [b"_vid"] + [f"{tag}.{field}".encode() for field in fields]
+        rows = [
+            Row(
+                values=[self.vids[i], self.vids[i]]
+                + [_value(kind, i) for kind in self.tag_properties.values()]
+            )
+            for i in range(self.num_vertices)
+        ]
+        return column_names, rows, np.arange(self.num_vertices) % self.num_parts
+
+
+def result_set(column_names: List[str], rows: List[Row]) -> ResultSet:
+    resp = ExecutionResponse(
+        error_code=ErrorCode.SUCCEEDED,
+        latency_in_us=1,
+        data=DataSet(
+            column_names=[name.encode() for name in column_names], rows=rows
+        ),
+    )
+    return ResultSet(resp, 1)
+
+
+class FakeSession:
+    def __init__(self, graph: FakeGraph):
+        self.graph = graph
+
+    def execute(self, query: str) -> ResultSet:
+        if query.startswith(("USE", "INSERT", "YIELD")):
+            return result_set([], [])
+        if query.startswith("DESC"):
+            properties = (
+                self.graph.tag_properties
+                if query.startswith("DESC TAG")
+                else self.graph.edge_properties
+            )
+            return result_set(
+                ["Field", "Type", "Null", "Default", "Comment"],
+                [
+                    Row(
+                        values=[
+                            Value(sVal=prop.encode()),
+                            Value(sVal=NEBULA_TYPES[kind].encode()),
+                            Value(sVal=b"YES"),
+                            Value(sVal=b""),
+                            Value(sVal=b""),
+                        ]
+                    )
+                    for prop, kind in properties.items()
+                ],
+            )
+        m = MATCH_PATTERN.match(query)
+        if m:
+            edge, where, returns, order, skip, limit = m.groups()
+            fields = _aliases(returns)
+            if "count(*)" in returns:
+                return result_set(list(fields), self.graph.out_degrees(edge))
+            if order is None:
+                rows = self.graph.match_rows(edge, fields)
+            else:
+                order = tuple(field.strip("`") for field in order.split(", "))
+                rows = self.graph.sorted_match_rows(edge, fields, order)
+            for field, test in _filters(where):
+                if field in fields:
+                    i = fields.index(field)
+                    rows = [row for row in rows if test(row.values[i].value)]
+            start = int(skip or 0)
+            end = None if limit is None else start + int(limit)
+            return result_set(list(fields), rows[start:end])
+        m = GO_PATTERN.match(query)
+        if m:
+            return self._go(*m.groups())
+        if query.startswith("MATCH p"):
+            return result_set(["p"], self.graph.path_rows(self.graph.num_vertices))
+        raise ValueError(f"Unsupported query: {query}")
+
+    def _go(self, vids, edges, direction, where, yields) -> ResultSet:
+        """
+        the edges of GO FROM vids OVER edges, those of both directions of
+        BIDIRECT one after another, so an edge between two of the vids is
+        returned twice, as by graphd
+        """
+        starts = set(map(_literal, re.findall(LITERAL, vids)))
+        fields = _aliases(yields)
+        ends = {None: ("src",), " REVERSELY": ("dst",), " BIDIRECT": ("src", "dst")}
+        conditions = _edge_filters(where)
+        rows = []
+        for edge in re.findall(r"`(\w+)`", edges):
+            edge_rows = self.graph.match_rows(edge, fields)
+            props = self.graph.edge_columns(edge)["props"]
+            for end in ends[direction]:
+                positions = self.graph.positions(edge, end, starts)
+                for name, prop, test in conditions:
+                    if name != edge:
+                        positions = positions[:0]
+                    else:
+                        values = props[prop][positions].tolist()
+                        keep = np.asarray([test(x) for x in values], dtype=bool)
+                        positions = positions[keep]
+                rows += [edge_rows[j] for j in positions.tolist()]
+        return result_set(list(fields), rows)
+
+    def release(self):
+        pass
+
+
+class FakeConnectionPool:
+    graph: FakeGraph
+
+    def init(self, addresses, configs) -> bool:
+        return True
+
+    @contextlib.contextmanager
+    def session_context(self, *args, **kwargs):
+        yield FakeSession(self.graph)
+
+    def get_session(self, *args, **kwargs) -> FakeSession:
+        return FakeSession(self.graph)
+
+    def close(self):
+        pass
+
+
+class FakeMetaCache:
+    graph: FakeGraph
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def close(self):
+        pass
+
+    def get_part_leaders(self, space: str) -> Dict[int, tuple]:
+        return {
+            part: ("storaged", 9779) for part in range(1, self.graph.num_parts + 1)
+        }
+
+    def get_edge_schema(self, space: str, edge: str) -> Schema:
+        return self._schema(self.graph.edge_properties)
+
+    def get_tag_schema(self, space: str, tag: str) -> Schema:
+        return self._schema(self.graph.tag_properties)
+
+    def _schema(self, properties: Dict[str, str]) -> Schema:
+        return Schema(
+            columns=[
+                ColumnDef(
+                    name=prop.encode(),
+                    type=ColumnTypeDef(type=PROPERTY_TYPES[kind]),
+                )
+                for prop, kind in properties.items()
+            ]
+        )
+
+
+class FakeScanResult:
+    def __init__(self, data_sets: List[DataSet], is_vertex: bool):
+        self.data_sets = data_sets
+        self.is_vertex = is_vertex
+        self.index = 0
+
+    def has_next(self) -> bool:
+        return self.index < len(self.data_sets)
+
+    def next(self):
+        data_set = self.data_sets[self.index]
+        self.index += 1
+        return (
+            VertexResult([data_set]) if self.is_vertex else EdgeResult([data_set])
+        )
+
+
+class FakeGraphStorageClient:
+    graph: FakeGraph
+
+    def __init__(self, meta_cache, *args, **kwargs):
+        pass
+
+    def scan_edge(self, space_name, edge_name, prop_names=[], **kwargs):
+        return FakeScanResult(
+            self.graph.scan_batches("edge", edge_name, None), False
+        )
+
+    def scan_edge_with_part(
+        self, space_name, part, edge_name, prop_names=[], **kwargs
+    ):
+        return FakeScanResult(
+            self.graph.scan_batches("edge", edge_name, part), False
+        )
+
+    def scan_vertex(self, space_name, tag_name, prop_names=[], **kwargs):
+        return FakeScanResult(
+            self.graph.scan_batches("vertex", tag_name, None), True
+        )
+
+    def scan_vertex_with_part(
+        self, space_name, part, tag_name, prop_names=[], **kwargs
+    ):
+        return FakeScanResult(
+            self.graph.scan_batches("vertex", tag_name, part), True
+        )
+
+    def close(self):
+        pass
+
+
+def install(monkeypatch, graph: FakeGraph):
+    """
+    make the readers and the writer talk to graph
+    """
+    import ng_nx.scan_reader
+    import ng_nx.session
+
+    for cls in (FakeConnectionPool, FakeMetaCache, FakeGraphStorageClient):
+        monkeypatch.setattr(cls, "graph", graph, raising=False)
+    monkeypatch.setattr(ng_nx.session, "ConnectionPool", FakeConnectionPool)
+    monkeypatch.setattr(ng_nx.scan_reader, "MetaCache", FakeMetaCache)
+    monkeypatch.setattr(
+        ng_nx.scan_reader, "GraphStorageClient", FakeGraphStorageClient
+    )
+    # storage clients of worker processes are kept per process
+    monkeypatch.setattr(ng_nx.scan_reader, "_PROCESS_CLIENTS", {})
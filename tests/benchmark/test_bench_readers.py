@@ -0,0 +1,108 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import pytest
+
+from ng_nx import NebulaQueryReader, NebulaReader, NebulaScanReader, VidMap
+from ng_nx.profiling import Profiler
+
+PROPERTIES = ["degree", "weight", "note"]
+
+
+@pytest.mark.parametrize("output_format", ["networkx", "csr"])
+@pytest.mark.parametrize("with_rank", [False, True])
+def test_nebula_reader(bench, nebula, num_edges, output_format, with_rank):
+    reader = NebulaReader(
+        ["follow"],
+        [PROPERTIES],
+        nebula,
+        limit=None,
+        with_rank=with_rank,
+        output_format=output_format,
+    )
+    g = bench(reader.read, num_edges)
+    assert g is not None
+
+
+def test_nebula_reader_paged(bench, nebula, num_edges):
+    reader = NebulaReader(
+        ["follow"], [PROPERTIES], nebula, limit=None, page_size=10000
+    )
+    bench(reader.read, num_edges)
+
+
+@pytest.mark.parametrize("output_format", ["networkx", "csr"])
+@pytest.mark.parametrize("parallelism", [1, 4])
+def test_scan_reader(bench, nebula, num_edges, output_format, parallelism):
+    reader = NebulaScanReader(
+        ["follow"],
+        [PROPERTIES],
+        nebula,
+        limit=num_edges,
+        parallelism=parallelism,
+        output_format=output_format,
+    )
+    bench(reader.read, num_edges)
+
+
+def test_scan_reader_table(bench, nebula, num_edges):
+    reader = NebulaScanReader(["follow"], [PROPERTIES], nebula, limit=num_edges)
+    table = bench(reader.read_table, num_edges)
+    assert len(table) == num_edges
+
+
+def test_scan_reader_vertices(bench, nebula, graph):
+    reader = NebulaScanReader(
+        [],
+        [],
+        nebula,
+        limit=graph.num_vertices,
+        vertices=[graph.tag],
+        vertex_properties=[list(graph.tag_properties)],
+    )
+    bench(reader.read, graph.num_vertices)
+
+
+@pytest.mark.parametrize("output_format", ["networkx", "csr"])
+def test_query_reader_paths(bench, nebula, graph, output_format):
+    reader = NebulaQueryReader(nebula, output_format=output_format)
+    query = "MATCH p=(v:player)-[e:follow*3]->() RETURN p"
+    # every path is a row of path_length edges
+    bench(lambda: reader.read(query), graph.num_vertices * graph.path_length)
+
+
+def test_nebula_reader_profiled(bench, nebula, num_edges):
+    reader = NebulaReader(
+        ["follow"], [PROPERTIES], nebula, limit=None, profiler=Profiler()
+    )
+    bench(reader.read, num_edges)
+    assert reader.last_profile["counts"]["edges"] == num_edges
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_scan_reader_export(bench, nebula, num_edges, tmp_path, file_format):
+    pytest.importorskip("pyarrow")
+    reader = NebulaScanReader(["follow"], [PROPERTIES], nebula, limit=num_edges)
+    # the peak memory is bounded by row groups rather than the edges
+    manifest = bench(
+        lambda: reader.export(str(tmp_path), file_format=file_format), num_edges
+    )
+    assert manifest["edges"]["follow"]["rows"] == num_edges
+
+
+def test_nebula_reader_export(bench, nebula, num_edges, tmp_path):
+    pytest.importorskip("pyarrow")
+    reader = NebulaReader(["follow"], [PROPERTIES], nebula, limit=None)
+    # pages of a row group each, each going from a batch of source vertices
+    manifest = bench(
+        lambda: reader.export(str(tmp_path), row_group_size=10000), num_edges
+    )
+    assert manifest["edges"]["follow"]["rows"] == num_edges
+
+
+def test_scan_reader_vid_map(bench, nebula, num_edges):
+    reader = NebulaScanReader(
+        ["follow"], [PROPERTIES], nebula, limit=num_edges, vid_map=VidMap()
+    )
+    g = bench(reader.read, num_edges)
+    assert all(isinstance(node, int) for node in g)
@@ -0,0 +1,32 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+from fake_nebula import result_set
+from nebula3.data.DataObject import ValueWrapper
+
+from ng_nx.utils import cast, cast_column, result_to_df
+
+FIELDS = ("src", "dst", "degree", "weight", "note")
+
+
+def test_cast(bench, graph, num_edges):
+    values = [
+        ValueWrapper(row.values[2]) for row in graph.match_rows("follow", FIELDS)
+    ]
+    bench(lambda: [cast(value) for value in values], num_edges)
+
+
+def test_cast_column(bench, graph, num_edges):
+    values = [row.values[2] for row in graph.match_rows("follow", FIELDS)]
+    bench(lambda: cast_column(values), num_edges)
+
+
+def test_cast_column_string(bench, graph, num_edges):
+    values = [row.values[4] for row in graph.match_rows("follow", FIELDS)]
+    bench(lambda: cast_column(values), num_edges)
+
+
+def test_result_to_df(bench, graph, num_edges):
+    result = result_set(list(FIELDS), graph.match_rows("follow", FIELDS))
+    df = bench(lambda: result_to_df(result), num_edges)
+    assert len(df) == num_edges
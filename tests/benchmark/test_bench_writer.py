@@ -0,0 +1,49 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import pandas as pd
+import pytest
+
+from ng_nx import NebulaWriter
+
+
+@pytest.fixture(scope="module")
+def edge_df(graph):
+    columns = graph.edge_columns("follow")
+    return pd.DataFrame(
+        {
+            "src": [f"v{i}" for i in columns["src"]],
+            "dst": [f"v{i}" for i in columns["dst"]],
+            "__rank__": columns["rank"],
+            "degree": columns["props"]["degree"],
+            "weight": columns["props"]["weight"].astype(float),
+            "note": [f"s{x}" for x in columns["props"]["note"]],
+        }
+    )
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_write_edges(bench, nebula, edge_df, concurrency):
+    writer = NebulaWriter(data=edge_df, nebula_config=nebula)
+    writer.set_options(
+        label="follow",
+        properties=["degree", "weight", "note"],
+        sink="nebulagraph_edge",
+        concurrency=concurrency,
+    )
+    assert bench(writer.write, len(edge_df))
+
+
+def test_write_vertices(bench, nebula, graph):
+    df = pd.DataFrame(
+        {
+            "vid": [f"v{i}" for i in range(graph.num_vertices)],
+            "name": [f"s{i}" for i in range(graph.num_vertices)],
+            "age": range(graph.num_vertices),
+        }
+    )
+    writer = NebulaWriter(data=df, nebula_config=nebula)
+    writer.set_options(
+        label=graph.tag, properties=["name", "age"], sink="nebulagraph_vertex"
+    )
+    assert bench(writer.write, len(df))
@@ -0,0 +1,48 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import os
+import sys
+from typing import List
+
+import pytest
+
+# the in-process fake of NebulaGraph is shared with the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "benchmark"))
+
+from fake_nebula import FakeGraph, FakeSession, install  # noqa: E402
+
+from ng_nx.utils import NebulaGraphConfig  # noqa: E402
+
+
+@pytest.fixture
+def graph() -> FakeGraph:
+    # few vertices, so that there are parallel edges of the same type
+    return FakeGraph(
+        num_vertices=30,
+        edges={"follow": 300, "serve": 100},
+        num_parts=3,
+        scan_batch_size=50,
+    )
+
+
+@pytest.fixture
+def nebula(monkeypatch, graph) -> NebulaGraphConfig:
+    install(monkeypatch, graph)
+    return NebulaGraphConfig()
+
+
+@pytest.fixture
+def queries(monkeypatch, nebula) -> List[str]:
+    """
+    the queries executed on the sessions of the fake, in order
+    """
+    executed: List[str] = []
+    execute = FakeSession.execute
+
+    def record(self, query: str):
+        executed.append(query)
+        return execute(self, query)
+
+    monkeypatch.setattr(FakeSession, "execute", record)
+    return executed
@@ -0,0 +1,116 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import datetime
+import glob
+import os
+import tempfile
+import time
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from ng_nx import NebulaReader
+from ng_nx.cache import SnapshotCache
+
+
+def _graph() -> nx.MultiDiGraph:
+    g = nx.MultiDiGraph()
+    g.add_edge("a", "b", degree=1, __type__="follow")
+    g.add_edge("a", "b", note="x", __type__="follow")
+    g.add_node("c", age=3)
+    return g
+
+
+def test_round_trip(tmp_path):
+    cache = SnapshotCache(str(tmp_path))
+    g = _graph()
+    cache.save_graph("k", g)
+    loaded = cache.load_graph("k")
+    assert list(loaded.edges(keys=True, data=True)) == list(
+        g.edges(keys=True, data=True)
+    )
+    assert dict(loaded.nodes(data=True)) == dict(g.nodes(data=True))
+    assert cache.load_graph("missing") is None
+
+
+def test_nothing_is_pickled(tmp_path):
+    cache = SnapshotCache(str(tmp_path))
+    g = _graph()
+    g.add_node("d", labels=["player", "team"], born=datetime.date(2000, 1, 2))
+    g.add_node("é", name="ü", age=None)
+    cache.save_graph("k", g)
+    entry = tmp_path / SnapshotCache.ENTRIES_DIR / "k"
+    for path in glob.glob(str(entry / "*" / "*.npy")):
+        np.load(path, allow_pickle=False)
+    loaded = dict(cache.load_graph("k").nodes(data=True))
+    assert loaded["d"] == {"labels": ["player", "team"], "born": "2000-01-02"}
+    assert loaded["é"] == {"name": "ü", "age": None}
+    assert loaded["c"] == {"age": 3}
+
+
+def test_ttl(tmp_path):
+    cache = SnapshotCache(str(tmp_path), ttl=0.01)
+    cache.save_graph("k", _graph())
+    time.sleep(0.05)
+    assert cache.load_graph("k") is None
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = SnapshotCache(str(tmp_path))
+    cache.save_graph("size", _graph())
+    size = cache._read_meta(os.path.join(cache._entries, "size"))["size"]
+    cache.invalidate()
+
+    cache = SnapshotCache(str(tmp_path), max_bytes=2 * size)
+    cache.save_graph("k1", _graph())
+    cache.save_graph("k2", _graph())
+    assert cache.load_graph("k1") is not None
+    cache.save_graph("k3", _graph())
+    assert cache.load_graph("k2") is None
+    assert cache.load_graph("k1") is not None
+    assert cache.load_graph("k3") is not None
+
+
+def test_invalidate_only_removes_entries(tmp_path):
+    os.makedirs(tmp_path / "my_project")
+    (tmp_path / "notes.txt").write_text("")
+    cache = SnapshotCache(str(tmp_path), max_bytes=1)
+    # the staging directory of a save in progress
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=str(tmp_path))
+    cache.save_graph("k1", _graph())
+    cache.save_graph("k2", _graph())
+    assert os.listdir(tmp_path / SnapshotCache.ENTRIES_DIR) == ["k2"]
+    cache.invalidate("k2")
+    cache.save_graph("k3", _graph())
+    cache.invalidate()
+    assert os.listdir(tmp_path / SnapshotCache.ENTRIES_DIR) == []
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [
+            SnapshotCache.ENTRIES_DIR,
+            "my_project",
+            "notes.txt",
+            os.path.basename(staging),
+        ]
+    )
+
+
+@pytest.mark.parametrize("with_rank", [False, True])
+def test_reader_reads_through(nebula, queries, tmp_path, with_rank):
+    cache = SnapshotCache(str(tmp_path))
+    reader = NebulaReader(
+        ["follow", "serve"],
+        [["degree"], ["degree"]],
+        nebula,
+        None,
+        cache=cache,
+        with_rank=with_rank,
+    )
+    g = reader.read()
+    executed = len(queries)
+    cached = reader.read()
+    assert len(queries) == executed
+    assert sorted(cached.edges(keys=True, data="degree"), key=str) == sorted(
+        g.edges(keys=True, data="degree"), key=str
+    )
@@ -0,0 +1,122 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from ng_nx import NebulaReader, VidMap
+from ng_nx.cache import PRESENT_PREFIX, SnapshotCache
+from ng_nx.compact import (
+    CompactGraph,
+    CompactGraphBuilder,
+    check_output,
+    read_cached,
+)
+
+
+def _edges(g) -> list:
+    return sorted(
+        (u, v, k, tuple(sorted(data.items())))
+        for u, v, k, data in g.edges(keys=True, data=True)
+    )
+
+
+def _builder() -> CompactGraphBuilder:
+    builder = CompactGraphBuilder()
+    builder.add_nodes(np.array(["a", "c"], dtype=object), {"age": np.array([1, 3])})
+    builder.add_edges(
+        np.array(["a", "a", "b"], dtype=object),
+        np.array(["b", "b", "c"], dtype=object),
+        {"degree": np.array([1, 2, 3]), "weight": np.array([0.5, 1.5, 2.5])},
+        "follow",
+    )
+    builder.add_edges(
+        np.array(["c"], dtype=object),
+        np.array(["a"], dtype=object),
+        {"degree": np.array([4])},
+        "serve",
+    )
+    return builder
+
+
+def test_build_is_networkx():
+    g = _builder().build()
+    expected = nx.MultiDiGraph()
+    expected.add_node("a", age=1)
+    expected.add_node("c", age=3)
+    expected.add_edge("a", "b", degree=1, weight=0.5, __type__="follow")
+    expected.add_edge("a", "b", degree=2, weight=1.5, __type__="follow")
+    expected.add_edge("b", "c", degree=3, weight=2.5, __type__="follow")
+    expected.add_edge("c", "a", degree=4, __type__="serve")
+    assert _edges(g.to_networkx()) == _edges(expected)
+    assert dict(g.to_networkx().nodes(data=True)) == dict(expected.nodes(data=True))
+    assert _edges(CompactGraph.from_networkx(expected).to_networkx()) == _edges(
+        expected
+    )
+
+
+def test_columns_stay_typed():
+    g = _builder().build()
+    assert g.edge_attrs["degree"].dtype == np.int64
+    # weight is missing from the serve edge
+    assert g.edge_attrs["weight"].dtype == object
+    assert g.edge_attrs[PRESENT_PREFIX + "weight"].sum() == 3
+    assert g.node_attrs["age"].dtype == object
+    assert g.node_attrs[PRESENT_PREFIX + "age"].sum() == 2
+
+
+def test_to_scipy():
+    pytest.importorskip("scipy")
+    g = _builder().build()
+    matrix = g.to_scipy("weight").toarray()
+    index = g.index
+    assert matrix[index["a"], index["b"]] == 2.0
+    assert matrix[index["c"], index["a"]] == 1.0
+    assert matrix.sum() == 5.5
+
+
+@pytest.mark.parametrize("with_rank", [False, True])
+def test_reader_csr_is_networkx(nebula, with_rank):
+    kwargs = dict(with_rank=with_rank, page_size=50)
+    g = NebulaReader(
+        ["follow"], [["degree", "note"]], nebula, None, **kwargs
+    ).read()
+    csr = NebulaReader(
+        ["follow"],
+        [["degree", "note"]],
+        nebula,
+        None,
+        output_format="csr",
+        **kwargs,
+    ).read()
+    assert _edges(csr.to_networkx()) == _edges(g)
+
+
+@pytest.mark.parametrize("output_format", ["networkx", "csr"])
+def test_read_cached(tmp_path, output_format):
+    reads = []
+
+    def read():
+        reads.append(1)
+        g = _builder().build()
+        return g if output_format == "csr" else g.to_networkx()
+
+    # without a cache the key is never made
+    g = read_cached(None, lambda: 1 / 0, read, output_format)
+    cache = SnapshotCache(str(tmp_path))
+    first = read_cached(cache, lambda: "key", read, output_format)
+    cached = read_cached(cache, lambda: "key", read, output_format)
+    assert len(reads) == 2
+    assert type(cached) is type(g)
+    if output_format == "csr":
+        first, cached = first.to_networkx(), cached.to_networkx()
+    assert _edges(cached) == _edges(first)
+
+
+def test_check_output(tmp_path):
+    check_output("csr", VidMap())
+    with pytest.raises(AssertionError):
+        check_output("arrow")
+    with pytest.raises(AssertionError):
+        check_output("networkx", VidMap(), SnapshotCache(str(tmp_path)))
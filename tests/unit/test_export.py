@@ -0,0 +1,84 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import pytest
+
+from ng_nx import NebulaReader, NebulaScanReader
+from ng_nx.export import load_export
+
+pytest.importorskip("pyarrow")
+
+EDGES = ["follow", "serve"]
+PROPERTIES = [["degree", "note"], ["degree"]]
+LIMIT = 10**6
+
+
+def _rows(df, columns) -> list:
+    return sorted(df[columns].itertuples(index=False, name=None))
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_scan_export_round_trip(nebula, graph, tmp_path, file_format):
+    reader = NebulaScanReader(
+        EDGES,
+        PROPERTIES,
+        nebula,
+        LIMIT,
+        vertices=["player"],
+        vertex_properties=[["name", "age"]],
+    )
+    manifest = reader.export(str(tmp_path), file_format=file_format)
+    assert manifest["format"] == file_format
+
+    follow = load_export(str(tmp_path), edge="follow")
+    assert follow.num_rows == manifest["edges"]["follow"]["rows"]
+    assert follow.num_rows == graph.edges["follow"]
+    columns = ["src", "dst", "__rank__", "degree", "note"]
+    table = reader.read_table()
+    expected = table[table["__type__"] == "follow"]
+    assert _rows(follow.to_pandas(), columns) == _rows(expected, columns)
+
+    # only the files of the partitions asked for
+    files = manifest["edges"]["follow"]["files"]
+    part = load_export(str(tmp_path), edge="follow", parts=[1])
+    assert part.num_rows == sum(f["rows"] for f in files if f["part"] == 1)
+    assert 0 < part.num_rows < follow.num_rows
+
+    # only the columns asked for, in the order asked for
+    serve = load_export(
+        str(tmp_path), edge="serve", parts=[1, 2], columns=["degree", "src"]
+    )
+    assert serve.column_names == ["degree", "src"]
+    assert serve.num_rows == sum(
+        f["rows"] for f in manifest["edges"]["serve"]["files"] if f["part"] < 3
+    )
+
+    players = load_export(str(tmp_path), tag="player", columns=["vid", "age"])
+    assert players.column_names == ["vid", "age"]
+    assert players.num_rows == manifest["vertices"]["player"]["rows"]
+
+    # no partition matches, an empty table of the schema
+    empty = load_export(str(tmp_path), edge="follow", parts=[99], columns=["src"])
+    assert empty.num_rows == 0 and empty.column_names == ["src"]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_query_export_round_trip(nebula, graph, tmp_path, file_format):
+    reader = NebulaReader(EDGES, PROPERTIES, nebula, None)
+    manifest = reader.export(
+        str(tmp_path), file_format=file_format, row_group_size=64
+    )
+    for edge in EDGES:
+        assert manifest["edges"][edge]["rows"] == graph.edges[edge]
+    follow = load_export(
+        str(tmp_path), edge="follow", parts=[0], columns=["src", "dst", "degree"]
+    )
+    assert follow.column_names == ["src", "dst", "degree"]
+    assert follow.num_rows == graph.edges["follow"]
+    # the rows of a file are grouped by src
+    src = follow.column("src").to_pylist()
+    assert len(set(src)) == sum(
+        1 for i in range(len(src)) if i == 0 or src[i] != src[i - 1]
+    )
+    with pytest.raises(AssertionError):
+        load_export(str(tmp_path), edge="nope")
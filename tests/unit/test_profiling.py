@@ -0,0 +1,130 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import pytest
+
+from ng_nx import NebulaReader, NebulaScanReader, NebulaWriter
+from ng_nx.profiling import NULL_PROFILER, Profiler
+
+
+def test_summary():
+    profiler = Profiler()
+    profiler.start("read")
+    for rows in (10, 30):
+        with profiler.phase("execute") as timing:
+            timing.rows = rows
+    with profiler.phase("build"):
+        pass
+    profiler.record("graphd", 0.5)
+    profiler.count("edges", 40)
+    profiler.count("edges", 2)
+    summary = profiler.finish()
+    assert summary["operation"] == "read"
+    assert summary["phases"]["execute"]["calls"] == 2
+    assert summary["phases"]["graphd"] == {"seconds": 0.5, "calls": 1}
+    assert summary["counts"] == {"edges": 42}
+    # only phases with rows are batches
+    assert list(summary["batches"]) == ["execute"]
+    batches = summary["batches"]["execute"]
+    assert batches["count"] == 2 and batches["rows"] == 40
+    assert batches["min"] <= batches["p50"] <= batches["p99"] <= batches["max"]
+    assert summary["peak_memory_bytes"] is None
+
+
+def test_observers_and_nesting():
+    events = []
+    profiler = Profiler(observers=[events.append])
+    profiler.start("refresh")
+    # a nested operation is recorded as part of the outer one
+    profiler.start("read")
+    profiler.count("edges", 3)
+    assert profiler.finish() is None
+    profiler.record("execute", 0.1, rows=3)
+    summary = profiler.finish()
+    assert [event["event"] for event in events] == [
+        "start",
+        "count",
+        "phase",
+        "finish",
+    ]
+    assert all(event["operation"] == "refresh" for event in events)
+    assert events[1]["name"] == "edges" and events[1]["value"] == 3
+    assert events[2]["seconds"] == 0.1 and events[2]["rows"] == 3
+    assert events[3]["summary"] is summary
+
+
+def test_merge_stats_of_workers():
+    worker = Profiler()
+    worker.start("scan")
+    worker.record("execute", 0.25, rows=50)
+    worker.record("decode", 0.5)
+    worker.count("edges", 50)
+    stats = worker.stats()
+
+    profiler = Profiler()
+    profiler.start("NebulaScanReader.read")
+    profiler.record("execute", 0.75, rows=10)
+    profiler.merge(stats)
+    profiler.merge(stats)
+    summary = profiler.finish()
+    assert summary["phases"]["execute"] == {"seconds": 1.25, "calls": 3}
+    assert summary["phases"]["decode"]["calls"] == 2
+    assert summary["counts"] == {"edges": 100}
+    assert summary["batches"]["execute"]["rows"] == 110
+
+
+def test_null_profiler_records_nothing(nebula):
+    NULL_PROFILER.start("read")
+    with NULL_PROFILER.phase("execute") as timing:
+        timing.rows = 3
+    NULL_PROFILER.count("edges")
+    assert NULL_PROFILER.finish() is None
+    assert NULL_PROFILER.stats() == {"phases": {}, "counts": {}, "batches": {}}
+
+    reader = NebulaReader(["follow"], [["degree"]], nebula, None)
+    assert reader.profiler is NULL_PROFILER
+    reader.read()
+    assert reader.last_profile is None
+
+
+@pytest.mark.parametrize("page_size", [None, 64])
+def test_reader_profile(nebula, graph, page_size):
+    events = []
+    profiler = Profiler(observers=[events.append], trace_memory=True)
+    reader = NebulaReader(
+        ["follow"],
+        [["degree"]],
+        nebula,
+        None,
+        page_size=page_size,
+        profiler=profiler,
+    )
+    reader.read()
+    profile = reader.last_profile
+    assert profile["operation"] == "NebulaReader.read"
+    assert profile["counts"] == {"edges": graph.edges["follow"]}
+    assert {"execute", "graphd", "decode", "dataframe", "build"} <= set(
+        profile["phases"]
+    )
+    executed = profile["batches"]["execute"]
+    assert executed["count"] == profile["phases"]["execute"]["calls"]
+    assert profile["peak_memory_bytes"] > 0
+    assert events[0]["event"] == "start" and events[-1]["event"] == "finish"
+
+
+def test_scan_and_write_profiles(nebula, graph):
+    profiler = Profiler()
+    reader = NebulaScanReader(
+        ["follow"], [["degree"]], nebula, 10**6, parallelism=2, profiler=profiler
+    )
+    reader.read()
+    assert reader.last_profile["counts"]["edges"] == graph.edges["follow"]
+    assert (
+        reader.last_profile["batches"]["execute"]["rows"] == graph.edges["follow"]
+    )
+
+    writer = NebulaWriter({"v1": [1], "v2": [2]}, nebula, profiler=profiler)
+    writer.set_options("player", ["age"])
+    writer.write()
+    assert writer.last_profile["operation"] == "NebulaWriter.write"
+    assert writer.last_profile["counts"]["bytes_sent"] > 0
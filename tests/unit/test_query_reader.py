@@ -0,0 +1,189 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import queue
+import re
+from collections import Counter
+
+import networkx as nx
+import numpy as np
+import pytest
+from fake_nebula import result_set
+
+from ng_nx import NebulaQueryReader, NebulaReader, VidMap
+from ng_nx.query_reader import PAGES_AHEAD, _GraphElements
+from ng_nx.sampling import Sampling
+
+EDGES = ["follow", "serve"]
+PROPERTIES = [["degree", "note"], ["degree"]]
+
+
+def _edges(g) -> list:
+    return sorted(
+        (u, v, tuple(sorted(data.items()))) for u, v, data in g.edges(data=True)
+    )
+
+
+def _go_vids(query: str) -> list:
+    return re.findall(r'"(v\d+)"', query.split(" OVER ")[0])
+
+
+@pytest.mark.parametrize("with_rank", [False, True])
+@pytest.mark.parametrize("concurrency", [1, 2])
+@pytest.mark.parametrize("page_size", [1, 7, 300, 1000])
+def test_paged_read_is_the_unpaged_one(nebula, with_rank, concurrency, page_size):
+    unpaged = NebulaReader(EDGES, PROPERTIES, nebula, None, with_rank=with_rank)
+    paged = NebulaReader(
+        EDGES,
+        PROPERTIES,
+        nebula,
+        None,
+        with_rank=with_rank,
+        page_size=page_size,
+        concurrency=concurrency,
+    )
+    assert _edges(paged.read()) == _edges(unpaged.read())
+
+
+def test_pages_go_from_a_frontier(nebula, graph, queries):
+    g = NebulaReader(["follow"], [["degree"]], nebula, None, page_size=64).read()
+    assert g.number_of_edges() == graph.edges["follow"]
+    # the sources are listed once, each page goes from a batch of them
+    matches = [query for query in queries if query.startswith("MATCH")]
+    assert len(matches) == 1 and "count(*)" in matches[0]
+    gos = [query for query in queries if query.startswith("GO FROM")]
+    assert len(gos) > 1
+    src = graph.edge_columns("follow")["src"]
+    degrees = Counter(f"v{v}" for v in src.tolist())
+    batches = [_go_vids(query) for query in gos]
+    assert all(sum(degrees[vid] for vid in batch) <= 64 for batch in batches)
+    assert sorted(vid for batch in batches for vid in batch) == sorted(degrees)
+
+
+def test_pages_ahead_are_bounded(monkeypatch, nebula):
+    queued = []
+    put = queue.Queue.put
+
+    def record(self, item, *args, **kwargs):
+        put(self, item, *args, **kwargs)
+        queued.append(self.qsize())
+
+    monkeypatch.setattr(queue.Queue, "put", record)
+    reader = NebulaReader(
+        EDGES, PROPERTIES, nebula, None, page_size=1, concurrency=2
+    )
+    reader.read()
+    assert queued and max(queued) <= PAGES_AHEAD
+
+
+def test_paged_read_with_limit(nebula):
+    reader = NebulaReader(["follow"], [["degree"]], nebula, 55, page_size=7)
+    assert reader.read().number_of_edges() == 55
+
+
+def test_paged_csr_read(nebula):
+    g = NebulaReader(EDGES, PROPERTIES, nebula, None, output_format="csr").read()
+    paged = NebulaReader(
+        EDGES, PROPERTIES, nebula, None, output_format="csr", page_size=9
+    ).read()
+    assert _edges(paged.to_networkx()) == _edges(g.to_networkx())
+
+
+def test_count_sampling(nebula):
+    sampling = Sampling(count=20, seed=3)
+    reader = NebulaReader(["follow"], [["degree"]], nebula, None, sampling=sampling)
+    g = reader.read()
+    assert g.number_of_edges() == 20
+    paged = NebulaReader(
+        ["follow"], [["degree"]], nebula, None, sampling=sampling, page_size=6
+    )
+    assert _edges(paged.read()) == _edges(g)
+
+
+@pytest.mark.parametrize("with_rank", [False, True])
+def test_refresh_replaces_out_edges(nebula, graph, with_rank):
+    reader = NebulaReader(EDGES, PROPERTIES, nebula, None, with_rank=with_rank)
+    g = reader.read()
+    expected = _edges(g)
+    reader.refresh(g, vertices=[f"v{i}" for i in range(graph.num_vertices)])
+    assert _edges(g) == expected
+
+
+@pytest.mark.parametrize("with_rank", [False, True])
+def test_refresh_by_watermark_keeps_parallel_edges(nebula, graph, with_rank):
+    reader = NebulaReader(
+        ["follow"], [["degree"]], nebula, None, with_rank=with_rank
+    )
+    g = reader.read()
+    columns = graph.edge_columns("follow")
+    # an edge with a parallel edge of the same type before it
+    position = int(np.flatnonzero(columns["rank"] == 1)[0])
+    u = f"v{columns['src'][position]}"
+    v = f"v{columns['dst'][position]}"
+    degrees = sorted(data["degree"] for data in g[u][v].values())
+    degrees.remove(int(columns["props"]["degree"][position]))
+
+    graph.update_edges("follow", [position], degree=5000)
+    reader.refresh(g, watermark_property="degree", since=1000)
+    assert g.number_of_edges() == graph.edges["follow"]
+    assert sorted(data["degree"] for data in g[u][v].values()) == sorted(
+        degrees + [5000]
+    )
+
+
+def test_refresh_with_vid_map(nebula, graph):
+    vid_map = VidMap()
+    reader = NebulaReader(["follow"], [["degree"]], nebula, None, vid_map=vid_map)
+    g = reader.read()
+    reader.refresh(g, vertices=["v1", "v2"])
+    assert g.number_of_edges() == graph.edges["follow"]
+    assert all(isinstance(node, int) for node in g)
+
+
+def _vis_graph(vis_data: dict) -> nx.MultiDiGraph:
+    """
+    the graph NebulaQueryReader used to build from dict_for_vis()
+    """
+    g = nx.MultiDiGraph()
+    for node_data in vis_data["nodes"]:
+        g.add_node(
+            node_data["id"], **node_data["props"], labels=node_data["labels"]
+        )
+    for edge_data in vis_data["edges"]:
+        g.add_edge(
+            edge_data["src"],
+            edge_data["dst"],
+            key=edge_data["name"],
+            **edge_data["props"],
+        )
+    return g
+
+
+def _graph_data(g) -> tuple:
+    return (
+        sorted(g.nodes(data=True), key=str),
+        sorted(g.edges(keys=True, data=True), key=str),
+    )
+
+
+def test_graph_elements_are_dict_for_vis(graph):
+    result = result_set(["p"], graph.path_rows(graph.num_vertices))
+    elements = _GraphElements()
+    elements.add_rows(result.rows())
+    expected = _vis_graph(result.dict_for_vis())
+    # some edges have a rank other than 0, which is kept as a prop
+    assert any(rank != 0 for _, _, rank, _ in elements.edges)
+    assert _graph_data(elements.to_graph()) == _graph_data(expected)
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 1000])
+def test_read_iter_fragments_make_the_read(nebula, graph, batch_size):
+    query = "MATCH p=(v)-[e*3]->() RETURN p"
+    reader = NebulaQueryReader(nebula)
+    fragments = list(reader.read_iter(query, batch_size=batch_size))
+    assert len(fragments) == -(-graph.num_vertices // batch_size)
+    g = nx.MultiDiGraph()
+    for fragment in fragments:
+        g.add_nodes_from(fragment.nodes(data=True))
+        g.add_edges_from(fragment.edges(keys=True, data=True))
+    assert _graph_data(g) == _graph_data(reader.read(query))
@@ -0,0 +1,159 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import numpy as np
+import pytest
+from fake_nebula import FakeGraphStorageClient
+
+from ng_nx import NebulaScanReader, VidMap
+from ng_nx.cache import PRESENT_PREFIX
+from ng_nx.sampling import Sampling
+
+EDGES = ["follow", "serve"]
+PROPERTIES = [["degree", "weight", "note"], ["degree"]]
+LIMIT = 10**6
+
+
+def _edges(g) -> list:
+    return sorted(
+        (u, v, tuple(sorted(data.items()))) for u, v, data in g.edges(data=True)
+    )
+
+
+@pytest.mark.parametrize("with_rank", [False, True])
+@pytest.mark.parametrize("output_format", ["networkx", "csr"])
+def test_read(nebula, graph, with_rank, output_format):
+    g = NebulaScanReader(
+        EDGES,
+        PROPERTIES,
+        nebula,
+        LIMIT,
+        with_rank=with_rank,
+        output_format=output_format,
+    ).read()
+    if output_format == "csr":
+        g = g.to_networkx()
+    # edges of different types with the same ends and rank are all kept
+    assert g.number_of_edges() == sum(graph.edges.values())
+    types = {data["__type__"] for _, _, data in g.edges(data=True)}
+    assert types == set(EDGES)
+    if with_rank:
+        assert all(
+            key == (data["__type__"], data["__rank__"])
+            for _, _, key, data in g.edges(keys=True, data=True)
+        )
+
+
+@pytest.mark.parametrize("parallelism", [1, 4])
+def test_csr_is_networkx(nebula, graph, parallelism):
+    kwargs = dict(parallelism=parallelism, vertices=["player"])
+    kwargs["vertex_properties"] = [["name", "age"]]
+    g = NebulaScanReader(EDGES, PROPERTIES, nebula, LIMIT, **kwargs).read()
+    csr = NebulaScanReader(
+        EDGES, PROPERTIES, nebula, LIMIT, output_format="csr", **kwargs
+    ).read()
+    assert csr.num_edges == g.number_of_edges()
+    assert csr.edge_attrs["degree"].dtype == np.int64
+    # weight is only a property of follow
+    assert csr.edge_attrs[PRESENT_PREFIX + "weight"].sum() == graph.edges["follow"]
+    converted = csr.to_networkx()
+    assert _edges(converted) == _edges(g)
+    assert dict(converted.nodes(data=True)) == dict(g.nodes(data=True))
+
+
+def test_vid_map(nebula):
+    vid_map = VidMap()
+    g = NebulaScanReader(EDGES, PROPERTIES, nebula, LIMIT, vid_map=vid_map).read()
+    assert all(isinstance(node, int) for node in g)
+    plain = NebulaScanReader(EDGES, PROPERTIES, nebula, LIMIT).read()
+    assert _edges(vid_map.to_vids(g)) == _edges(plain)
+
+
+@pytest.mark.parametrize("sampling", [Sampling(fraction=0.3), Sampling(count=40)])
+def test_sampling_is_deterministic(nebula, sampling):
+    samples = [
+        _edges(
+            NebulaScanReader(
+                ["follow"],
+                [["degree"]],
+                nebula,
+                LIMIT,
+                with_rank=True,
+                parallelism=parallelism,
+                sampling=sampling,
+            ).read()
+        )
+        for parallelism in (1, 1, 4)
+    ]
+    assert samples[0] == samples[1] == samples[2]
+    if sampling.count is not None:
+        assert len(samples[0]) == sampling.count
+    other = Sampling(fraction=sampling.fraction, count=sampling.count, seed=1)
+    resampled = NebulaScanReader(
+        ["follow"], [["degree"]], nebula, LIMIT, with_rank=True, sampling=other
+    ).read()
+    assert _edges(resampled) != samples[0]
+
+
+@pytest.mark.parametrize("with_rank", [False, True])
+def test_refresh_replaces_out_edges(nebula, with_rank):
+    reader = NebulaScanReader(EDGES, PROPERTIES, nebula, LIMIT, with_rank=with_rank)
+    g = reader.read()
+    expected = _edges(g)
+    reader.refresh(g)
+    assert _edges(g) == expected
+    reader.refresh(g, partitions=[1])
+    assert _edges(g) == expected
+
+
+@pytest.mark.parametrize("with_rank", [False, True])
+def test_refresh_by_watermark_keeps_parallel_edges(nebula, graph, with_rank):
+    reader = NebulaScanReader(
+        ["follow"], [["degree"]], nebula, LIMIT, with_rank=with_rank
+    )
+    g = reader.read()
+    columns = graph.edge_columns("follow")
+    # an edge with a parallel edge of the same type before it
+    position = int(np.flatnonzero(columns["rank"] == 1)[0])
+    u = f"v{columns['src'][position]}"
+    v = f"v{columns['dst'][position]}"
+    degrees = sorted(data["degree"] for data in g[u][v].values())
+    degrees.remove(int(columns["props"]["degree"][position]))
+
+    graph.update_edges("follow", [position], degree=5000)
+    reader.refresh(g, watermark_property="degree", since=1000)
+    assert g.number_of_edges() == graph.edges["follow"]
+    assert sorted(data["degree"] for data in g[u][v].values()) == sorted(
+        degrees + [5000]
+    )
+
+
+def test_storage_clients_are_reused_and_closed(monkeypatch, nebula, graph):
+    created, closed = [], []
+    init = FakeGraphStorageClient.__init__
+
+    def record_init(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        created.append(self)
+
+    def record_close(self):
+        closed.append(self)
+
+    monkeypatch.setattr(FakeGraphStorageClient, "__init__", record_init)
+    monkeypatch.setattr(FakeGraphStorageClient, "close", record_close)
+    reader = NebulaScanReader(EDGES, PROPERTIES, nebula, LIMIT, parallelism=4)
+    # the client of sequential scans, and at most one per worker
+    for _ in range(3):
+        assert reader.read().number_of_edges() == sum(graph.edges.values())
+    assert 1 < len(created) <= 5
+    assert not closed
+    reader.release()
+    assert sorted(map(id, closed)) == sorted(map(id, created))
+
+
+def test_process_workers(nebula, graph):
+    reader = NebulaScanReader(
+        EDGES, PROPERTIES, nebula, LIMIT, parallelism=2, executor="process"
+    )
+    assert reader.read().number_of_edges() == sum(graph.edges.values())
+    reader.release()
@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import threading
+
+import pytest
+from fake_nebula import FakeSession
+
+from ng_nx import NebulaReader
+from ng_nx.session import PING_QUERY, NebulaSessionManager
+
+
+@pytest.fixture
+def released(monkeypatch) -> list:
+    """
+    the sessions signed out, in order
+    """
+    sessions = []
+
+    def release(self):
+        sessions.append(self)
+
+    monkeypatch.setattr(FakeSession, "release", release)
+    return sessions
+
+
+def test_max_sessions_blocks(nebula):
+    sessions = NebulaSessionManager(nebula, max_sessions=1)
+    session = sessions.acquire()
+    taken = []
+    waiter = threading.Thread(target=lambda: taken.append(sessions.acquire()))
+    waiter.start()
+    waiter.join(0.1)
+    assert waiter.is_alive() and not taken
+    sessions.release(session)
+    waiter.join(5)
+    assert taken == [session]
+    sessions.close()
+
+
+def test_failed_ping_replaces_the_session(monkeypatch, nebula, released):
+    sessions = NebulaSessionManager(nebula, health_check_interval=0)
+    broken = sessions.acquire()
+    sessions.release(broken)
+    execute = FakeSession.execute
+
+    def ping_fails(self, query: str):
+        if self is broken and query == PING_QUERY:
+            raise ConnectionError("connection reset")
+        return execute(self, query)
+
+    monkeypatch.setattr(FakeSession, "execute", ping_fails)
+    session = sessions.acquire()
+    assert session is not broken
+    assert released == [broken]
+    sessions.release(session)
+    # a healthy session is handed out again
+    assert sessions.acquire() is session
+
+
+def test_shared_manager_survives_release(nebula, graph):
+    sessions = NebulaSessionManager(nebula)
+    reader = NebulaReader(["follow"], [["degree"]], sessions, None)
+    reader.read()
+    reader.release()
+    other = NebulaReader(["follow"], [["degree"]], sessions, None)
+    assert other.read().number_of_edges() == graph.edges["follow"]
+    sessions.close()
+
+    # a manager made by a reader for a config is closed along with it
+    reader = NebulaReader(["follow"], [["degree"]], nebula, None)
+    reader.release()
+    with pytest.raises(AssertionError):
+        reader.sessions.acquire()
+
+
+def test_close_while_sessions_are_held(nebula, released):
+    sessions = NebulaSessionManager(nebula)
+    held = sessions.acquire()
+    idle = sessions.acquire()
+    sessions.release(idle)
+    sessions.close()
+    assert released == [idle]
+    with pytest.raises(AssertionError):
+        sessions.acquire()
+    # signed out when given back
+    sessions.release(held)
+    assert released == [idle, held]
@@ -0,0 +1,137 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import re
+
+import pytest
+from fake_nebula import FakeSession
+
+from ng_nx import NebulaSubgraphReader
+
+EDGES = ["follow", "serve"]
+PROPERTIES = [["degree"], ["degree"]]
+SEEDS = ["v0", "v1"]
+
+
+def _reached(graph, seeds, hops, direction="out", min_degree=None) -> set:
+    """
+    the (src, dst, type, rank) of the edges within hops of seeds, expanding
+    every vertex once
+    """
+    found = set()
+    visited = set()
+    frontier = set(seeds)
+    for _ in range(hops):
+        visited |= frontier
+        reached = set()
+        for edge in EDGES:
+            columns = graph.edge_columns(edge)
+            for u, v, rank, degree in zip(
+                columns["src"].tolist(),
+                columns["dst"].tolist(),
+                columns["rank"].tolist(),
+                columns["props"]["degree"].tolist(),
+            ):
+                u, v = f"v{u}", f"v{v}"
+                if not (
+                    (direction != "in" and u in frontier)
+                    or (direction != "out" and v in frontier)
+                ):
+                    continue
+                if min_degree is not None and (
+                    edge != "follow" or degree <= min_degree
+                ):
+                    continue
+                found.add((u, v, edge, rank))
+                reached |= {u, v}
+        frontier = reached - visited
+    return found
+
+
+def _edges(g) -> set:
+    return {
+        (u, v, data["__type__"], data["__rank__"])
+        for u, v, data in g.edges(data=True)
+    }
+
+
+def _go_vids(query: str) -> list:
+    return re.findall(r'"(v\d+)"', query.split(" OVER ")[0])
+
+
+@pytest.mark.parametrize("hops", [0, 1, 2])
+def test_hops(nebula, graph, queries, hops):
+    reader = NebulaSubgraphReader(
+        EDGES, PROPERTIES, nebula, with_rank=True, batch_size=4
+    )
+    g = reader.read(SEEDS, hops=hops)
+    edges = _edges(g)
+    assert edges == _reached(graph, SEEDS, hops)
+    assert g.number_of_edges() == len(edges)
+    assert set(SEEDS) <= set(g)
+    # every vertex is expanded once, in batches of batch_size
+    batches = [_go_vids(query) for query in queries if query.startswith("GO")]
+    expanded = [vid for batch in batches for vid in batch]
+    assert len(expanded) == len(set(expanded))
+    assert all(len(batch) <= 4 for batch in batches)
+    if hops == 0:
+        assert not batches and g.number_of_edges() == 0
+
+
+@pytest.mark.parametrize("direction", ["out", "in", "both"])
+def test_directions(nebula, graph, direction):
+    reader = NebulaSubgraphReader(
+        EDGES, PROPERTIES, nebula, with_rank=True, direction=direction
+    )
+    edges = _edges(reader.read(SEEDS, hops=1))
+    assert edges == _reached(graph, SEEDS, 1, direction)
+    if direction == "in":
+        assert all(v in SEEDS for _, v, _, _ in edges)
+
+
+def test_edges_found_from_both_ends_are_read_once(monkeypatch, nebula, graph):
+    returned = []
+    go = FakeSession._go
+
+    def record(self, *args):
+        result = go(self, *args)
+        returned.append(result.row_size())
+        return result
+
+    monkeypatch.setattr(FakeSession, "_go", record)
+    reader = NebulaSubgraphReader(
+        EDGES, PROPERTIES, nebula, with_rank=True, direction="both"
+    )
+    g = reader.read(SEEDS, hops=2)
+    expected = _reached(graph, SEEDS, 2, "both")
+    # edges between vertices expanded are returned for both ends
+    assert sum(returned) > len(expected)
+    assert g.number_of_edges() == len(expected)
+    assert _edges(g) == expected
+
+
+def test_where_is_pushed_down(nebula, graph, queries):
+    reader = NebulaSubgraphReader(
+        EDGES, PROPERTIES, nebula, with_rank=True, where="follow.degree > 500"
+    )
+    g = reader.read(SEEDS, hops=2)
+    gos = [query for query in queries if query.startswith("GO")]
+    assert gos and all(
+        " WHERE follow.degree > 500 YIELD " in query for query in gos
+    )
+    assert _edges(g) == _reached(graph, SEEDS, 2, min_degree=500)
+    assert all(data["degree"] > 500 for _, _, data in g.edges(data=True))
+
+
+@pytest.mark.parametrize("with_rank", [False, True])
+def test_csr_is_networkx(nebula, with_rank):
+    kwargs = dict(with_rank=with_rank, direction="both")
+    g = NebulaSubgraphReader(EDGES, PROPERTIES, nebula, **kwargs).read(SEEDS, 2)
+    csr = NebulaSubgraphReader(
+        EDGES, PROPERTIES, nebula, output_format="csr", **kwargs
+    ).read(SEEDS, 2)
+    converted = csr.to_networkx()
+    assert sorted(converted.edges(keys=True, data=True), key=str) == sorted(
+        g.edges(keys=True, data=True), key=str
+    )
+    assert set(converted) == set(g)
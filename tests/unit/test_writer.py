@@ -0,0 +1,161 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The NebulaGraph Authors. All rights reserved.
+
+import os
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+from fake_nebula import FakeSession
+
+from ng_nx import NebulaWriter
+from ng_nx.writer import compile_formatter
+
+
+def _inserts(queries) -> list:
+    return [query for query in queries if query.startswith("INSERT")]
+
+
+def _fail_on(monkeypatch, marker: str, times: int = -1) -> list:
+    """
+    make the INSERTs containing marker fail, only the first times ones when
+    times is not negative, return the failed queries
+    """
+    failed = []
+    execute = FakeSession.execute
+
+    def flaky(self, query: str):
+        if query.startswith("INSERT") and marker in query and times != len(failed):
+            failed.append(query)
+            raise RuntimeError("storage error")
+        return execute(self, query)
+
+    monkeypatch.setattr(FakeSession, "execute", flaky)
+    return failed
+
+
+@pytest.mark.parametrize(
+    "property_type, value, expected",
+    [
+        ("string", None, "NULL"),
+        ("string", np.nan, "NULL"),
+        ("string", "a", '"a"'),
+        ("int64", None, "NULL"),
+        ("int64", float("nan"), "NULL"),
+        ("int64", 3.0, "3"),
+        ("double", pd.NA, "NULL"),
+        ("double", 0.5, "0.5"),
+        ("bool", None, "NULL"),
+        ("bool", False, "false"),
+        ("fixed_string(8)", None, "NULL"),
+    ],
+)
+def test_compile_formatter(property_type, value, expected):
+    assert compile_formatter(property_type)(value) == expected
+
+
+def test_missing_values_are_null(nebula, queries):
+    df = pd.DataFrame(
+        {
+            "src": ["a", "b"],
+            "dst": ["b", "c"],
+            "degree": [1, np.nan],
+            "note": ["x", None],
+            "__rank__": [1, np.nan],
+        }
+    )
+    writer = NebulaWriter(df, nebula)
+    writer.set_options("follow", ["degree", "note"], sink="nebulagraph_edge")
+    assert writer.write()
+
+    g = nx.MultiDiGraph()
+    g.add_edge("a", "b", degree=3)
+    g.add_node("c", name="n")
+    writer = NebulaWriter(g, nebula)
+    writer.set_options("follow", ["degree", "note"], sink="nebulagraph_edge")
+    assert writer.write()
+    writer = NebulaWriter(g, nebula)
+    writer.set_options("player", ["name", "age"])
+    assert writer.write()
+
+    assert _inserts(queries) == [
+        'INSERT EDGE follow (degree,note) VALUES "a"->"b"@1:(1,"x"),'
+        '"b"->"c"@0:(NULL,NULL)',
+        'INSERT EDGE follow (degree,note) VALUES "a"->"b"@0:(3,NULL)',
+        # nodes without any of the properties are skipped
+        'INSERT VERTEX player (name,age) VALUES "c":("n",NULL)',
+    ]
+
+
+def test_undefined_property(nebula):
+    writer = NebulaWriter({"a": [1]}, nebula)
+    writer.set_options("player", ["nope"])
+    with pytest.raises(ValueError):
+        writer.write()
+
+
+def test_retry(monkeypatch, nebula):
+    failed = _fail_on(monkeypatch, '"v1"', times=2)
+    writer = NebulaWriter({f"v{i}": [i] for i in range(4)}, nebula)
+    writer.set_options("player", ["age"], batch_size=2, max_retries=2)
+    writer.retry_backoff = 0
+    assert writer.write()
+    assert len(failed) == 2
+
+
+def test_split_failed_batches(monkeypatch, nebula):
+    _fail_on(monkeypatch, '"bad"')
+    data = {f"v{i}": [i] for i in range(7)}
+    data["bad"] = [0]
+    writer = NebulaWriter(data, nebula)
+    writer.set_options(
+        "player",
+        ["age"],
+        batch_size=4,
+        split_failed_batches=True,
+        on_failure="skip",
+    )
+    assert not writer.write()
+    assert [row for row, _ in writer.failed_rows] == [("bad", [0])]
+
+
+def test_failure_raises(monkeypatch, nebula):
+    _fail_on(monkeypatch, '"bad"')
+    writer = NebulaWriter({"bad": [0]}, nebula)
+    writer.set_options("player", ["age"])
+    with pytest.raises(AssertionError):
+        writer.write()
+
+
+@pytest.mark.parametrize("concurrency", [1, 2])
+def test_checkpoint_resumes(monkeypatch, nebula, tmp_path, concurrency):
+    checkpoint = str(tmp_path / "checkpoint")
+    data = {f"v{i}": [i] for i in range(10)}
+    options = dict(
+        batch_size=2, checkpoint_path=checkpoint, concurrency=concurrency
+    )
+    with monkeypatch.context() as m:
+        _fail_on(m, '"v6"')
+        writer = NebulaWriter(data, nebula)
+        writer.set_options("player", ["age"], **options)
+        with pytest.raises(AssertionError):
+            writer.write()
+    assert os.path.exists(checkpoint)
+
+    written = []
+    execute = FakeSession.execute
+
+    def record(self, query: str):
+        if query.startswith("INSERT"):
+            written.append(query)
+        return execute(self, query)
+
+    monkeypatch.setattr(FakeSession, "execute", record)
+    writer = NebulaWriter(data, nebula)
+    writer.set_options("player", ["age"], **options)
+    assert writer.write()
+    assert not os.path.exists(checkpoint)
+    # the batches written before the failure are not written again
+    assert any('"v6"' in query for query in written)
+    assert len(written) <= 2